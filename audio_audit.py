@@ -6,9 +6,8 @@ from pathlib import Path
 import logging
 import time
 import json
-import boto3
-import requests
-from aws_clients import start_transcription_job, get_transcription_job
+import aws_clients  # clients looked up per call: configure_transport() rebuilds them
+from aws_clients import start_transcription_job, get_transcription_job, http_session, http_timeout
 import uuid
 import numpy as np
 import wave
@@ -108,9 +107,8 @@ def process_uploaded_file(file):
 def upload_to_s3(file_path):
     """Upload file to S3 and return the S3 URI"""
     try:
-        s3_client = boto3.client('s3')
         file_name = f"audio/{uuid.uuid4()}.wav"
-        s3_client.upload_file(file_path, S3_BUCKET_NAME, file_name)
+        aws_clients.s3_client.upload_file(file_path, S3_BUCKET_NAME, file_name)
         return f"s3://{S3_BUCKET_NAME}/{file_name}"
     except Exception as e:
         logger.error(f"S3 upload failed: {str(e)}")
@@ -171,7 +169,7 @@ def transcribe_audio(audio_input, language_choice="English"):
             if status == 'COMPLETED':
                 # Get the transcript
                 transcript_uri = job['TranscriptionJob']['Transcript']['TranscriptFileUri']
-                transcript_response = requests.get(transcript_uri)
+                transcript_response = http_session().get(transcript_uri, timeout=http_timeout())
                 transcript_data = transcript_response.json()
                 
                 # Extract the text
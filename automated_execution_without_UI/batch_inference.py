@@ -0,0 +1,543 @@
+"""Bedrock batch inference (model invocation jobs) for large, non-urgent runs.
+
+Instead of one synchronous Converse call per row, the rows are moderated by an asynchronous
+Bedrock job in three steps, each of which can run in a separate CLI invocation:
+
+1. export_batch() renders every row into a JSONL record (model-native invoke_model body built
+   from the same prompts and message builders as the synchronous path) plus a manifest that
+   maps record IDs back to rows.
+2. A BatchBackend submits the records as one job, reports its status, and downloads the
+   output files. BedrockBatchBackend talks to Bedrock and S3; LocalBatchBackend is a
+   file-based stand-in for testing and offline use.
+3. import_batch() parses the job output with _parse_moderation_response() into the usual
+   result dataclasses.
+
+Layout of the work directory:
+
+    <work_dir>/input/records-00000.jsonl   {"recordId", "modelInput"} per row
+    <work_dir>/manifest.jsonl              {"recordId", "modality", "row_index", "value", ...}
+    <work_dir>/output/*.jsonl.out          job output, {"recordId", "modelOutput" | "error"}
+    <work_dir>/job.json                    backend, job ID and model of the submitted job
+"""
+
+import base64
+import glob
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+from concurrency import map_ordered
+from config import DEFAULT_LANG, get_prompts
+from llm_moderator import (
+    _MIME_TYPES,
+    _image_messages,
+    _invoke_model_body,
+    _is_text_only,
+    _parse_moderation_response,
+    _text_messages,
+    aws_clients,
+    image_error_result,
+    video_error_result,
+)
+from media_utils import download_media, normalize_image_bytes, timed_call
+from models import ImageModerationResult, TextModerationResult
+
+logger = logging.getLogger(__name__)
+
+MAX_RECORDS_PER_FILE = 50000  # Bedrock limit per input file
+
+# Bedrock job states
+TERMINAL_STATUSES = {"Completed", "PartiallyCompleted", "Failed", "Stopped", "Expired"}
+OUTPUT_STATUSES = {"Completed", "PartiallyCompleted"}
+
+_MAX_TOKENS = 2000
+_TEMPERATURE = 0.1
+
+
+# ---------------------------------------------------------------------------
+# Model-native request bodies
+# ---------------------------------------------------------------------------
+
+def _model_family(model_id):
+    if "anthropic." in model_id:
+        return "anthropic"
+    if "amazon.nova" in model_id:
+        return "nova"
+    return "openai"  # Qwen, DeepSeek, Kimi, GLM, ... use the OpenAI-compatible chat format
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("utf-8")
+
+
+def _anthropic_block(block):
+    if "text" in block:
+        return {"type": "text", "text": block["text"]}
+    img = block["image"]
+    return {
+        "type": "image",
+        "source": {
+            "type": "base64",
+            "media_type": _MIME_TYPES.get(img["format"], "image/jpeg"),
+            "data": _b64(img["source"]["bytes"]),
+        },
+    }
+
+
+def _nova_block(block):
+    if "text" in block:
+        return {"text": block["text"]}
+    img = block["image"]
+    return {"image": {"format": img["format"], "source": {"bytes": _b64(img["source"]["bytes"])}}}
+
+
+def _model_input(model_id, system_prompt, messages):
+    """Translate Converse-style messages into the model's invoke_model body for a batch record."""
+    family = _model_family(model_id)
+    if family == "anthropic":
+        return {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": _MAX_TOKENS,
+            "temperature": _TEMPERATURE,
+            "system": system_prompt,
+            "messages": [
+                {"role": m["role"], "content": [_anthropic_block(b) for b in m["content"]]} for m in messages
+            ],
+        }
+    if family == "nova":
+        return {
+            "schemaVersion": "messages-v1",
+            "system": [{"text": system_prompt}],
+            "messages": [
+                {"role": m["role"], "content": [_nova_block(b) for b in m["content"]]} for m in messages
+            ],
+            "inferenceConfig": {"maxTokens": _MAX_TOKENS, "temperature": _TEMPERATURE},
+        }
+    # OpenAI-compatible: same body the synchronous invoke_model path sends
+    texts = [b["text"] for m in messages for b in m["content"] if "text" in b]
+    images = [(b["image"]["source"]["bytes"], b["image"]["format"])
+              for m in messages for b in m["content"] if "image" in b]
+    return _invoke_model_body(system_prompt, "".join(texts), images or None, max_tokens=_MAX_TOKENS)
+
+
+def _output_text(model_output):
+    """Pull the response text out of a model-native invoke_model response body."""
+    if "content" in model_output:  # Anthropic
+        return "".join(b.get("text", "") for b in model_output["content"] if isinstance(b, dict))
+    if "output" in model_output:  # Nova
+        content = model_output["output"].get("message", {}).get("content", [])
+        return "".join(b.get("text", "") for b in content if isinstance(b, dict))
+    choices = model_output.get("choices") or []  # OpenAI-compatible
+    if choices:
+        return choices[0].get("message", {}).get("content", "") or ""
+    return ""
+
+
+# ---------------------------------------------------------------------------
+# Step 1: export
+# ---------------------------------------------------------------------------
+
+class _RecordFiles:
+    """Writes records into input/records-NNNNN.jsonl, starting a new file every max_records."""
+
+    def __init__(self, input_dir, max_records):
+        self.input_dir = input_dir
+        self.max_records = max_records
+        self.files = 0
+        self.records = 0
+        self._fh = None
+
+    def write(self, record):
+        if self._fh is None or self.records % self.max_records == 0:
+            self.close()
+            path = os.path.join(self.input_dir, f"records-{self.files:05d}.jsonl")
+            self._fh = open(path, "w", encoding="utf-8")
+            self.files += 1
+        self._fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.records += 1
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def _prepare_image(model_id, url):
+    """Download and normalize (downscale for model_id) one image; returns (norm_bytes, fmt, dl_time, size, error)."""
+    if _is_text_only(model_id):
+        return None, None, 0.0, 0, f"Model {model_id} is text-only, cannot process images"
+    data, dl_time, dl_error = timed_call(download_media, url)
+    if dl_error:
+        return None, None, dl_time, 0, f"Download failed: {dl_error}"
+    try:
+        norm_bytes, fmt = normalize_image_bytes(data, model_id)
+    except Exception as exc:
+        return None, None, dl_time, len(data), f"Image conversion failed: {exc}"
+    return norm_bytes, fmt, dl_time, len(data), None
+
+
+def export_batch(items_by_modality, work_dir, model_id, lang=DEFAULT_LANG, executor=None,
+                 max_records_per_file=MAX_RECORDS_PER_FILE):
+    """Render rows into batch input files and a manifest under work_dir.
+
+    items_by_modality: {"text": iterable of (row_index, text), "image": iterable of
+    (row_index, url), ...}; other modalities are recorded in the manifest as unsupported.
+    Images are downloaded (in parallel on executor) and embedded as base64. Rows that fail
+    before reaching the model are written to the manifest with their error and no record.
+    Returns {"records", "files", "errors"}.
+    """
+    input_dir = os.path.join(work_dir, "input")
+    if os.path.isdir(input_dir):
+        shutil.rmtree(input_dir)
+    os.makedirs(input_dir)
+    sys_p, text_p, img_p, _ = get_prompts(lang)
+    records = _RecordFiles(input_dir, max_records_per_file)
+    errors = 0
+    lock = threading.Lock()
+
+    with open(os.path.join(work_dir, "manifest.jsonl"), "w", encoding="utf-8") as manifest:
+        def _add(modality, row_idx, value, messages=None, error=None, dl_time=0.0, size=0, sent_size=0):
+            nonlocal errors
+            record_id = f"{modality}-{row_idx}"
+            entry = {"recordId": record_id, "modality": modality, "row_index": row_idx, "value": value,
+                     "download_time_sec": round(dl_time, 3), "size_bytes": size, "sent_bytes": sent_size,
+                     "error": error}
+            record = None if error else {"recordId": record_id,
+                                         "modelInput": _model_input(model_id, sys_p, messages)}
+            with lock:
+                manifest.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                if error:
+                    errors += 1
+                else:
+                    records.write(record)
+
+        try:
+            for modality, items in items_by_modality.items():
+                if modality == "text":
+                    for row_idx, text in items:
+                        _add("text", row_idx, text, _text_messages(text, text_p))
+                elif modality == "image":
+                    def _one(i, item):
+                        row_idx, url = item
+                        norm_bytes, fmt, dl_time, size, error = _prepare_image(model_id, url)
+                        messages = None if error else _image_messages(norm_bytes, fmt, img_p)
+                        _add("image", row_idx, url, messages, error, dl_time, size, len(norm_bytes or b""))
+
+                    # Downloads run on the executor; each row is written as soon as it is ready
+                    map_ordered(_one, items, executor, collect=False)
+                else:
+                    for row_idx, value in items:
+                        _add(modality, row_idx, value,
+                             error=f"Batch inference mode does not support {modality} rows")
+        finally:
+            records.close()
+
+    logger.info("Exported %d batch records in %d file(s), %d rows failed before submission",
+                records.records, records.files, errors)
+    return {"records": records.records, "files": records.files, "errors": errors}
+
+
+# ---------------------------------------------------------------------------
+# Step 2: backends
+# ---------------------------------------------------------------------------
+
+class BatchBackend:
+    """Interface for running a directory of batch input files as one job."""
+
+    name = "base"
+    completes_on_its_own = True  # False when the job only finishes once someone supplies the output
+
+    def submit(self, input_dir, job_name, model_id):
+        """Start a job over every *.jsonl in input_dir and return its job ID."""
+        raise NotImplementedError
+
+    def status(self, job_id):
+        """Return (status, message); status uses Bedrock's job state names."""
+        raise NotImplementedError
+
+    def download_output(self, job_id, dest_dir):
+        """Copy the job's *.jsonl.out files into dest_dir and return their paths."""
+        raise NotImplementedError
+
+
+class LocalBatchBackend(BatchBackend):
+    """File-based stand-in for Bedrock batch inference.
+
+    submit() copies the input files to <root>/<job_id>/input/. If a responder is given, it is
+    called as responder(record) -> modelOutput for every record and the output files are
+    written immediately; otherwise the job stays InProgress until matching
+    <root>/<job_id>/output/<file>.out files are dropped in by hand or by another tool
+    (completes_on_its_own is then False, so nothing should wait for it).
+    """
+
+    name = "local"
+
+    def __init__(self, root, responder=None):
+        self.root = root
+        self.responder = responder
+
+    @property
+    def completes_on_its_own(self):
+        return self.responder is not None
+
+    def output_dir(self, job_id):
+        """Where the output files of a job without a responder are expected."""
+        return os.path.join(self._job_dir(job_id), "output")
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.root, job_id)
+
+    def submit(self, input_dir, job_name, model_id):
+        job_dir = self._job_dir(job_name)
+        if os.path.isdir(job_dir):
+            shutil.rmtree(job_dir)
+        shutil.copytree(input_dir, os.path.join(job_dir, "input"))
+        os.makedirs(os.path.join(job_dir, "output"))
+        if self.responder is not None:
+            for path in sorted(glob.glob(os.path.join(job_dir, "input", "*.jsonl"))):
+                out_path = os.path.join(job_dir, "output", os.path.basename(path) + ".out")
+                with open(path, encoding="utf-8") as src, open(out_path, "w", encoding="utf-8") as dst:
+                    for line in src:
+                        record = json.loads(line)
+                        try:
+                            record["modelOutput"] = self.responder(record)
+                        except Exception as exc:
+                            record["error"] = {"errorCode": 500, "errorMessage": str(exc)}
+                        dst.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return job_name
+
+    def status(self, job_id):
+        job_dir = self._job_dir(job_id)
+        if not os.path.isdir(job_dir):
+            return "Failed", f"Unknown local job {job_id}"
+        inputs = glob.glob(os.path.join(job_dir, "input", "*.jsonl"))
+        done = [p for p in inputs if os.path.exists(
+            os.path.join(job_dir, "output", os.path.basename(p) + ".out"))]
+        if len(done) == len(inputs):
+            return "Completed", ""
+        return "InProgress", f"{len(done)}/{len(inputs)} output files present"
+
+    def download_output(self, job_id, dest_dir):
+        os.makedirs(dest_dir, exist_ok=True)
+        paths = []
+        for path in sorted(glob.glob(os.path.join(self._job_dir(job_id), "output", "*.jsonl.out"))):
+            dest = os.path.join(dest_dir, os.path.basename(path))
+            shutil.copyfile(path, dest)
+            paths.append(dest)
+        return paths
+
+
+def _split_s3_uri(uri):
+    if not uri.startswith("s3://"):
+        raise ValueError(f"Invalid S3 URI: {uri}. S3 URI must start with 's3://'")
+    bucket, _, prefix = uri[len("s3://"):].partition("/")
+    return bucket, prefix.strip("/")
+
+
+class BedrockBatchBackend(BatchBackend):
+    """Runs the job with Bedrock CreateModelInvocationJob, staging files under s3_uri.
+
+    role_arn is the service role Bedrock assumes to read the input and write the output.
+    Both are only needed to submit; polling and downloading work from the job ID alone.
+    """
+
+    name = "bedrock"
+
+    def __init__(self, s3_uri=None, role_arn=None, client=None, s3=None):
+        self.s3_uri = s3_uri
+        self.role_arn = role_arn
+        if client is None:
+            import boto3
+            client = boto3.client("bedrock", region_name=aws_clients.region, config=aws_clients.client_config())
+        self.client = client
+        self.s3 = s3 or aws_clients.s3_client
+
+    def submit(self, input_dir, job_name, model_id):
+        if not self.s3_uri or not self.role_arn:
+            raise ValueError("Submitting a Bedrock batch job needs --batch-s3-uri and --batch-role-arn")
+        bucket, prefix = _split_s3_uri(self.s3_uri)
+
+        def _key(*parts):
+            return "/".join(p for p in (prefix,) + parts if p)
+
+        for path in sorted(glob.glob(os.path.join(input_dir, "*.jsonl"))):
+            self.s3.upload_file(path, bucket, _key(job_name, "input", os.path.basename(path)))
+        resp = self.client.create_model_invocation_job(
+            jobName=job_name,
+            roleArn=self.role_arn,
+            modelId=model_id,
+            inputDataConfig={"s3InputDataConfig": {
+                "s3Uri": f"s3://{bucket}/{_key(job_name, 'input')}/",
+                "s3InputFormat": "JSONL",
+            }},
+            outputDataConfig={"s3OutputDataConfig": {
+                "s3Uri": f"s3://{bucket}/{_key(job_name, 'output')}/",
+            }},
+        )
+        return resp["jobArn"]
+
+    def status(self, job_id):
+        resp = self.client.get_model_invocation_job(jobIdentifier=job_id)
+        return resp["status"], resp.get("message", "")
+
+    def download_output(self, job_id, dest_dir):
+        resp = self.client.get_model_invocation_job(jobIdentifier=job_id)
+        out_bucket, out_prefix = _split_s3_uri(resp["outputDataConfig"]["s3OutputDataConfig"]["s3Uri"])
+        # Bedrock writes the output under <output prefix>/<job id>/
+        job_prefix = "/".join(p for p in (out_prefix, job_id.rsplit("/", 1)[-1]) if p) + "/"
+        os.makedirs(dest_dir, exist_ok=True)
+        paths = []
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=out_bucket, Prefix=job_prefix):
+            for obj in page.get("Contents", []):
+                if obj["Key"].endswith(".jsonl.out"):
+                    dest = os.path.join(dest_dir, os.path.basename(obj["Key"]))
+                    self.s3.download_file(out_bucket, obj["Key"], dest)
+                    paths.append(dest)
+        return paths
+
+
+# ---------------------------------------------------------------------------
+# Job bookkeeping
+# ---------------------------------------------------------------------------
+
+def submit_batch(backend, work_dir, model_id, lang=DEFAULT_LANG, job_name=None):
+    """Submit the exported records and remember the job in work_dir/job.json."""
+    job_name = job_name or f"content-moderation-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    job_id = backend.submit(os.path.join(work_dir, "input"), job_name, model_id)
+    with open(os.path.join(work_dir, "job.json"), "w", encoding="utf-8") as f:
+        json.dump({"backend": backend.name, "job_id": job_id, "job_name": job_name,
+                   "model_id": model_id, "lang": lang}, f, indent=2)
+    logger.info("Submitted batch job %s (%s backend)", job_id, backend.name)
+    return job_id
+
+
+def load_job(work_dir):
+    """Return the job.json written by submit_batch()."""
+    path = os.path.join(work_dir, "job.json")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"No submitted batch job in {work_dir} (run the submit step first)")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def wait_for_job(backend, job_id, poll_interval=60, timeout=None):
+    """Poll until the job reaches a terminal state; returns (status, message).
+
+    Raises TimeoutError if the job is still running after timeout seconds (None waits forever).
+    """
+    deadline = time.time() + timeout if timeout else None
+    while True:
+        status, message = backend.status(job_id)
+        logger.info("Batch job %s: %s %s", job_id, status, message or "")
+        if status in TERMINAL_STATUSES:
+            return status, message
+        if deadline and time.time() >= deadline:
+            raise TimeoutError(f"Batch job {job_id} still {status} after {timeout}s")
+        remaining = deadline - time.time() if deadline else poll_interval
+        time.sleep(max(0, min(poll_interval, remaining)))
+
+
+def fetch_output(backend, job_id, work_dir):
+    """Replace work_dir/output with the job's output files; returns their paths."""
+    out_dir = os.path.join(work_dir, "output")
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    return backend.download_output(job_id, out_dir)
+
+
+# ---------------------------------------------------------------------------
+# Step 3: import
+# ---------------------------------------------------------------------------
+
+def _text_result(entry, model_id, raw, error):
+    return TextModerationResult(
+        row_index=entry["row_index"],
+        original_text=entry["value"],
+        model_id=model_id,
+        moderation_time_sec=0.0,
+        moderation=_parse_moderation_response(raw) if raw else None,
+        raw_llm_response=raw,
+        error=error,
+    )
+
+
+def _image_result(entry, model_id, raw, error):
+    if error:
+        return image_error_result(entry["row_index"], entry["value"], model_id, error,
+                                  entry["download_time_sec"], entry["size_bytes"])
+    return ImageModerationResult(
+        row_index=entry["row_index"], image_url=entry["value"], model_id=model_id,
+        download_time_sec=entry["download_time_sec"], moderation_time_sec=0.0,
+        image_size_bytes=entry["size_bytes"], moderation=_parse_moderation_response(raw),
+        raw_llm_response=raw, error=None, sent_size_bytes=entry.get("sent_bytes", 0),
+    )
+
+
+def _video_result(entry, model_id, raw, error):
+    # Video rows are never submitted; they only come back with their export error
+    return video_error_result(entry["row_index"], entry["value"], model_id, error, method="unsupported")
+
+
+_RESULT_BUILDERS = {"text": _text_result, "image": _image_result, "video": _video_result}
+
+
+def _result(entry, model_id, raw="", error=None):
+    return _RESULT_BUILDERS[entry["modality"]](entry, model_id, raw, error)
+
+
+def import_batch(work_dir, model_id, on_result):
+    """Parse the job output in work_dir/output into result dataclasses.
+
+    on_result(modality, result) is called once per manifest row: rows that failed before
+    submission keep their error, records the job failed or skipped get an error result, and
+    the rest are parsed with _parse_moderation_response(). Returns the number of rows.
+    Only the manifest entries of submitted rows are held in memory while the output is read.
+    """
+    pending = {}
+    count = 0
+    with open(os.path.join(work_dir, "manifest.jsonl"), encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry["error"]:
+                on_result(entry["modality"], _result(entry, model_id, error=entry["error"]))
+                count += 1
+            else:
+                pending[entry["recordId"]] = entry
+
+    for path in sorted(glob.glob(os.path.join(work_dir, "output", "*.jsonl.out"))):
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as exc:
+                    logger.warning("Skipping unreadable output line %s:%d: %s", path, line_no, exc)
+                    continue
+                entry = pending.pop(record.get("recordId"), None)
+                if entry is None:
+                    continue
+                if record.get("error"):
+                    err = record["error"]
+                    msg = err.get("errorMessage", str(err)) if isinstance(err, dict) else str(err)
+                    result = _result(entry, model_id, error=f"Batch record failed: {msg}")
+                else:
+                    raw = _output_text(record.get("modelOutput") or {})
+                    if raw:
+                        result = _result(entry, model_id, raw=raw)
+                    else:
+                        result = _result(entry, model_id, error="Model returned empty response")
+                on_result(entry["modality"], result)
+                count += 1
+
+    for entry in pending.values():
+        on_result(entry["modality"], _result(entry, model_id, error="No output for record in batch job"))
+        count += 1
+    if pending:
+        logger.warning("%d batch records had no output", len(pending))
+    return count
@@ -0,0 +1,204 @@
+"""Append-only checkpoint journal for batch runs.
+
+Every finished row is appended as one JSON line keyed by modality and row_index, so an
+interrupted run can be resumed and the final reports rebuilt without re-calling Bedrock.
+The first line records the run the rows belong to (input file, models, language); a journal
+is only resumed by the same run.
+"""
+
+import json
+import logging
+import os
+import threading
+from array import array
+
+from models import (
+    ComprehendSignals,
+    ModerationCategory,
+    ModerationResult,
+    TextModerationResult,
+    ImageModerationResult,
+    VideoModerationResult,
+)
+from output_formatter import JsonlResultWriter
+
+logger = logging.getLogger(__name__)
+
+_RESULT_TYPES = {
+    "text": TextModerationResult,
+    "image": ImageModerationResult,
+    "video": VideoModerationResult,
+}
+
+_CATEGORY_NAMES = ("pornography", "violence", "tobacco_alcohol", "political_sensitivity", "profanity")
+
+
+def result_from_dict(modality, data):
+    """Rebuild a frozen result dataclass from its asdict() form."""
+    data = dict(data)
+    mod = data.get("moderation")
+    if mod is not None:
+        mod = dict(mod)
+        for name in _CATEGORY_NAMES:
+            mod[name] = ModerationCategory(**mod[name])
+        data["moderation"] = ModerationResult(**mod)
+    if data.get("comprehend") is not None:
+        data["comprehend"] = ComprehendSignals(**data["comprehend"])
+    return _RESULT_TYPES[modality](**data)
+
+
+def _parse_header(line):
+    """The run_info dict of a journal header line, or None if line is not a header."""
+    try:
+        rec = json.loads(line)
+    except ValueError:
+        return None
+    return rec.get("checkpoint") if isinstance(rec, dict) else None
+
+
+class CheckpointMismatchError(ValueError):
+    """The journal was written by a run with a different input file, model or language."""
+
+
+class CheckpointJournal:
+    """Thread-safe append-only JSONL journal of finished rows.
+
+    Results are not kept in memory: per modality the journal only remembers where each row's
+    latest line starts in the file (an 8-byte slot per row), and results() reads them back.
+
+    run_info (dict, e.g. input path, model, lang) is written as the header line of a new
+    journal, and load() refuses a journal whose header differs.
+    """
+
+    def __init__(self, path, run_info=None):
+        self.path = path
+        self.run_info = run_info
+        self._lock = threading.Lock()
+        # modality -> array indexed by row_index: -1 missing, offset >= 0 ok, -2 - offset failed
+        self._offsets = {m: array("q") for m in _RESULT_TYPES}
+        self._writer = JsonlResultWriter(path)
+
+    def _set(self, modality, row_idx, offset, failed):
+        slots = self._offsets[modality]
+        if row_idx >= len(slots):
+            slots.extend([-1] * (row_idx + 1 - len(slots)))
+        slots[row_idx] = -2 - offset if failed else offset  # last write wins
+
+    def _get(self, modality, row_idx):
+        """(offset, failed) for a journaled row, or None."""
+        slots = self._offsets[modality]
+        slot = slots[row_idx] if row_idx < len(slots) else -1
+        if slot == -1:
+            return None
+        return (slot, False) if slot >= 0 else (-2 - slot, True)
+
+    def _check_header(self, header):
+        if self.run_info is None:
+            return
+        if header is None:
+            logger.warning("Checkpoint %s has no run header; cannot check that it belongs to this input and model",
+                           self.path)
+            return
+        diffs = [f"{key} {header.get(key)!r} != {value!r}" for key, value in self.run_info.items()
+                 if header.get(key) != value]
+        if diffs:
+            raise CheckpointMismatchError(
+                f"Checkpoint {self.path} belongs to another run ({'; '.join(diffs)}); "
+                "use a different --checkpoint or run without --resume/--retry-failed"
+            )
+
+    def load(self):
+        """Index an existing journal. Truncated trailing lines from a crash are ignored.
+
+        Raises CheckpointMismatchError if its header does not match run_info.
+        """
+        if not os.path.exists(self.path):
+            return self
+        loaded = 0
+        with open(self.path, "rb") as f:
+            first = f.readline()
+            header = _parse_header(first)
+            if first.strip():
+                self._check_header(header)
+            offset = len(first) if header is not None else 0
+            f.seek(offset)
+            for line_no, line in enumerate(f, 1 if header is None else 2):
+                line_offset, offset = offset, offset + len(line)
+                if not line.strip():
+                    continue
+                try:
+                    rec = json.loads(line)
+                    modality, result = rec["modality"], rec["result"]
+                    self._set(modality, int(result["row_index"]), line_offset, bool(result.get("error")))
+                except (ValueError, KeyError, TypeError) as exc:
+                    logger.warning("Skipping unreadable checkpoint line %d: %s", line_no, exc)
+                    continue
+                loaded += 1
+        logger.info("Loaded %d checkpointed rows from %s", loaded, self.path)
+        return self
+
+    def start_fresh(self):
+        """Begin a new journal, keeping the previous one as <path>.prev."""
+        if os.path.exists(self.path):
+            os.replace(self.path, self.path + ".prev")
+        self._offsets = {m: array("q") for m in _RESULT_TYPES}
+        return self
+
+    def open(self):
+        if self.run_info is not None and (not os.path.exists(self.path) or os.path.getsize(self.path) == 0):
+            with open(self.path, "ab") as f:
+                f.write((json.dumps({"checkpoint": self.run_info}, ensure_ascii=False) + "\n").encode("utf-8"))
+        self._writer.open()
+        return self
+
+    def close(self):
+        self._writer.close()
+
+    def record(self, modality, result):
+        """Append one finished row and flush so it survives a crash or Ctrl-C."""
+        offset = self._writer.write(modality, result)
+        if offset is None:  # journal already closed after an interrupt
+            logger.warning("Journal closed; %s row %d finished too late and will run again on --resume",
+                           modality, result.row_index)
+            return
+        with self._lock:
+            self._set(modality, result.row_index, offset, bool(result.error))
+
+    def pending(self, modality, items, resume=False, retry_failed=False):
+        """Lazily filter (row_index, value) items down to the rows that still need to run.
+
+        resume skips every journaled row; retry_failed keeps journaled rows whose error is set.
+        With neither flag, everything runs. With only retry_failed, rows missing from the
+        journal are skipped as well.
+        """
+        for row_idx, value in items:
+            if not (resume or retry_failed):
+                yield row_idx, value
+                continue
+            prev = self._get(modality, row_idx)
+            if prev is None:
+                if resume:
+                    yield row_idx, value
+            elif retry_failed and prev[1]:
+                yield row_idx, value
+
+    def count(self, modality):
+        """Number of journaled rows for one modality."""
+        return sum(1 for slot in self._offsets[modality] if slot != -1)
+
+    def results(self, modality, row_indices=None):
+        """Lazily yield journaled results for one modality in row order.
+
+        Optionally restricted to row_indices. Only one result is held in memory at a time.
+        """
+        wanted = set(row_indices) if row_indices is not None else None
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            for row_idx in range(len(self._offsets[modality])):
+                entry = self._get(modality, row_idx)
+                if entry is None or (wanted is not None and row_idx not in wanted):
+                    continue
+                f.seek(entry[0])
+                rec = json.loads(f.readline())
+                yield result_from_dict(modality, rec["result"])
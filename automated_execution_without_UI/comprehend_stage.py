@@ -0,0 +1,193 @@
+"""Amazon Comprehend signals for text rows, using the batch APIs.
+
+Rows are analysed a chunk at a time: dominant language for up to 25 documents per
+BatchDetectDominantLanguage call, then sentiment, entities and key phrases with the
+Batch* calls for each language group, and toxicity with DetectToxicContent requests
+that pack the sentence-aligned segments of several English texts together.
+"""
+
+import logging
+import threading
+from dataclasses import replace
+
+from config import (
+    COMPREHEND_LANGUAGE_SUPPORT,
+    COMPREHEND_TOXIC_SEGMENT_BYTES,
+    COMPREHEND_TOXIC_SEGMENTS_PER_REQUEST,
+)
+from models import ComprehendSignals
+from parent_modules import load_parent_module
+
+logger = logging.getLogger(__name__)
+
+aws_clients = load_parent_module("aws_clients")
+chunk_text = load_parent_module("text_chunking").chunk_text
+
+COMPREHEND_BATCH_SIZE = 25  # documents per Batch* call (API maximum)
+COMPREHEND_CHUNK_ROWS = 100  # rows analysed together, so language groups fill whole batches
+_BATCH_DOC_BYTES = 5000  # per-document limit of the Batch* APIs; longer texts are truncated
+_TOXIC_LABEL_MIN_SCORE = 0.5
+
+# Key for the adaptive throttle controller in aws_clients (shared by all Comprehend calls)
+_THROTTLE_KEY = "comprehend"
+
+
+def _utf8_prefix(text, max_bytes):
+    return text.encode("utf-8")[:max_bytes].decode("utf-8", "ignore")
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _call(api, **kwargs):
+    client = aws_clients.comprehend_client  # looked up per call: configure_transport() rebuilds it
+    return aws_clients.call_with_adaptive_retry(_THROTTLE_KEY, lambda: getattr(client, api)(**kwargs))
+
+
+def _batch(api, rows, docs, language_code, state, apply):
+    """Run a Batch* API over rows in groups of 25; apply(state_for_row, result_item) records each result."""
+    for group in _chunks(rows, COMPREHEND_BATCH_SIZE):
+        kwargs = {"TextList": [docs[row] for row in group]}
+        if language_code:
+            kwargs["LanguageCode"] = language_code
+        try:
+            response = _call(api, **kwargs)
+        except Exception as exc:
+            logger.warning("Comprehend %s failed for %d rows: %s", api, len(group), exc)
+            for row in group:
+                state[row]["errors"].append(f"{api}: {exc}")
+            continue
+        for item in response.get("ResultList", []):
+            apply(state[group[item["Index"]]], item)
+        for item in response.get("ErrorList", []):
+            state[group[item["Index"]]]["errors"].append(f"{api}: {item.get('ErrorMessage', item.get('ErrorCode'))}")
+
+
+def _set_language(s, item):
+    best = max(item.get("Languages", []), key=lambda lang: lang["Score"], default=None)
+    if best:
+        s["language"], s["language_score"] = best["LanguageCode"], round(best["Score"], 4)
+
+
+def _set_sentiment(s, item):
+    s["sentiment"] = item["Sentiment"]
+    s["sentiment_score"] = round(item["SentimentScore"][item["Sentiment"].capitalize()], 4)
+
+
+def _set_entities(s, item):
+    s["entities"] = [f"{e['Type']}: {e['Text']}" for e in item.get("Entities", [])]
+
+
+def _set_key_phrases(s, item):
+    s["key_phrases"] = [kp["Text"] for kp in item.get("KeyPhrases", [])]
+
+
+_GROUP_ANALYSES = (
+    ("sentiment", "batch_detect_sentiment", _set_sentiment),
+    ("entities", "batch_detect_entities", _set_entities),
+    ("key_phrases", "batch_detect_key_phrases", _set_key_phrases),
+)
+
+
+def _toxicity(rows, texts, state):
+    """Pack the segments of several texts into each DetectToxicContent call and fold the scores back per row."""
+    segments = [
+        (row, texts[row][start:end])
+        for row in rows for start, end in chunk_text(texts[row], COMPREHEND_TOXIC_SEGMENT_BYTES)
+    ]
+    for group in _chunks(segments, COMPREHEND_TOXIC_SEGMENTS_PER_REQUEST):
+        try:
+            response = _call(
+                "detect_toxic_content", TextSegments=[{"Text": seg} for _, seg in group], LanguageCode="en",
+            )
+        except Exception as exc:
+            logger.warning("Comprehend detect_toxic_content failed for %d segments: %s", len(group), exc)
+            for row in {row for row, _ in group}:
+                state[row]["errors"].append(f"detect_toxic_content: {exc}")
+            continue
+        for (row, _), result in zip(group, response.get("ResultList", [])):
+            s = state[row]
+            s["toxicity"] = round(max(s["toxicity"] or 0.0, result.get("Toxicity", 0.0)), 4)
+            for label in result.get("Labels", []):
+                if label["Score"] >= _TOXIC_LABEL_MIN_SCORE and label["Name"] not in s["toxic_labels"]:
+                    s["toxic_labels"].append(label["Name"])
+
+
+def analyze_texts(items):
+    """Comprehend signals for a list of (row_index, text) pairs.
+
+    Returns {row_index: ComprehendSignals}. Analyses the detected language does not support
+    (see COMPREHEND_LANGUAGE_SUPPORT) are left empty; failed calls are listed in .error.
+    """
+    texts = {row: text for row, text in items}
+    state = {
+        row: {"language": "", "language_score": 0.0, "sentiment": None, "sentiment_score": None,
+              "entities": [], "key_phrases": [], "toxicity": None, "toxic_labels": [], "errors": []}
+        for row in texts
+    }
+    docs = {row: _utf8_prefix(text, _BATCH_DOC_BYTES) for row, text in texts.items() if text.strip()}
+    for row in texts.keys() - docs.keys():
+        state[row]["errors"].append("empty text")
+
+    _batch("batch_detect_dominant_language", list(docs), docs, None, state, _set_language)
+
+    by_language = {}
+    for row in docs:
+        if state[row]["language"]:
+            by_language.setdefault(state[row]["language"], []).append(row)
+
+    for language, rows in by_language.items():
+        for analysis, api, apply in _GROUP_ANALYSES:
+            if language in COMPREHEND_LANGUAGE_SUPPORT[analysis]:
+                _batch(api, rows, docs, language, state, apply)
+    # Toxicity reads the full text (segments are packed, so nothing is truncated)
+    toxic_rows = [row for language, rows in by_language.items()
+                  if language in COMPREHEND_LANGUAGE_SUPPORT["toxicity"] for row in rows]
+    if toxic_rows:
+        _toxicity(toxic_rows, texts, state)
+
+    signals = {}
+    for row, s in state.items():
+        errors = s.pop("errors")
+        signals[row] = ComprehendSignals(**s, error="; ".join(errors) or None)
+    return signals
+
+
+class ComprehendStage:
+    """Runs ahead of the text LLM calls and attaches Comprehend signals to their results.
+
+    feed() wraps the stream of (row_index, text) items: every COMPREHEND_CHUNK_ROWS rows are
+    analysed with the batch APIs just before they are handed on, so the calls overlap with
+    the LLM work already in flight. attach() adds a row's signals to its result.
+    """
+
+    def __init__(self, chunk_rows=COMPREHEND_CHUNK_ROWS):
+        self.chunk_rows = chunk_rows
+        self._signals = {}
+        self._lock = threading.Lock()
+
+    def feed(self, texts):
+        chunk = []
+        for item in texts:
+            chunk.append(item)
+            if len(chunk) >= self.chunk_rows:
+                yield from self._analyze(chunk)
+                chunk = []
+        if chunk:
+            yield from self._analyze(chunk)
+
+    def _analyze(self, chunk):
+        try:
+            signals = analyze_texts(chunk)
+        except Exception as exc:  # never hold back the LLM moderation of these rows
+            logger.error("Comprehend stage failed for rows %d-%d: %s", chunk[0][0], chunk[-1][0], exc)
+            signals = {row: ComprehendSignals(language="", error=str(exc)) for row, _ in chunk}
+        with self._lock:
+            self._signals.update(signals)
+        return chunk
+
+    def attach(self, result):
+        with self._lock:
+            signals = self._signals.pop(result.row_index, None)
+        return replace(result, comprehend=signals) if signals is not None else result
@@ -0,0 +1,76 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+# ---------------------------------------------------------------------------
+# Per-model concurrency cap
+# ---------------------------------------------------------------------------
+
+class ModelLimiter:
+    """Cap the number of in-flight moderation calls per model ID.
+
+    A limit of None or 0 disables the cap.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def _semaphore(self, model_id):
+        with self._lock:
+            sem = self._semaphores.get(model_id)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.limit)
+                self._semaphores[model_id] = sem
+            return sem
+
+    @contextmanager
+    def slot(self, model_id):
+        if not self.limit:
+            yield
+            return
+        with self._semaphore(model_id):
+            yield
+
+
+# ---------------------------------------------------------------------------
+# Ordered map over a worker pool
+# ---------------------------------------------------------------------------
+
+DEFAULT_MAX_PENDING = 256  # rows read ahead per runner in concurrent mode
+
+
+def make_executor(concurrency):
+    """Return a ThreadPoolExecutor for concurrency > 1, else None (sequential)."""
+    if concurrency and concurrency > 1:
+        return ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="moderation")
+    return None
+
+
+def map_ordered(func, items, executor=None, max_pending=None, collect=True):
+    """Apply func(i, item) to every item and return the results in input order.
+
+    items may be any iterable, including a lazy reader; at most max_pending items
+    are pulled ahead of the oldest unfinished one.
+    With executor=None the items are processed one after another in the calling thread.
+    With collect=False nothing is kept and None is returned, for callers that stream each
+    result from inside func.
+    """
+    results = [] if collect else None
+    keep = results.append if collect else (lambda result: None)
+    if executor is None:
+        for i, item in enumerate(items):
+            keep(func(i, item))
+        return results
+    max_pending = max_pending or DEFAULT_MAX_PENDING
+    pending = deque()
+    for i, item in enumerate(items):
+        if len(pending) >= max_pending:
+            keep(pending.popleft().result())
+        pending.append(executor.submit(func, i, item))
+    while pending:
+        keep(pending.popleft().result())
+    return results
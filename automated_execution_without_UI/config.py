@@ -1,11 +1,9 @@
-import importlib.util
 import os
 
+from parent_modules import load_parent_module
+
 # Import MODEL_LIST and MODEL_PRICES from the parent project's config.py
-_parent_config_path = os.path.join(os.path.dirname(__file__), "..", "config.py")
-_spec = importlib.util.spec_from_file_location("parent_config", _parent_config_path)
-_parent_config = importlib.util.module_from_spec(_spec)
-_spec.loader.exec_module(_parent_config)
+_parent_config = load_parent_module("config")
 
 MODEL_LIST = _parent_config.MODEL_LIST
 MODEL_PRICES = _parent_config.MODEL_PRICES
@@ -28,8 +26,40 @@ INVOKE_MODEL_IMAGE_MODELS = set(_parent_config._MODELS_TEXT_IMAGE_INVOKE)
 # Text + Image + Video — supports direct video understanding (Nova)
 DIRECT_VIDEO_MODELS = set(_parent_config._MODELS_TEXT_IMAGE_VIDEO)
 
+# Result cache defaults (overridable with --cache-* flags)
+RESULT_CACHE_PATH = _parent_config.RESULT_CACHE_PATH
+RESULT_CACHE_TTL = _parent_config.RESULT_CACHE_TTL
+RESULT_CACHE_MAX_MB = _parent_config.RESULT_CACHE_MAX_MB
+
+# Near-duplicate frame removal (overridable with --frame-dedup-threshold)
+FRAME_DEDUP_THRESHOLD = _parent_config.FRAME_DEDUP_THRESHOLD
+FRAME_HASH_METHOD = _parent_config.FRAME_HASH_METHOD
+FRAME_BACKEND = _parent_config.FRAME_BACKEND
+
+# Comprehend stage (--comprehend): which analyses each language supports
+COMPREHEND_LANGUAGE_SUPPORT = _parent_config.COMPREHEND_LANGUAGE_SUPPORT
+COMPREHEND_TOXIC_SEGMENT_BYTES = _parent_config.COMPREHEND_TOXIC_SEGMENT_BYTES
+COMPREHEND_TOXIC_SEGMENTS_PER_REQUEST = _parent_config.COMPREHEND_TOXIC_SEGMENTS_PER_REQUEST
+
+# Long texts are moderated as sentence-aligned chunks in parallel (overridable with --long-text-chunk-bytes)
+LONG_TEXT_CHUNK_BYTES = _parent_config.LONG_TEXT_CHUNK_BYTES
+
+# Near-duplicate texts reuse the verdict of their cluster leader (overridable with --near-dup-threshold)
+NEAR_DUP_TEXT_THRESHOLD = _parent_config.NEAR_DUP_TEXT_THRESHOLD
+NEAR_DUP_TEXT_MIN_CHARS = _parent_config.NEAR_DUP_TEXT_MIN_CHARS
+NEAR_DUP_TEXT_MAX_ENTRIES = _parent_config.NEAR_DUP_TEXT_MAX_ENTRIES
+
 MEDIA_DOWNLOAD_TIMEOUT = 60
+
+# Media downloads (overridable with --max-media-mb / --media-cache-* flags)
+MEDIA_MAX_MB = 1024  # larger files are rejected before or while downloading
+IMAGE_MAX_MB = 64  # images are read into memory to be decoded, so they get a lower cap than videos
+MEDIA_CACHE_DIR = os.path.join(os.path.dirname(RESULT_CACHE_PATH), "media")
+MEDIA_CACHE_MAX_MB = 2048
+RANGE_DOWNLOAD_MIN_MB = 32  # files at least this large are fetched with parallel Range requests
+RANGE_DOWNLOAD_PARTS = 4
 VIDEO_FRAME_COUNT = 5
+PACKED_TEXT_MAX_CHARS = 500  # longer texts are never packed, they go through moderate_text alone
 DEFAULT_LANG = "zh"
 
 # ---------------------------------------------------------------------------
@@ -74,15 +104,55 @@ _SYSTEM_PROMPTS = {
     ),
 }
 
+# Text categories are shared by the single-item and packed text prompts
+_TEXT_CATEGORIES = {
+    "zh": """1. **pornography（色情）**: 性内容、裸露描写、露骨的性暗示
+2. **violence（暴力）**: 身体伤害描写、威胁、血腥、武器
+3. **tobacco_alcohol（烟酒）**: 推广或美化吸烟、饮酒、药物滥用
+4. **political_sensitivity（政治敏感）**: 涉及中国领导人（习近平、毛泽东等）、中国地缘政治（台湾、西藏、香港、新疆）、批评中共、天安门、法轮功、涉及独裁/专制/极权/威权/暴政/集权统治等描述或指控、煽动颠覆政权、分裂国家
+5. **profanity（污言秽语）**: 脏话、骂人、侮辱性语言、人身攻击、威胁恐吓、低俗粗鄙表达""",
+    "en": """1. **pornography**: Sexual content, nudity descriptions, explicit sexual references
+2. **violence**: Descriptions of physical harm, threats, gore, weapons
+3. **tobacco_alcohol**: Promotion or glorification of smoking, drinking, drug use
+4. **political_sensitivity**: References to Chinese leaders (Xi Jinping, Mao Zedong, etc.), Chinese geopolitics (Taiwan, Tibet, Hong Kong, Xinjiang), CCP criticism, Tiananmen, Falun Gong, accusations or descriptions of dictatorship/authoritarianism/totalitarianism/tyranny/autocracy, incitement to subvert state power or secession
+5. **profanity**: Swearing, cursing, insults, personal attacks, threatening language, vulgar or obscene expressions""",
+}
+
+# ---------------------------------------------------------------------------
+# Lexicon pre-filter (--lexicon-policy) — terms from the text categories above
+# ---------------------------------------------------------------------------
+
+# category -> severity -> terms. Matching ignores case, full-width forms, spaces and punctuation
+# between characters, and simple leetspeak (sh1t, @ss); Latin terms only match whole words.
+# Replace with --lexicon-file (JSON of the same shape).
+TEXT_LEXICONS = {
+    "political_sensitivity": {
+        "high": [
+            "法轮功", "法輪功", "falun gong", "六四屠杀", "天安门屠杀", "tiananmen massacre",
+            "台独", "藏独", "疆独", "港独", "颠覆国家政权",
+        ],
+        "medium": [
+            "习近平", "xi jinping", "毛泽东", "mao zedong", "天安门事件", "六四事件",
+            "独裁", "专制", "极权", "暴政", "dictatorship", "totalitarian", "tyranny",
+        ],
+    },
+    "profanity": {
+        "high": ["操你妈", "草泥马", "傻逼", "motherfucker", "fuck you", "cunt"],
+        "medium": ["他妈的", "王八蛋", "混蛋", "fuck", "shit", "bitch", "asshole"],
+    },
+    "violence": {
+        "high": ["炸死你", "杀了你全家", "i will kill you", "bomb the building"],
+    },
+    "pornography": {
+        "high": ["porn", "色情片", "黄片"],
+    },
+}
+
 _TEXT_PROMPTS = {
     "zh": """分析以下文本是否存在内容审核违规。
 
 审核类别：
-1. **pornography（色情）**: 性内容、裸露描写、露骨的性暗示
-2. **violence（暴力）**: 身体伤害描写、威胁、血腥、武器
-3. **tobacco_alcohol（烟酒）**: 推广或美化吸烟、饮酒、药物滥用
-4. **political_sensitivity（政治敏感）**: 涉及中国领导人（习近平、毛泽东等）、中国地缘政治（台湾、西藏、香港、新疆）、批评中共、天安门、法轮功、涉及独裁/专制/极权/威权/暴政/集权统治等描述或指控、煽动颠覆政权、分裂国家
-5. **profanity（污言秽语）**: 脏话、骂人、侮辱性语言、人身攻击、威胁恐吓、低俗粗鄙表达
+{categories}
 
 仅返回以下JSON结构（key使用英文，details和summary使用中文）：
 {json_template}
@@ -94,11 +164,7 @@ _TEXT_PROMPTS = {
     "en": """Analyze the following text for content moderation violations.
 
 Categories to check:
-1. **pornography**: Sexual content, nudity descriptions, explicit sexual references
-2. **violence**: Descriptions of physical harm, threats, gore, weapons
-3. **tobacco_alcohol**: Promotion or glorification of smoking, drinking, drug use
-4. **political_sensitivity**: References to Chinese leaders (Xi Jinping, Mao Zedong, etc.), Chinese geopolitics (Taiwan, Tibet, Hong Kong, Xinjiang), CCP criticism, Tiananmen, Falun Gong, accusations or descriptions of dictatorship/authoritarianism/totalitarianism/tyranny/autocracy, incitement to subvert state power or secession
-5. **profanity**: Swearing, cursing, insults, personal attacks, threatening language, vulgar or obscene expressions
+{categories}
 
 Respond with ONLY this JSON structure:
 {json_template}
@@ -109,6 +175,72 @@ Text to analyze:
 """,
 }
 
+# ---------------------------------------------------------------------------
+# Packed text prompts — several short texts moderated in one call
+# ---------------------------------------------------------------------------
+
+_PACKED_JSON_TEMPLATE = """\
+```json
+[
+  {
+    "id": 0,
+    "categories": {
+      "pornography": {"detected": false, "severity": "none", "details": ""},
+      "violence": {"detected": false, "severity": "none", "details": ""},
+      "tobacco_alcohol": {"detected": false, "severity": "none", "details": ""},
+      "political_sensitivity": {"detected": false, "severity": "none", "details": ""},
+      "profanity": {"detected": false, "severity": "none", "details": ""}
+    },
+    "overall_risk": "safe",
+    "summary": ""
+  }
+]
+```"""
+
+_PACKED_SYSTEM_PROMPTS = {
+    "zh": (
+        "你是一名专业的内容审核专家。你需要从以下五个类别分析内容是否违规："
+        "色情、暴力、烟酒、政治敏感、污言秽语。"
+        "你必须仅返回一个有效的JSON数组，每条输入文本对应一个对象，不要包含任何其他文字。"
+        "每条文本必须独立审核，互不影响。始终保持客观和全面的分析。"
+        "重要：JSON中的key必须使用英文，但details和summary字段的值必须使用中文。"
+    ),
+    "en": (
+        "You are a professional content moderation expert. You analyze content for policy violations "
+        "across five categories: pornography, violence, tobacco/alcohol, political sensitivity, and profanity. "
+        "You MUST respond ONLY with a valid JSON array containing one object per input text, no other text. "
+        "Judge every text independently of the others. "
+        "Always remain objective and thorough in your analysis."
+    ),
+}
+
+_PACKED_TEXT_PROMPTS = {
+    "zh": """分别独立分析以下每条文本是否存在内容审核违规。待审核文本以JSON数组给出，每个元素包含"id"和"text"。
+
+审核类别：
+{categories}
+
+仅返回一个JSON数组，每条输入文本对应一个对象，顺序与输入一致，并原样带上输入的"id"（key使用英文，details和summary使用中文）：
+{json_template}
+
+{severity_note}
+
+待审核文本：
+""",
+    "en": """Analyze each of the following texts independently for content moderation violations. The texts are given as a JSON array of objects with "id" and "text".
+
+Categories to check:
+{categories}
+
+Respond with ONLY a JSON array holding one object per input text, in input order, each carrying the input's "id":
+{json_template}
+
+{severity_note}
+
+Texts to analyze:
+""",
+}
+
 _IMAGE_PROMPTS = {
     "zh": """分析此图片是否存在内容审核违规。
 
@@ -176,10 +308,26 @@ def get_prompts(lang="zh"):
     """Return (system_prompt, text_prompt, image_prompt, video_prompt) for the given language."""
     lang = lang if lang in ("zh", "en") else "zh"
     severity = _SEVERITY_NOTE_ZH if lang == "zh" else _SEVERITY_NOTE_EN
-    fmt = {"json_template": _JSON_TEMPLATE, "severity_note": severity}
+    fmt = {"json_template": _JSON_TEMPLATE, "severity_note": severity, "categories": _TEXT_CATEGORIES[lang]}
     return (
         _SYSTEM_PROMPTS[lang],
         _TEXT_PROMPTS[lang].format(**fmt),
         _IMAGE_PROMPTS[lang].format(**fmt),
         _VIDEO_PROMPTS[lang].format(**fmt),
     )
+
+
+def get_packed_text_prompts(lang="zh"):
+    """Return (system_prompt, text_prompt) for packed multi-text moderation in the given language.
+
+    The text prompt is followed by a JSON array of {"id", "text"} objects; the model answers
+    with a JSON array of per-item verdicts carrying the same ids.
+    """
+    lang = lang if lang in ("zh", "en") else "zh"
+    severity = _SEVERITY_NOTE_ZH if lang == "zh" else _SEVERITY_NOTE_EN
+    return (
+        _PACKED_SYSTEM_PROMPTS[lang],
+        _PACKED_TEXT_PROMPTS[lang].format(
+            json_template=_PACKED_JSON_TEMPLATE, severity_note=severity, categories=_TEXT_CATEGORIES[lang],
+        ),
+    )
@@ -0,0 +1,221 @@
+"""Local lexicon pre-filter for text rows (Aho-Corasick over normalized text).
+
+Every lexicon term is compiled into one Aho-Corasick automaton, so a text is scanned in a
+single pass whatever the number of terms. Text and terms are normalized the same way first:
+NFKC (full-width forms become ASCII), case folding, simple leetspeak, and spaces, punctuation
+and zero-width characters dropped, so "Ｆ ｕ-c k" and "f.u.c.k" match "fuck".
+
+What a match means is set by the policy:
+  shadow          scan and record hits on the result; every row still goes to the LLM
+  block           rows hitting a high-severity term get a lexicon verdict without an LLM call
+  block-and-pass  as block, and rows with no hit at all are returned as safe without an LLM call
+"""
+
+import functools
+import json
+import logging
+import threading
+import time
+import unicodedata
+from collections import deque
+
+from models import ModerationCategory, ModerationResult, TextModerationResult
+
+logger = logging.getLogger(__name__)
+
+LEXICON_POLICIES = ("off", "shadow", "block", "block-and-pass")
+LEXICON_MODEL_ID = "lexicon"  # model_id of rows decided by the pre-filter
+
+_CATEGORY_NAMES = ("pornography", "violence", "tobacco_alcohol", "political_sensitivity", "profanity")
+_SEVERITIES = ("low", "medium", "high")
+
+_LEET = str.maketrans({"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t",
+                       "@": "a", "$": "s", "!": "i", "|": "i"})
+
+_SUMMARIES = {
+    "zh": {"hit": "词库预筛命中：{terms}（未经模型审核）", "clean": "词库预筛未命中任何词条（未经模型审核）",
+           "details": "命中词条：{terms}"},
+    "en": {"hit": "Lexicon pre-filter matched: {terms} (not reviewed by a model)",
+           "clean": "Lexicon pre-filter found no listed terms (not reviewed by a model)",
+           "details": "Matched terms: {terms}"},
+}
+
+
+def normalize(text):
+    """Return (compact, positions): the normalized text and, per character, its index in text.
+
+    Characters that normalize to nothing but letters and digits are dropped, so separators
+    inserted between the characters of a term do not break the match.
+    """
+    compact, positions = [], []
+    for pos, ch in enumerate(text):
+        folded = _fold_char(ch)
+        if folded:
+            compact.append(folded)
+            positions.extend([pos] * len(folded))
+    return "".join(compact), positions
+
+
+@functools.lru_cache(maxsize=65536)
+def _fold_char(ch):
+    return "".join(c for c in unicodedata.normalize("NFKC", ch).casefold().translate(_LEET) if c.isalnum())
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every occurrence of every pattern in one pass over the text."""
+
+    def __init__(self, patterns):
+        """patterns: iterable of (pattern string, payload); payloads are returned with matches."""
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern, payload in patterns:
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((len(pattern), payload))
+
+        # Breadth-first: a state's failure link is the longest proper suffix that is also a prefix
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def matches(self, text):
+        """Yield (start, end, payload) for every pattern occurrence; end is exclusive."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, payload in out[state]:
+                yield i + 1 - length, i + 1, payload
+
+
+def load_lexicons(path):
+    """Read a lexicon JSON file: {category: {severity: [term, ...]}}."""
+    with open(path, encoding="utf-8") as f:
+        lexicons = json.load(f)
+    for category, by_severity in lexicons.items():
+        if category not in _CATEGORY_NAMES:
+            raise ValueError(f"Unknown lexicon category {category!r} (expected one of {', '.join(_CATEGORY_NAMES)})")
+        for severity in by_severity:
+            if severity not in _SEVERITIES:
+                raise ValueError(f"Unknown severity {severity!r} in lexicon category {category!r}")
+    return lexicons
+
+
+def _is_word_char(ch):
+    return ch.isascii() and ch.isalnum()
+
+
+class LexiconFilter:
+    """First-tier text classifier in front of the LLM.
+
+    check() returns a TextModerationResult when the policy lets the lexicon decide a row, or
+    None when the row needs LLM review, together with the row's hits. Counters for avoided
+    LLM calls are kept for stats().
+    """
+
+    def __init__(self, lexicons, policy="block", lang="zh"):
+        if policy not in LEXICON_POLICIES:
+            raise ValueError(f"Unknown lexicon policy: {policy}")
+        self.policy = policy
+        self.lang = lang if lang in _SUMMARIES else "en"
+        patterns = []
+        for category, by_severity in lexicons.items():
+            for severity, terms in by_severity.items():
+                for term in terms:
+                    key, _ = normalize(term)
+                    if key:
+                        # Latin terms must start and end on word boundaries of the original text
+                        patterns.append((key, (category, severity, term, term.isascii())))
+        self.term_count = len(patterns)
+        self._automaton = AhoCorasick(patterns)
+        self._lock = threading.Lock()
+        self._stats = {"scanned": 0, "with_hits": 0, "decided_hit": 0, "decided_clean": 0, "scan_sec": 0.0}
+
+    def hits(self, text):
+        """Matched lexicon entries as (category, severity, term), in order of first occurrence."""
+        compact, positions = normalize(text)
+        found = []
+        for start, end, (category, severity, term, whole_word) in self._automaton.matches(compact):
+            if whole_word:
+                first, last = positions[start], positions[end - 1]
+                if (first > 0 and _is_word_char(text[first - 1])) or \
+                        (last + 1 < len(text) and _is_word_char(text[last + 1])):
+                    continue
+            entry = (category, severity, term)
+            if entry not in found:
+                found.append(entry)
+        return found
+
+    def decides(self, hits):
+        """Whether the policy returns a lexicon verdict for a row with these hits."""
+        if self.policy == "block-and-pass" and not hits:
+            return True
+        return self.policy in ("block", "block-and-pass") and any(sev == "high" for _, sev, _ in hits)
+
+    def check(self, row_index, text):
+        """Scan one text; returns (lexicon verdict or None, hits as "category:severity:term" strings)."""
+        start = time.perf_counter()
+        hits = self.hits(text)
+        decided = self.decides(hits)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            st = self._stats
+            st["scanned"] += 1
+            st["with_hits"] += bool(hits)
+            st["decided_hit" if hits else "decided_clean"] += decided
+            st["scan_sec"] += elapsed
+        labels = [f"{category}:{severity}:{term}" for category, severity, term in hits]
+        if not decided:
+            return None, labels
+        return TextModerationResult(
+            row_index=row_index,
+            original_text=text,
+            model_id=LEXICON_MODEL_ID,
+            moderation_time_sec=round(elapsed, 6),
+            moderation=self._verdict(hits),
+            raw_llm_response="",
+            error=None,
+            lexicon_hits=labels,
+        ), labels
+
+    def _verdict(self, hits):
+        text = _SUMMARIES[self.lang]
+        categories = {}
+        for name in _CATEGORY_NAMES:
+            matched = [(sev, term) for category, sev, term in hits if category == name]
+            if not matched:
+                categories[name] = ModerationCategory(detected=False, severity="none", details="")
+                continue
+            severity = max((sev for sev, _ in matched), key=_SEVERITIES.index)
+            details = text["details"].format(terms=", ".join(term for _, term in matched))
+            categories[name] = ModerationCategory(detected=True, severity=severity, details=details)
+        if not hits:
+            return ModerationResult(**categories, overall_risk="safe", summary=text["clean"])
+        worst = max((sev for _, sev, _ in hits), key=_SEVERITIES.index)
+        summary = text["hit"].format(terms=", ".join(term for _, _, term in hits))
+        return ModerationResult(**categories, overall_risk=worst, summary=summary)
+
+    def stats(self):
+        """Return {'scanned', 'with_hits', 'decided_hit', 'decided_clean', 'llm_calls_avoided', 'scan_sec'}."""
+        with self._lock:
+            st = dict(self._stats)
+        st["llm_calls_avoided"] = st["decided_hit"] + st["decided_clean"]
+        return st
@@ -1,23 +1,35 @@
-import importlib.util
 import json
 import logging
-import os
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-# Import converse_with_model from parent project's aws_clients
-_aws_path = os.path.join(os.path.dirname(__file__), "..", "aws_clients.py")
-_spec = importlib.util.spec_from_file_location("parent_aws_clients", _aws_path)
-_aws_mod = importlib.util.module_from_spec(_spec)
-_spec.loader.exec_module(_aws_mod)
-converse_with_model = _aws_mod.converse_with_model
-bedrock_client = _aws_mod.bedrock_client
+from parent_modules import load_parent_module
 
+# Import converse_with_model and the shared clients from the parent project's aws_clients
+aws_clients = load_parent_module("aws_clients")
+converse_with_model = aws_clients.converse_with_model
+call_with_adaptive_retry = aws_clients.call_with_adaptive_retry
+adaptive_limiter = aws_clients.adaptive_limiter
+
+# Import the shared result cache from the parent project
+result_cache = load_parent_module("result_cache")
+cache_key = result_cache.cache_key
+
+describe_video_prep = load_parent_module("video_preprocess").describe_video_prep
+chunk_text = load_parent_module("text_chunking").chunk_text
+
+from concurrency import ModelLimiter
 from config import (
     DEFAULT_LANG,
     DIRECT_VIDEO_MODELS,
+    FRAME_DEDUP_THRESHOLD,
+    FRAME_HASH_METHOD,
     INVOKE_MODEL_IMAGE_MODELS,
+    LONG_TEXT_CHUNK_BYTES,
+    PACKED_TEXT_MAX_CHARS,
     TEXT_ONLY_MODELS,
+    get_packed_text_prompts,
     get_prompts,
 )
 from models import (
@@ -30,8 +42,11 @@ from models import (
 from media_utils import (
     timed_call,
     download_media,
+    download_media_file,
     normalize_image_bytes,
     extract_video_frames,
+    dedupe_video_frames,
+    prepare_direct_video,
 )
 
 logger = logging.getLogger(__name__)
@@ -62,8 +77,15 @@ def _parse_moderation_response(raw_text):
     except json.JSONDecodeError:
         return None
 
+    return _moderation_from_dict(data)
+
+
+def _moderation_from_dict(data):
+    """Build a ModerationResult from one parsed verdict object, or None if it has no categories."""
+    if not isinstance(data, dict):
+        return None
     cats = data.get("categories", {})
-    if not cats:
+    if not cats or not isinstance(cats, dict):
         return None
 
     def _cat(name):
@@ -85,6 +107,38 @@ def _parse_moderation_response(raw_text):
     )
 
 
+def _parse_packed_response(raw_text):
+    """Extract per-item verdicts from a packed-mode response.
+
+    Expects a JSON array of objects carrying an "id"; tolerates ```json fences and prose.
+    Returns {id: (ModerationResult or None, item_json)}; empty dict if no array can be read.
+    """
+    match = re.search(r"```(?:json)?\s*(\[.*\])\s*```", raw_text, re.DOTALL)
+    text = match.group(1) if match else raw_text
+
+    start = text.find("[")
+    end = text.rfind("]")
+    if start == -1 or end == -1:
+        return {}
+    try:
+        items = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(items, list):
+        return {}
+
+    verdicts = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            item_id = int(item.get("id"))
+        except (TypeError, ValueError):
+            continue
+        verdicts[item_id] = (_moderation_from_dict(item), json.dumps(item, ensure_ascii=False))
+    return verdicts
+
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
@@ -104,7 +158,18 @@ def _uses_invoke_model_for_images(model_id):
 _LLM_ERROR_PREFIXES = ("Model invocation error", "Model returned empty response")
 
 
-def _call_llm(model_id, system_prompt, messages):
+def _cache_lookup(key):
+    """Return the cached entry dict for key, or None."""
+    return result_cache.default_cache().get(key)
+
+
+def _cache_store(key, moderation, raw, **extra):
+    """Cache a response only when it parsed into a ModerationResult."""
+    if moderation is not None:
+        result_cache.default_cache().put(key, {"raw": raw, **extra})
+
+
+def _call_llm(model_id, system_prompt, messages, max_tokens=2000):
     """Call Bedrock Converse API and return (response_text, elapsed_sec).
 
     Raises RuntimeError if the upstream converse_with_model() returns an error string.
@@ -114,7 +179,7 @@ def _call_llm(model_id, system_prompt, messages):
         model_id=model_id,
         system_prompts=[{"text": system_prompt}],
         messages=messages,
-        max_tokens=2000,
+        max_tokens=max_tokens,
         temperature=0.1,
     )
     elapsed = time.time() - start
@@ -128,11 +193,10 @@ import base64
 _MIME_TYPES = {"jpeg": "image/jpeg", "jpg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
 
 
-def _call_invoke_model(model_id, system_prompt, prompt_text, image_bytes_list=None):
-    """Call Bedrock invoke_model with OpenAI-compatible format (for models that don't support Converse image field).
+def _invoke_model_body(system_prompt, prompt_text, image_bytes_list=None, max_tokens=2000):
+    """Build the OpenAI-compatible invoke_model request body (a dict) for one moderation call.
 
     image_bytes_list: list of (bytes, format_str) tuples, or None for text-only.
-    Returns (response_text, elapsed_sec). Raises RuntimeError on failure.
     """
     content_parts = []
 
@@ -153,19 +217,28 @@ def _call_invoke_model(model_id, system_prompt, prompt_text, image_bytes_list=No
     # User prompt text
     content_parts.append({"type": "text", "text": prompt_text})
 
-    body = json.dumps({
+    return {
         "messages": [{"role": "user", "content": content_parts}],
-        "max_tokens": 2000,
+        "max_tokens": max_tokens,
         "temperature": 0.1,
-    })
+    }
+
+
+def _call_invoke_model(model_id, system_prompt, prompt_text, image_bytes_list=None):
+    """Call Bedrock invoke_model with OpenAI-compatible format (for models that don't support Converse image field).
+
+    image_bytes_list: list of (bytes, format_str) tuples, or None for text-only.
+    Returns (response_text, elapsed_sec). Raises RuntimeError on failure.
+    """
+    body = json.dumps(_invoke_model_body(system_prompt, prompt_text, image_bytes_list))
 
     start = time.time()
-    resp = bedrock_client.invoke_model(
+    resp = call_with_adaptive_retry(model_id, lambda: aws_clients.bedrock_client.invoke_model(
         body=body,
         contentType="application/json",
         accept="application/json",
         modelId=model_id,
-    )
+    ))
     elapsed = time.time() - start
 
     result_body = json.loads(resp["body"].read())
@@ -178,20 +251,155 @@ def _call_invoke_model(model_id, system_prompt, prompt_text, image_bytes_list=No
     return text, elapsed
 
 
+# ---------------------------------------------------------------------------
+# Converse message builders
+# ---------------------------------------------------------------------------
+
+def _text_messages(text, prompt):
+    """Converse messages for moderating one text."""
+    return [{"role": "user", "content": [{"text": prompt + text}]}]
+
+
+def _image_messages(norm_bytes, img_fmt, prompt):
+    """Converse messages for moderating one normalized image."""
+    content = [
+        {"image": {"format": img_fmt, "source": {"bytes": norm_bytes}}},
+        {"text": prompt},
+    ]
+    return [{"role": "user", "content": content}]
+
+
 # ---------------------------------------------------------------------------
 # Text moderation
 # ---------------------------------------------------------------------------
 
-def moderate_text(row_index, text, model_id, lang=DEFAULT_LANG, prompt=None, system_prompt=None):
+_text_chunking = {"max_bytes": LONG_TEXT_CHUNK_BYTES}
+
+# Chunk calls of long texts; kept apart from the row workers, which wait on their chunks.
+# Sized by configure_text_chunking() to the run's --concurrency.
+_chunk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="text-chunk")
+
+_SEVERITY_ORDER = ("none", "low", "medium", "high")
+_RISK_ORDER = ("safe", "low", "medium", "high", "critical")
+_CATEGORY_NAMES = ("pornography", "violence", "tobacco_alcohol", "political_sensitivity", "profanity")
+
+
+def configure_text_chunking(max_bytes, max_workers=1):
+    """Set the UTF-8 size above which moderate_text() splits a text into chunks (0 disables).
+
+    max_workers caps the chunk calls in flight across all rows, like --concurrency for rows.
+    """
+    global _chunk_executor
+    _text_chunking["max_bytes"] = max_bytes
+    old, _chunk_executor = _chunk_executor, ThreadPoolExecutor(
+        max_workers=max(1, max_workers), thread_name_prefix="text-chunk",
+    )
+    old.shutdown(wait=False)
+
+
+def _rank(order, value):
+    return order.index(value) if value in order else -1
+
+
+def _merge_chunk_results(row_index, text, model_id, spans, parts, elapsed):
+    """Reduce the per-chunk results of one long text into a single TextModerationResult.
+
+    Each category takes its highest chunk severity and the details of every chunk that
+    detected it, prefixed with the chunk's character range; overall_risk is the highest chunk
+    risk. Chunks with a detection or a risk above "safe" are listed in flagged_spans.
+    """
+    done = [(span, p) for span, p in zip(spans, parts) if p.moderation is not None]
+    errors = [f"chars {start}-{end}: {p.error or 'unparsed response'}"
+              for (start, end), p in zip(spans, parts) if p.moderation is None]
+    raw = json.dumps([{"start": start, "end": end, "raw": p.raw_llm_response}
+                      for (start, end), p in zip(spans, parts)], ensure_ascii=False)
+
+    moderation, flagged = None, []
+    if done:
+        categories = {}
+        for name in _CATEGORY_NAMES:
+            hits = [((start, end), getattr(p.moderation, name)) for (start, end), p in done
+                    if getattr(p.moderation, name).detected]
+            severity = max((c.severity for _, c in hits), key=lambda sev: _rank(_SEVERITY_ORDER, sev), default="none")
+            categories[name] = ModerationCategory(
+                detected=bool(hits),
+                severity=severity,
+                details=" ".join(f"[{start}-{end}] {c.details}" for (start, end), c in hits),
+            )
+        for (start, end), p in done:
+            detected = [name for name in _CATEGORY_NAMES if getattr(p.moderation, name).detected]
+            if detected or _rank(_RISK_ORDER, p.moderation.overall_risk) > 0:
+                flagged.append({"start": start, "end": end, "risk": p.moderation.overall_risk,
+                                "categories": detected})
+        risk = max((p.moderation.overall_risk for _, p in done), key=lambda r: _rank(_RISK_ORDER, r))
+        flagged_spans = {(f["start"], f["end"]) for f in flagged}
+        shown = [(span, p) for span, p in done if span in flagged_spans] or done
+        summary = " ".join(f"[{start}-{end}] {p.moderation.summary}" for (start, end), p in shown)
+        moderation = ModerationResult(**categories, overall_risk=risk, summary=summary)
+
+    return TextModerationResult(
+        row_index=row_index,
+        original_text=text,
+        model_id=model_id,
+        moderation_time_sec=round(elapsed, 3),
+        moderation=moderation,
+        raw_llm_response=raw,
+        error="; ".join(errors) or None,
+        cache_hit=all(p.cache_hit for p in parts),
+        flagged_spans=flagged,
+    )
+
+
+def _moderate_text_chunked(row_index, text, spans, model_id, lang, prompt, system_prompt, limiter):
+    """Map: moderate each chunk of a long text concurrently. Reduce: merge into one result."""
+    logger.info("Row %d: %d chars in %d chunks, moderating them in parallel", row_index, len(text), len(spans))
+    start = time.time()
+    parts = list(_chunk_executor.map(
+        lambda span: moderate_text(row_index, text[span[0]:span[1]], model_id, lang=lang, prompt=prompt,
+                                   system_prompt=system_prompt, chunked=False, limiter=limiter),
+        spans,
+    ))
+    return _merge_chunk_results(row_index, text, model_id, spans, parts, time.time() - start)
+
+
+def moderate_text(row_index, text, model_id, lang=DEFAULT_LANG, prompt=None, system_prompt=None, chunked=True,
+                  limiter=None):
+    """Moderate one text; texts over the configured chunk size are split and moderated in parallel.
+
+    Every model call, one per chunk for a long text, holds a limiter slot for model_id.
+    """
+    limiter = limiter or ModelLimiter()
+    max_bytes = _text_chunking["max_bytes"]
+    if chunked and max_bytes:
+        spans = chunk_text(text, max_bytes)
+        if len(spans) > 1:
+            return _moderate_text_chunked(row_index, text, spans, model_id, lang, prompt, system_prompt, limiter)
+
     sys_p, text_p, _, _ = get_prompts(lang)
     prompt = prompt or text_p
     system_prompt = system_prompt or sys_p
 
-    messages = [{"role": "user", "content": [{"text": prompt + text}]}]
+    key = cache_key("text", text, model_id, system_prompt, prompt, lang)
+    cached = _cache_lookup(key)
+    if cached is not None:
+        return TextModerationResult(
+            row_index=row_index,
+            original_text=text,
+            model_id=model_id,
+            moderation_time_sec=0.0,
+            moderation=_parse_moderation_response(cached["raw"]),
+            raw_llm_response=cached["raw"],
+            error=None,
+            cache_hit=True,
+        )
+
+    messages = _text_messages(text, prompt)
 
     try:
-        raw, elapsed = _call_llm(model_id, system_prompt, messages)
+        with limiter.slot(model_id):
+            raw, elapsed = _call_llm(model_id, system_prompt, messages)
         moderation = _parse_moderation_response(raw)
+        _cache_store(key, moderation, raw)
         return TextModerationResult(
             row_index=row_index,
             original_text=text,
@@ -214,41 +422,144 @@ def moderate_text(row_index, text, model_id, lang=DEFAULT_LANG, prompt=None, sys
         )
 
 
+# Output budget per packed item; a truncated array only costs the unparsed items a single-item retry
+_PACKED_TOKENS_PER_ITEM = 400
+_PACKED_MAX_TOKENS = 4096
+
+
+def can_pack_text(text):
+    """Whether a text is short enough to share a packed request with others."""
+    return len(text) <= PACKED_TEXT_MAX_CHARS
+
+
+def moderate_texts_packed(items, model_id, lang=DEFAULT_LANG, limiter=None):
+    """Moderate several short texts in one Converse call.
+
+    items: list of (row_index, text). The texts are sent as a JSON array and the model answers
+    with one verdict per "id"; each verdict becomes its own TextModerationResult whose
+    raw_llm_response is that item's JSON and whose moderation_time_sec is an equal share of the
+    call. Items that are missing from the answer or fail to parse, or all items if the call
+    itself fails, fall back to moderate_text(). Returns results in the order of items.
+
+    The packed call holds one limiter slot for model_id; it is released before the fallback
+    calls, which take their own slots.
+    """
+    limiter = limiter or ModelLimiter()
+    if len(items) == 1:
+        row_idx, text = items[0]
+        return [moderate_text(row_idx, text, model_id, lang=lang, limiter=limiter)]
+
+    system_prompt, prompt = get_packed_text_prompts(lang)
+    results = [None] * len(items)
+    keys = [cache_key("text-packed", text, model_id, system_prompt, prompt, lang) for _, text in items]
+
+    def _result(pos, moderation, raw, elapsed, cache_hit=False):
+        row_idx, text = items[pos]
+        return TextModerationResult(
+            row_index=row_idx,
+            original_text=text,
+            model_id=model_id,
+            moderation_time_sec=elapsed,
+            moderation=moderation,
+            raw_llm_response=raw,
+            error=None,
+            cache_hit=cache_hit,
+        )
+
+    todo = []
+    for pos, key in enumerate(keys):
+        cached = _cache_lookup(key)
+        if cached is not None:
+            results[pos] = _result(pos, _parse_moderation_response(cached["raw"]), cached["raw"], 0.0, True)
+        else:
+            todo.append(pos)
+
+    if todo:
+        payload = json.dumps([{"id": n, "text": items[pos][1]} for n, pos in enumerate(todo)], ensure_ascii=False)
+        messages = [{"role": "user", "content": [{"text": prompt + payload}]}]
+        max_tokens = min(_PACKED_MAX_TOKENS, max(2000, _PACKED_TOKENS_PER_ITEM * len(todo)))
+        try:
+            with limiter.slot(model_id):
+                raw, elapsed = _call_llm(model_id, system_prompt, messages, max_tokens=max_tokens)
+            verdicts = _parse_packed_response(raw)
+        except Exception as exc:
+            logger.warning("Packed text call for %d rows failed, retrying one by one: %s", len(todo), exc)
+            verdicts, elapsed = {}, 0.0
+        share = round(elapsed / len(todo), 3)
+        for n, pos in enumerate(todo):
+            moderation, item_raw = verdicts.get(n, (None, None))
+            if moderation is None:
+                continue
+            _cache_store(keys[pos], moderation, item_raw)
+            results[pos] = _result(pos, moderation, item_raw, share)
+
+    missing = [pos for pos, r in enumerate(results) if r is None]
+    if missing:
+        logger.info("Packed text: %d of %d rows unparsed, falling back to single-item calls",
+                    len(missing), len(items))
+    for pos in missing:
+        row_idx, text = items[pos]
+        results[pos] = moderate_text(row_idx, text, model_id, lang=lang, limiter=limiter)
+    return results
+
+
 # ---------------------------------------------------------------------------
 # Image moderation
 # ---------------------------------------------------------------------------
 
-def moderate_image(row_index, image_url, model_id, lang=DEFAULT_LANG, prompt=None, system_prompt=None):
+def image_error_result(row_index, image_url, model_id, error, dl_time=0.0, image_size=0):
+    """Build an ImageModerationResult for a row that failed before or during the LLM call."""
+    return ImageModerationResult(
+        row_index=row_index, image_url=image_url, model_id=model_id,
+        download_time_sec=round(dl_time, 3), moderation_time_sec=0.0,
+        image_size_bytes=image_size, moderation=None, raw_llm_response="",
+        error=error,
+    )
+
+
+def moderate_image(row_index, image_url, model_id, lang=DEFAULT_LANG, prompt=None, system_prompt=None,
+                   limiter=None):
+    """Download, normalize and moderate one image; only the model call holds a limiter slot for model_id."""
     if _is_text_only(model_id):
-        return ImageModerationResult(
-            row_index=row_index, image_url=image_url, model_id=model_id,
-            download_time_sec=0.0, moderation_time_sec=0.0,
-            image_size_bytes=0, moderation=None, raw_llm_response="",
-            error=f"Model {model_id} is text-only, cannot process images",
+        return image_error_result(
+            row_index, image_url, model_id, f"Model {model_id} is text-only, cannot process images",
         )
-    sys_p, _, img_p, _ = get_prompts(lang)
-    prompt = prompt or img_p
-    system_prompt = system_prompt or sys_p
 
     # Download
     image_bytes, dl_time, dl_error = timed_call(download_media, image_url)
     if dl_error:
-        return ImageModerationResult(
-            row_index=row_index, image_url=image_url, model_id=model_id,
-            download_time_sec=round(dl_time, 3), moderation_time_sec=0.0,
-            image_size_bytes=0, moderation=None, raw_llm_response="",
-            error=f"Download failed: {dl_error}",
-        )
+        return image_error_result(row_index, image_url, model_id, f"Download failed: {dl_error}", dl_time)
 
     # Normalize image format
     try:
-        norm_bytes, img_fmt = normalize_image_bytes(image_bytes)
+        norm_bytes, img_fmt = normalize_image_bytes(image_bytes, model_id)
     except Exception as exc:
+        return image_error_result(
+            row_index, image_url, model_id, f"Image conversion failed: {exc}", dl_time, len(image_bytes),
+        )
+
+    with (limiter or ModelLimiter()).slot(model_id):
+        return moderate_image_bytes(
+            row_index, image_url, model_id, norm_bytes, img_fmt, dl_time, len(image_bytes),
+            lang=lang, prompt=prompt, system_prompt=system_prompt,
+        )
+
+
+def moderate_image_bytes(row_index, image_url, model_id, norm_bytes, img_fmt, dl_time, image_size,
+                         lang=DEFAULT_LANG, prompt=None, system_prompt=None):
+    """LLM step of image moderation for an already downloaded and normalized image."""
+    sys_p, _, img_p, _ = get_prompts(lang)
+    prompt = prompt or img_p
+    system_prompt = system_prompt or sys_p
+
+    key = cache_key("image", norm_bytes, img_fmt, model_id, system_prompt, prompt, lang)
+    cached = _cache_lookup(key)
+    if cached is not None:
         return ImageModerationResult(
             row_index=row_index, image_url=image_url, model_id=model_id,
             download_time_sec=round(dl_time, 3), moderation_time_sec=0.0,
-            image_size_bytes=len(image_bytes), moderation=None, raw_llm_response="",
-            error=f"Image conversion failed: {exc}",
+            image_size_bytes=image_size, moderation=_parse_moderation_response(cached["raw"]),
+            raw_llm_response=cached["raw"], error=None, cache_hit=True, sent_size_bytes=len(norm_bytes),
         )
 
     # Call LLM — route by model type
@@ -259,81 +570,164 @@ def moderate_image(row_index, image_url, model_id, lang=DEFAULT_LANG, prompt=Non
                 image_bytes_list=[(norm_bytes, img_fmt)],
             )
         else:
-            content = [
-                {"image": {"format": img_fmt, "source": {"bytes": norm_bytes}}},
-                {"text": prompt},
-            ]
-            messages = [{"role": "user", "content": content}]
+            messages = _image_messages(norm_bytes, img_fmt, prompt)
             raw, elapsed = _call_llm(model_id, system_prompt, messages)
         moderation = _parse_moderation_response(raw)
+        _cache_store(key, moderation, raw)
         return ImageModerationResult(
             row_index=row_index, image_url=image_url, model_id=model_id,
             download_time_sec=round(dl_time, 3), moderation_time_sec=round(elapsed, 3),
-            image_size_bytes=len(image_bytes), moderation=moderation,
-            raw_llm_response=raw, error=None,
+            image_size_bytes=image_size, moderation=moderation,
+            raw_llm_response=raw, error=None, sent_size_bytes=len(norm_bytes),
         )
     except Exception as exc:
         logger.error("Image moderation error row %d: %s", row_index, exc)
-        return ImageModerationResult(
-            row_index=row_index, image_url=image_url, model_id=model_id,
-            download_time_sec=round(dl_time, 3), moderation_time_sec=0.0,
-            image_size_bytes=len(image_bytes), moderation=None,
-            raw_llm_response="", error=str(exc),
-        )
+        return image_error_result(row_index, image_url, model_id, str(exc), dl_time, image_size)
 
 
 # ---------------------------------------------------------------------------
 # Video moderation
 # ---------------------------------------------------------------------------
 
-def moderate_video(row_index, video_url, model_id, lang=DEFAULT_LANG, prompt=None, system_prompt=None, num_frames=5):
+def video_error_result(row_index, video_url, model_id, error, method="unknown", dl_time=0.0, video_size=0):
+    """Build a VideoModerationResult for a row that failed before or during the LLM call."""
+    return VideoModerationResult(
+        row_index=row_index, video_url=video_url, model_id=model_id,
+        analysis_method=method, download_time_sec=round(dl_time, 3),
+        moderation_time_sec=0.0, video_size_bytes=video_size, moderation=None,
+        raw_llm_response="", error=error,
+    )
+
+
+def needs_frame_extraction(model_id):
+    """True when video rows for this model are analysed from extracted frames rather than directly."""
+    return not _supports_direct_video(model_id)
+
+
+def moderate_video(row_index, video_url, model_id, lang=DEFAULT_LANG, prompt=None, system_prompt=None, num_frames=5,
+                   frame_strategy="uniform", dedup_threshold=FRAME_DEDUP_THRESHOLD, limiter=None):
+    """Download, prepare and moderate one video.
+
+    As in the staged pipeline, the download and the frame extraction (or direct video
+    preparation) run before a limiter slot for model_id is taken for the moderation step.
+    """
     if _is_text_only(model_id):
-        return VideoModerationResult(
-            row_index=row_index, video_url=video_url, model_id=model_id,
-            analysis_method="unsupported", download_time_sec=0.0,
-            moderation_time_sec=0.0, video_size_bytes=0, moderation=None,
-            raw_llm_response="",
-            error=f"Model {model_id} is text-only, cannot process video",
+        return video_error_result(
+            row_index, video_url, model_id, f"Model {model_id} is text-only, cannot process video",
+            method="unsupported",
         )
 
+    # Download to a temp file; the video is only ever read into memory as frames or a <= 25 MB payload
+    video, dl_time, dl_error = timed_call(download_media_file, video_url)
+    if dl_error:
+        return video_error_result(row_index, video_url, model_id, f"Download failed: {dl_error}", dl_time=dl_time)
+
+    with video:
+        frames = direct_video = None
+        if needs_frame_extraction(model_id):
+            try:
+                frames = extract_video_frames(video.path, num_frames, frame_strategy)
+            except Exception as exc:
+                return video_error_result(
+                    row_index, video_url, model_id, f"Frame extraction failed: {exc}",
+                    "frame_based", dl_time, video.size,
+                )
+        else:
+            try:
+                direct_video = prepare_direct_video(video.path)
+            except Exception as exc:
+                direct_video = exc  # moderate_video_file goes straight to frame-based
+        with (limiter or ModelLimiter()).slot(model_id):
+            return moderate_video_file(
+                row_index, video_url, model_id, video, dl_time,
+                lang=lang, prompt=prompt, system_prompt=system_prompt, num_frames=num_frames,
+                frame_strategy=frame_strategy, dedup_threshold=dedup_threshold,
+                frames=frames, direct_video=direct_video,
+            )
+
+
+def moderate_video_file(row_index, video_url, model_id, video, dl_time, lang=DEFAULT_LANG,
+                        prompt=None, system_prompt=None, num_frames=5, frames=None, frame_strategy="uniform",
+                        dedup_threshold=FRAME_DEDUP_THRESHOLD, direct_video=None):
+    """Moderation step for an already downloaded video (a media_utils.MediaFile, left for the caller to close).
+
+    frames: optional list of (jpeg_bytes, 'jpeg') tuples extracted ahead of time; when None,
+    frames are extracted here with frame_strategy if the frame-based path is taken. Frames
+    within dedup_threshold bits (perceptual hash) of an earlier frame are not sent.
+    direct_video: optional prepare_direct_video() result (or the exception it raised) computed
+    ahead of time for direct video models; when None, the video is prepared here.
+    """
     sys_p, _, _, vid_p = get_prompts(lang)
     prompt = prompt or vid_p
     system_prompt = system_prompt or sys_p
 
-    # Download
-    video_bytes, dl_time, dl_error = timed_call(download_media, video_url)
-    if dl_error:
+    key = cache_key(
+        "video", video.sha256(), model_id, system_prompt, prompt, lang, num_frames, frame_strategy,
+        dedup_threshold, FRAME_HASH_METHOD,
+    )
+    cached = _cache_lookup(key)
+    if cached is not None:
         return VideoModerationResult(
             row_index=row_index, video_url=video_url, model_id=model_id,
-            analysis_method="unknown", download_time_sec=round(dl_time, 3),
-            moderation_time_sec=0.0, video_size_bytes=0, moderation=None,
-            raw_llm_response="", error=f"Download failed: {dl_error}",
+            analysis_method=cached["method"], download_time_sec=round(dl_time, 3),
+            moderation_time_sec=0.0, video_size_bytes=video.size,
+            moderation=_parse_moderation_response(cached["raw"]), raw_llm_response=cached["raw"],
+            error=None, cache_hit=True, frames_dropped=cached.get("frames_dropped", 0),
         )
 
     use_direct = _supports_direct_video(model_id)
 
-    if use_direct:
+    if use_direct and direct_video is None:
+        try:
+            direct_video = prepare_direct_video(video.path)
+        except Exception as exc:
+            direct_video = exc
+
+    if use_direct and isinstance(direct_video, Exception):
+        # Sending a video the model cannot take would only fail after a full upload
+        logger.warning("  Video for row %d cannot be sent directly, using frame-based: %s",
+                       row_index, str(direct_video)[:80])
+        result = _moderate_video_frames(
+            row_index, video_url, video, model_id, prompt, system_prompt, dl_time,
+            "frame_based(fallback)", num_frames, frames, frame_strategy, dedup_threshold,
+        )
+    elif use_direct:
         result = _moderate_video_direct(
-            row_index, video_url, video_bytes, model_id, prompt, system_prompt, dl_time, "direct",
+            row_index, video_url, video, direct_video, model_id, prompt, system_prompt, dl_time,
         )
         if result.error:
             logger.warning("  Direct mode failed for row %d, falling back to frame-based: %s",
                            row_index, result.error[:80])
-            return _moderate_video_frames(
-                row_index, video_url, video_bytes, model_id, prompt, system_prompt, dl_time,
-                "frame_based(fallback)", num_frames,
+            result = _moderate_video_frames(
+                row_index, video_url, video, model_id, prompt, system_prompt, dl_time,
+                "frame_based(fallback)", num_frames, frames, frame_strategy, dedup_threshold,
             )
-        return result
+    else:
+        result = _moderate_video_frames(
+            row_index, video_url, video, model_id, prompt, system_prompt, dl_time, "frame_based", num_frames,
+            frames, frame_strategy, dedup_threshold,
+        )
+
+    if result.error is None:
+        _cache_store(
+            key, result.moderation, result.raw_llm_response,
+            method=result.analysis_method, frames_dropped=result.frames_dropped,
+        )
+    return result
 
-    return _moderate_video_frames(
-        row_index, video_url, video_bytes, model_id, prompt, system_prompt, dl_time, "frame_based", num_frames,
-    )
 
+def _moderate_video_direct(row_index, video_url, video, direct_video, model_id, prompt, system_prompt, dl_time):
+    """Send the prepared video directly to a Nova model via Converse API.
 
-def _moderate_video_direct(row_index, video_url, video_bytes, model_id, prompt, system_prompt, dl_time, method):
-    """Send video bytes directly to a Nova model via Converse API."""
+    direct_video is the (bytes, format, stats) result of prepare_direct_video(); a remuxed or
+    transcoded video is reported as analysis method 'direct(remux)' / 'direct(transcode)'.
+    """
+    sent_bytes, fmt, stats = direct_video
+    method = "direct" if stats["action"] == "none" else f"direct({stats['action']})"
+    if stats["action"] != "none":
+        logger.info("  Row %d: video %s", row_index, describe_video_prep(stats))
     content = [
-        {"video": {"format": "mp4", "source": {"bytes": video_bytes}}},
+        {"video": {"format": fmt, "source": {"bytes": sent_bytes}}},
         {"text": prompt},
     ]
     messages = [{"role": "user", "content": content}]
@@ -344,7 +738,7 @@ def _moderate_video_direct(row_index, video_url, video_bytes, model_id, prompt,
         return VideoModerationResult(
             row_index=row_index, video_url=video_url, model_id=model_id,
             analysis_method=method, download_time_sec=round(dl_time, 3),
-            moderation_time_sec=round(elapsed, 3), video_size_bytes=len(video_bytes),
+            moderation_time_sec=round(elapsed, 3), video_size_bytes=video.size,
             moderation=moderation, raw_llm_response=raw, error=None,
         )
     except Exception as exc:
@@ -352,20 +746,22 @@ def _moderate_video_direct(row_index, video_url, video_bytes, model_id, prompt,
         return VideoModerationResult(
             row_index=row_index, video_url=video_url, model_id=model_id,
             analysis_method=method, download_time_sec=round(dl_time, 3),
-            moderation_time_sec=0.0, video_size_bytes=len(video_bytes),
+            moderation_time_sec=0.0, video_size_bytes=video.size,
             moderation=None, raw_llm_response="", error=str(exc),
         )
 
 
-def _moderate_video_frames(row_index, video_url, video_bytes, model_id, prompt, system_prompt, dl_time, method, num_frames):
-    """Extract frames via ffmpeg and send as multi-image to Claude."""
+def _moderate_video_frames(row_index, video_url, video, model_id, prompt, system_prompt, dl_time, method,
+                           num_frames, frames=None, frame_strategy="uniform", dedup_threshold=FRAME_DEDUP_THRESHOLD):
+    """Extract frames via ffmpeg (unless already provided) and send as multi-image to Claude."""
     try:
-        frames = extract_video_frames(video_bytes, num_frames)
+        if frames is None:
+            frames = extract_video_frames(video.path, num_frames, frame_strategy)
     except Exception as exc:
         return VideoModerationResult(
             row_index=row_index, video_url=video_url, model_id=model_id,
             analysis_method=method, download_time_sec=round(dl_time, 3),
-            moderation_time_sec=0.0, video_size_bytes=len(video_bytes),
+            moderation_time_sec=0.0, video_size_bytes=video.size,
             moderation=None, raw_llm_response="",
             error=f"Frame extraction failed: {exc}",
         )
@@ -374,11 +770,20 @@ def _moderate_video_frames(row_index, video_url, video_bytes, model_id, prompt,
         return VideoModerationResult(
             row_index=row_index, video_url=video_url, model_id=model_id,
             analysis_method=method, download_time_sec=round(dl_time, 3),
-            moderation_time_sec=0.0, video_size_bytes=len(video_bytes),
+            moderation_time_sec=0.0, video_size_bytes=video.size,
             moderation=None, raw_llm_response="",
             error="No frames extracted from video",
         )
 
+    # Static shots and screen recordings yield near-identical frames that only add image tokens
+    try:
+        frames, dropped = dedupe_video_frames(frames, dedup_threshold)
+    except Exception as exc:
+        logger.warning("  Frame dedup failed for row %d, sending all frames: %s", row_index, exc)
+        dropped = 0
+    if dropped:
+        logger.info("  Row %d: dropped %d near-duplicate frames", row_index, dropped)
+
     try:
         if _uses_invoke_model_for_images(model_id):
             raw, elapsed = _call_invoke_model(
@@ -396,14 +801,14 @@ def _moderate_video_frames(row_index, video_url, video_bytes, model_id, prompt,
         return VideoModerationResult(
             row_index=row_index, video_url=video_url, model_id=model_id,
             analysis_method=method, download_time_sec=round(dl_time, 3),
-            moderation_time_sec=round(elapsed, 3), video_size_bytes=len(video_bytes),
-            moderation=moderation, raw_llm_response=raw, error=None,
+            moderation_time_sec=round(elapsed, 3), video_size_bytes=video.size,
+            moderation=moderation, raw_llm_response=raw, error=None, frames_dropped=dropped,
         )
     except Exception as exc:
         logger.error("Video frame moderation error row %d: %s", row_index, exc)
         return VideoModerationResult(
             row_index=row_index, video_url=video_url, model_id=model_id,
             analysis_method=method, download_time_sec=round(dl_time, 3),
-            moderation_time_sec=0.0, video_size_bytes=len(video_bytes),
-            moderation=None, raw_llm_response="", error=str(exc),
+            moderation_time_sec=0.0, video_size_bytes=video.size,
+            moderation=None, raw_llm_response="", error=str(exc), frames_dropped=dropped,
         )
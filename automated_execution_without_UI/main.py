@@ -1,24 +1,71 @@
 #!/usr/bin/env python3
 """Batch LLM content moderation — CLI entry point.
 
-Reads test cases from an xlsx file and runs moderation via AWS Bedrock.
+Streams test cases from an xlsx/csv/jsonl/parquet file and runs moderation via AWS Bedrock.
 """
 
 import argparse
+import functools
 import logging
 import os
 import sys
-
-import openpyxl
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
 
 # Ensure the local package directory is first in sys.path
 _this_dir = os.path.dirname(os.path.abspath(__file__))
 if _this_dir not in sys.path:
     sys.path.insert(0, _this_dir)
 
-from config import DEFAULT_MODEL_ID, DEFAULT_LANG, MODEL_LIST  # noqa: E402
-from llm_moderator import moderate_text, moderate_image, moderate_video  # noqa: E402
-from output_formatter import save_results_json, save_summary_txt, save_results_xlsx  # noqa: E402
+from batch_inference import (  # noqa: E402
+    OUTPUT_STATUSES,
+    BedrockBatchBackend,
+    LocalBatchBackend,
+    export_batch,
+    fetch_output,
+    import_batch,
+    load_job,
+    submit_batch,
+    wait_for_job,
+)
+from checkpoint import CheckpointJournal, CheckpointMismatchError  # noqa: E402
+from text_clusters import NearDuplicateTexts  # noqa: E402
+from comprehend_stage import ComprehendStage  # noqa: E402
+from concurrency import ModelLimiter, make_executor, map_ordered  # noqa: E402
+from config import (  # noqa: E402
+    DEFAULT_MODEL_ID,
+    DEFAULT_LANG,
+    FRAME_DEDUP_THRESHOLD,
+    LONG_TEXT_CHUNK_BYTES,
+    MEDIA_CACHE_DIR,
+    MEDIA_CACHE_MAX_MB,
+    MEDIA_MAX_MB,
+    MODEL_LIST,
+    NEAR_DUP_TEXT_MAX_ENTRIES,
+    NEAR_DUP_TEXT_MIN_CHARS,
+    NEAR_DUP_TEXT_THRESHOLD,
+    RESULT_CACHE_PATH,
+    RESULT_CACHE_TTL,
+    RESULT_CACHE_MAX_MB,
+    TEXT_LEXICONS,
+)
+from lexicon_filter import LEXICON_MODEL_ID, LEXICON_POLICIES, LexiconFilter, load_lexicons  # noqa: E402
+from llm_moderator import (  # noqa: E402
+    adaptive_limiter,
+    aws_clients,
+    can_pack_text,
+    configure_text_chunking,
+    moderate_image,
+    moderate_text,
+    moderate_texts_packed,
+    moderate_video,
+    result_cache,
+)
+from media_cache import configure_media_cache  # noqa: E402
+from media_utils import FRAME_STRATEGIES, configure_downloads, media_pool  # noqa: E402
+from pipeline import PipelineConfig, run_image_pipeline, run_video_pipeline  # noqa: E402
+from readers import MODALITIES, iter_cells, iter_test_sets  # noqa: E402
+from output_formatter import ReportWriter  # noqa: E402
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,84 +76,222 @@ logger = logging.getLogger(__name__)
 
 
 # ---------------------------------------------------------------------------
-# XLSX loader
+# Moderation runners
 # ---------------------------------------------------------------------------
 
-def load_test_sets(excel_path):
-    """Load text, image URLs, and video URLs from the xlsx file.
-
-    Returns (texts, image_urls, video_urls) — each a list of (row_index, value).
+def _log_text_result(result):
+    risk = result.moderation.overall_risk if result.moderation else "ERROR"
+    if result.model_id == LEXICON_MODEL_ID:
+        risk += " [lexicon]"
+    elif result.near_duplicate_of is not None:
+        risk += f" [near-duplicate of row {result.near_duplicate_of}]"
+    signals = result.comprehend
+    if signals and not signals.error:
+        logger.info("  -> Row %d %s  (%.1fs)  [%s, %s, toxicity=%s]", result.row_index, risk,
+                    result.moderation_time_sec, signals.language or "?", signals.sentiment or "-",
+                    "-" if signals.toxicity is None else f"{signals.toxicity:.2f}")
+    else:
+        logger.info("  -> Row %d %s  (%.1fs)", result.row_index, risk, result.moderation_time_sec)
+
+
+def _log_image_result(result):
+    if result.error:
+        logger.warning("  -> Row %d ERROR: %s", result.row_index, result.error[:80])
+    else:
+        risk = result.moderation.overall_risk if result.moderation else "parse_err"
+        logger.info("  -> Row %d %s  (dl=%.1fs mod=%.1fs, %d KB -> %d KB sent)",
+                    result.row_index, risk, result.download_time_sec, result.moderation_time_sec,
+                    result.image_size_bytes // 1024, result.sent_size_bytes // 1024)
+
+
+def _log_video_result(result):
+    if result.error:
+        logger.warning("  -> Row %d ERROR: %s", result.row_index, result.error[:80])
+    else:
+        risk = result.moderation.overall_risk if result.moderation else "parse_err"
+        logger.info(
+            "  -> Row %d %s  [%s] (dl=%.1fs mod=%.1fs, %d duplicate frames dropped)",
+            result.row_index, risk, result.analysis_method, result.download_time_sec, result.moderation_time_sec,
+            result.frames_dropped,
+        )
+
+
+def _lexicon_check(prefilter, row_idx, text):
+    """(lexicon verdict or None, hits to record on the LLM result) for one row."""
+    return prefilter.check(row_idx, text) if prefilter else (None, [])
+
+
+def _moderate_clustered(clusters, row_idx, text, moderate):
+    """Return moderate() for a row, unless a near-duplicate earlier row's verdict can be reused."""
+    claim = clusters.claim(row_idx, text) if clusters else None
+    if claim is not None and not claim.leader:
+        result = clusters.follow(claim, row_idx, text)
+        if result is not None:
+            return result
+        claim = None
+    result = None
+    try:
+        result = moderate()
+    finally:
+        if claim is not None:
+            clusters.resolve(claim, result)
+    return result
+
+
+def run_text_moderation(texts, model_id, lang, executor=None, limiter=None, on_result=None, comprehend=None,
+                        prefilter=None, clusters=None):
+    limiter = limiter or ModelLimiter()
+    def _moderate(row_idx, text):
+        # moderate_text takes the limiter slot per model call, so a chunked row never holds one while it waits
+        return moderate_text(row_idx, text, model_id, lang=lang, limiter=limiter)
+
+    def _one(i, item):
+        row_idx, text = item
+        logger.info("[Text #%d] Row %d  (%d chars)", i + 1, row_idx, len(text))
+        result, hits = _lexicon_check(prefilter, row_idx, text)
+        if result is None:
+            result = _moderate_clustered(clusters, row_idx, text, lambda: _moderate(row_idx, text))
+            if hits:
+                result = replace(result, lexicon_hits=hits)
+        if comprehend:
+            result = comprehend.attach(result)
+        _log_text_result(result)
+        if on_result:
+            on_result(result)
+        return result
+
+    if comprehend:
+        texts = comprehend.feed(texts)
+    # Results that are streamed to on_result are not also collected in memory
+    return map_ordered(_one, texts, executor, collect=on_result is None)
+
+
+def _text_packs(texts, pack_size, prefilter=None):
+    """Group (row_index, text) items into packs of up to pack_size short texts.
+
+    Texts too long to pack, and texts the lexicon pre-filter decides, are yielded on their
+    own as soon as they are read.
     """
-    wb = openpyxl.load_workbook(excel_path, data_only=True)
-    ws = wb.active
-
-    texts = []
-    image_urls = []
-    video_urls = []
-
-    for idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True)):
-        text_val = row[0] if len(row) > 0 else None
-        image_val = row[1] if len(row) > 1 else None
-        video_val = row[2] if len(row) > 2 else None
-
-        if text_val and str(text_val).strip():
-            texts.append((idx, str(text_val).strip()))
-        if image_val and str(image_val).strip():
-            image_urls.append((idx, str(image_val).strip()))
-        if video_val and str(video_val).strip():
-            video_urls.append((idx, str(video_val).strip()))
-
-    wb.close()
-    return texts, image_urls, video_urls
-
+    pack = []
+    for item in texts:
+        if not can_pack_text(item[1]) or (prefilter and prefilter.decides(prefilter.hits(item[1]))):
+            yield [item]
+            continue
+        pack.append(item)
+        if len(pack) >= pack_size:
+            yield pack
+            pack = []
+    if pack:
+        yield pack
+
+
+def run_text_moderation_packed(texts, model_id, lang, pack_size, executor=None, limiter=None, on_result=None,
+                               comprehend=None, prefilter=None, clusters=None):
+    """Text runner sending up to pack_size short texts per Converse call."""
+    limiter = limiter or ModelLimiter()
+    def _one(i, pack):
+        logger.info("[Text pack #%d] Rows %s  (%d texts)", i + 1, ",".join(str(r) for r, _ in pack), len(pack))
+        checked = [_lexicon_check(prefilter, row_idx, text) for row_idx, text in pack]
+        claims = [
+            clusters.claim(row_idx, text) if clusters and verdict is None else None
+            for (row_idx, text), (verdict, _) in zip(pack, checked)
+        ]
+        # Lexicon-decided rows and near-duplicate followers stay out of the packed call
+        todo = [pos for pos, ((verdict, _), claim) in enumerate(zip(checked, claims))
+                if verdict is None and (claim is None or claim.leader)]
+        results = [verdict for verdict, _ in checked]
+        try:
+            moderated = []
+            if todo:  # takes its own slots: one for the packed call, one per fallback or chunk call
+                moderated = moderate_texts_packed([pack[pos] for pos in todo], model_id, lang=lang, limiter=limiter)
+            for pos, result in zip(todo, moderated):
+                results[pos] = result
+        finally:
+            # Leaders publish before any follower waits, so packs never wait on each other in a cycle
+            for pos in todo:
+                if claims[pos] is not None:
+                    clusters.resolve(claims[pos], results[pos])
+        for pos, ((row_idx, text), claim) in enumerate(zip(pack, claims)):
+            if results[pos] is None:
+                results[pos] = clusters.follow(claim, row_idx, text)
+            if results[pos] is None:  # the leader failed: moderate this row on its own
+                results[pos] = moderate_text(row_idx, text, model_id, lang=lang, limiter=limiter)
+            hits = checked[pos][1]
+            if checked[pos][0] is None and hits:
+                results[pos] = replace(results[pos], lexicon_hits=hits)
+        if comprehend:
+            results = [comprehend.attach(result) for result in results]
+        for result in results:
+            _log_text_result(result)
+            if on_result:
+                on_result(result)
+        return results
+
+    if comprehend:
+        texts = comprehend.feed(texts)
+    packs = map_ordered(_one, _text_packs(texts, pack_size, prefilter), executor, collect=on_result is None)
+    return None if packs is None else [r for pack in packs for r in pack]
+
+
+def run_image_moderation(image_urls, model_id, lang, executor=None, limiter=None, on_result=None):
+    limiter = limiter or ModelLimiter()
+    def _one(i, item):
+        row_idx, url = item
+        logger.info("[Image #%d] Row %d  %s", i + 1, row_idx, url[:80])
+        result = moderate_image(row_idx, url, model_id, lang=lang, limiter=limiter)
+        _log_image_result(result)
+        if on_result:
+            on_result(result)
+        return result
+
+    # Results that are streamed to on_result are not also collected in memory
+    return map_ordered(_one, image_urls, executor, collect=on_result is None)
+
+
+def run_video_moderation(video_urls, model_id, lang, num_frames, frame_strategy="uniform",
+                         dedup_threshold=FRAME_DEDUP_THRESHOLD, executor=None, limiter=None, on_result=None):
+    limiter = limiter or ModelLimiter()
+    def _one(i, item):
+        row_idx, url = item
+        logger.info("[Video #%d] Row %d  %s", i + 1, row_idx, url[:80])
+        result = moderate_video(row_idx, url, model_id, lang=lang, num_frames=num_frames,
+                                frame_strategy=frame_strategy, dedup_threshold=dedup_threshold, limiter=limiter)
+        _log_video_result(result)
+        if on_result:
+            on_result(result)
+        return result
+
+    # Results that are streamed to on_result are not also collected in memory
+    return map_ordered(_one, video_urls, executor, collect=on_result is None)
+
+
+def _chain(log_fn, on_result):
+    if on_result is None:
+        return log_fn
+
+    def _both(result):
+        log_fn(result)
+        on_result(result)
+    return _both
+
+
+def run_image_moderation_staged(image_urls, model_id, lang, pipeline_config, executor=None, limiter=None,
+                                on_result=None):
+    """Image runner backed by the download -> CPU -> LLM pipeline; executor is unused."""
+    return run_image_pipeline(
+        image_urls, model_id, lang, config=pipeline_config, limiter=limiter,
+        on_result=_chain(_log_image_result, on_result), collect=on_result is None,
+    )
 
-# ---------------------------------------------------------------------------
-# Moderation runners
-# ---------------------------------------------------------------------------
 
-def run_text_moderation(texts, model_id, lang):
-    results = []
-    total = len(texts)
-    for i, (row_idx, text) in enumerate(texts):
-        logger.info("[Text %d/%d] Row %d  (%d chars)", i + 1, total, row_idx, len(text))
-        result = moderate_text(row_idx, text, model_id, lang=lang)
-        risk = result.moderation.overall_risk if result.moderation else "ERROR"
-        logger.info("  -> %s  (%.1fs)", risk, result.moderation_time_sec)
-        results.append(result)
-    return results
-
-
-def run_image_moderation(image_urls, model_id, lang):
-    results = []
-    total = len(image_urls)
-    for i, (row_idx, url) in enumerate(image_urls):
-        logger.info("[Image %d/%d] Row %d  %s", i + 1, total, row_idx, url[:80])
-        result = moderate_image(row_idx, url, model_id, lang=lang)
-        if result.error:
-            logger.warning("  -> ERROR: %s", result.error[:80])
-        else:
-            risk = result.moderation.overall_risk if result.moderation else "parse_err"
-            logger.info("  -> %s  (dl=%.1fs mod=%.1fs)", risk, result.download_time_sec, result.moderation_time_sec)
-        results.append(result)
-    return results
-
-
-def run_video_moderation(video_urls, model_id, lang, num_frames):
-    results = []
-    total = len(video_urls)
-    for i, (row_idx, url) in enumerate(video_urls):
-        logger.info("[Video %d/%d] Row %d  %s", i + 1, total, row_idx, url[:80])
-        result = moderate_video(row_idx, url, model_id, lang=lang, num_frames=num_frames)
-        if result.error:
-            logger.warning("  -> ERROR: %s", result.error[:80])
-        else:
-            risk = result.moderation.overall_risk if result.moderation else "parse_err"
-            logger.info(
-                "  -> %s  [%s] (dl=%.1fs mod=%.1fs)",
-                risk, result.analysis_method, result.download_time_sec, result.moderation_time_sec,
-            )
-        results.append(result)
-    return results
+def run_video_moderation_staged(video_urls, model_id, lang, num_frames, frame_strategy, dedup_threshold,
+                                pipeline_config, executor=None, limiter=None, on_result=None):
+    """Video runner backed by the download -> CPU -> LLM pipeline; executor is unused."""
+    return run_video_pipeline(
+        video_urls, model_id, lang, num_frames, config=pipeline_config, limiter=limiter,
+        on_result=_chain(_log_video_result, on_result), collect=on_result is None,
+        frame_strategy=frame_strategy, dedup_threshold=dedup_threshold,
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -126,12 +311,13 @@ def parse_args():
         help="Override model for video moderation (defaults to --model)",
     )
     parser.add_argument(
-        "-e", "--excel", default=os.path.join(os.path.dirname(__file__), "test-sets.xlsx"),
-        help="Path to test-sets.xlsx",
+        "-e", "--excel", "-i", "--input", dest="excel",
+        default=os.path.join(os.path.dirname(__file__), "test-sets.xlsx"),
+        help="Path to the test set: .xlsx, .csv, .jsonl or .parquet (default: test-sets.xlsx)",
     )
     parser.add_argument(
         "-o", "--output-dir", default=os.path.dirname(__file__) or ".",
-        help="Output directory for results.json and summary.txt",
+        help="Output directory for results.json/.jsonl/.xlsx and summary.txt",
     )
     parser.add_argument("--text-only", action="store_true", help="Run text moderation only")
     parser.add_argument("--image-only", action="store_true", help="Run image moderation only")
@@ -140,14 +326,356 @@ def parse_args():
         "--num-frames", type=int, default=5,
         help="Number of frames for frame-based video analysis (default: 5)",
     )
+    parser.add_argument(
+        "--frame-strategy", default="uniform", choices=FRAME_STRATEGIES,
+        help="How frames are picked: uniform = evenly spaced, "
+             "scene = the most distinct frames by scene change (default: uniform)",
+    )
+    parser.add_argument(
+        "--frame-dedup-threshold", type=int, default=FRAME_DEDUP_THRESHOLD,
+        help="Drop frames within this many bits (of 64, perceptual hash) of an earlier frame; "
+             f"negative disables (default: {FRAME_DEDUP_THRESHOLD})",
+    )
     parser.add_argument(
         "--lang", default=DEFAULT_LANG, choices=["zh", "en"],
         help=f"Output language for LLM responses: zh=Chinese, en=English (default: {DEFAULT_LANG})",
     )
+    parser.add_argument(
+        "-c", "--concurrency", type=int, default=1,
+        help="Number of rows moderated in parallel; >1 also runs text/image/video at the same time (default: 1)",
+    )
+    parser.add_argument(
+        "--model-concurrency", type=int, default=None,
+        help="Max in-flight calls per model ID (default: no separate cap)",
+    )
+    parser.add_argument(
+        "--initial-model-concurrency", type=int, default=4,
+        help="Starting per-model limit for the adaptive throttle controller; it then grows on success "
+             "and halves on Bedrock throttling, up to --model-concurrency or --concurrency (default: 4)",
+    )
+    parser.add_argument(
+        "--pack-texts", type=int, default=1, metavar="K",
+        help="Moderate up to K short texts per LLM call, falling back to single calls for items "
+             "that fail to parse (default: 1, no packing)",
+    )
+    parser.add_argument(
+        "--long-text-chunk-bytes", type=int, default=LONG_TEXT_CHUNK_BYTES, metavar="N",
+        help="Split texts over N UTF-8 bytes at sentence boundaries and moderate the chunks in parallel, "
+             f"merging their verdicts; 0 sends every text whole (default: {LONG_TEXT_CHUNK_BYTES})",
+    )
+    parser.add_argument(
+        "--near-dup-threshold", type=float, default=NEAR_DUP_TEXT_THRESHOLD, metavar="J",
+        help="Texts whose MinHash similarity to an earlier row reaches J (e.g. 0.8) reuse that row's verdict "
+             f"instead of an LLM call; 0 disables (default: {NEAR_DUP_TEXT_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--lexicon-policy", choices=LEXICON_POLICIES, default="off",
+        help="Local lexicon pre-filter for text rows: 'shadow' only records hits, 'block' answers rows "
+             "hitting a high-severity term without an LLM call, 'block-and-pass' also passes rows with "
+             "no hit as safe (default: off; not used with --batch-inference)",
+    )
+    parser.add_argument(
+        "--lexicon-file", default=None,
+        help="JSON lexicon {category: {severity: [terms]}} replacing the built-in TEXT_LEXICONS",
+    )
+    parser.add_argument(
+        "--comprehend", action="store_true",
+        help="Add Amazon Comprehend language, sentiment, entities, key phrases and toxicity to text rows "
+             "(batched API calls; not used with --batch-inference)",
+    )
+    parser.add_argument(
+        "--pipeline", action="store_true",
+        help="Run image/video rows through the staged download -> CPU -> LLM pipeline "
+             "(LLM stage uses --concurrency workers)",
+    )
+    parser.add_argument(
+        "--download-workers", type=int, default=4,
+        help="Pipeline mode: parallel downloads (default: 4)",
+    )
+    parser.add_argument(
+        "--cpu-workers", type=int, default=media_pool.usable_cpus(),
+        help="Processes for image normalization / frame extraction; 0 runs them in the worker threads "
+             "(default: usable CPU count)",
+    )
+    parser.add_argument(
+        "--checkpoint", default=None,
+        help="Checkpoint journal path (default: <output-dir>/checkpoint.jsonl)",
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="Skip rows already recorded in the checkpoint journal",
+    )
+    parser.add_argument(
+        "--retry-failed", action="store_true",
+        help="Re-run only rows whose checkpointed result has an error (combine with --resume to also run missing rows)",
+    )
+    parser.add_argument(
+        "--cache-path", default=RESULT_CACHE_PATH,
+        help=f"SQLite result cache shared with the UI (default: {RESULT_CACHE_PATH})",
+    )
+    parser.add_argument(
+        "--cache-ttl", type=int, default=RESULT_CACHE_TTL,
+        help=f"Result cache entry lifetime in seconds (default: {RESULT_CACHE_TTL})",
+    )
+    parser.add_argument(
+        "--cache-max-mb", type=int, default=RESULT_CACHE_MAX_MB,
+        help=f"Result cache size cap; least recently used entries are evicted (default: {RESULT_CACHE_MAX_MB})",
+    )
+    cache_mode = parser.add_mutually_exclusive_group()
+    cache_mode.add_argument("--no-cache", action="store_true", help="Disable the result cache")
+    cache_mode.add_argument(
+        "--refresh-cache", action="store_true",
+        help="Ignore cached results but store fresh ones",
+    )
+    parser.add_argument(
+        "--max-media-mb", type=int, default=MEDIA_MAX_MB,
+        help=f"Reject image/video downloads larger than this (default: {MEDIA_MAX_MB})",
+    )
+    parser.add_argument(
+        "--media-cache-dir", default=MEDIA_CACHE_DIR,
+        help=f"On-disk cache of downloaded media, revalidated by ETag/Last-Modified (default: {MEDIA_CACHE_DIR})",
+    )
+    parser.add_argument(
+        "--media-cache-max-mb", type=int, default=MEDIA_CACHE_MAX_MB,
+        help=f"Media cache size cap; least recently used files are evicted (default: {MEDIA_CACHE_MAX_MB})",
+    )
+    parser.add_argument("--no-media-cache", action="store_true", help="Disable the media download cache")
+    parser.add_argument(
+        "--batch-inference", choices=["export", "submit", "poll", "import", "run"], default=None,
+        help="Use Bedrock batch inference instead of synchronous calls: export rows to JSONL, submit the "
+             "job, poll its status, import the output into the reports, or run all steps in one go",
+    )
+    parser.add_argument(
+        "--batch-dir", default=None,
+        help="Batch inference work directory (default: <output-dir>/batch)",
+    )
+    parser.add_argument(
+        "--batch-backend", choices=["bedrock", "local"], default="bedrock",
+        help="Batch job backend; 'local' is a file-based stand-in under <batch-dir>/local-backend (default: bedrock)",
+    )
+    parser.add_argument("--batch-s3-uri", default=None, help="S3 prefix for batch job input and output")
+    parser.add_argument("--batch-role-arn", default=None, help="IAM service role Bedrock uses for the batch job")
+    parser.add_argument(
+        "--batch-poll-interval", type=int, default=60,
+        help="Seconds between job status checks in --batch-inference run (default: 60)",
+    )
+    parser.add_argument(
+        "--batch-timeout", type=int, default=24 * 3600,
+        help="Give up waiting in --batch-inference run after this many seconds; the job keeps running and "
+             "can be imported later (default: 86400, 0 waits forever)",
+    )
     parser.add_argument("--dry-run", action="store_true", help="Load xlsx and print counts, no API calls")
     return parser.parse_args()
 
 
+def run_moderation(args, journal, pending, video_model):
+    """Moderate the pending rows with synchronous Bedrock calls, journaling each result.
+
+    pending: {modality: iterable of (row_index, value)} for the enabled modalities.
+    Returns the result cache used for the run.
+    """
+    cache = result_cache.configure_default_cache(
+        args.cache_path,
+        ttl_seconds=args.cache_ttl,
+        max_bytes=args.cache_max_mb * 1024 * 1024,
+        mode="off" if args.no_cache else ("refresh" if args.refresh_cache else "on"),
+    )
+
+    # Size HTTP/AWS connection pools for every worker that may hold a connection at once
+    pool_size = aws_clients.configure_transport(
+        max(1, args.concurrency) + (args.download_workers if args.pipeline else 0),
+    )
+    logger.info("Connection pool size: %d", pool_size)
+
+    executor = make_executor(args.concurrency)
+    limiter = ModelLimiter(args.model_concurrency)
+    adaptive_limiter.configure(
+        initial=args.initial_model_concurrency,
+        max_limit=max(1, args.model_concurrency or args.concurrency),
+    )
+    pipeline_config = PipelineConfig(
+        download_workers=args.download_workers,
+        cpu_workers=args.cpu_workers,
+        llm_workers=max(1, args.concurrency),
+    )
+    jobs = {}
+    prefilter = None
+    if "text" in pending and args.lexicon_policy != "off":
+        lexicons = load_lexicons(args.lexicon_file) if args.lexicon_file else TEXT_LEXICONS
+        prefilter = LexiconFilter(lexicons, policy=args.lexicon_policy, lang=args.lang)
+        logger.info("Lexicon pre-filter: %d terms, policy=%s", prefilter.term_count, prefilter.policy)
+    clusters = None
+    if "text" in pending and args.near_dup_threshold > 0:
+        clusters = NearDuplicateTexts(
+            args.near_dup_threshold, min_chars=NEAR_DUP_TEXT_MIN_CHARS, max_entries=NEAR_DUP_TEXT_MAX_ENTRIES,
+        )
+        logger.info("Near-duplicate texts: MinHash similarity >= %.2f reuses the cluster leader's verdict",
+                    args.near_dup_threshold)
+
+    if "text" in pending:
+        logger.info("=== Text Moderation (model=%s) ===", args.model)
+        if args.pack_texts > 1:
+            text_runner = run_text_moderation_packed
+            text_args = (pending["text"], args.model, args.lang, args.pack_texts)
+        else:
+            text_runner = run_text_moderation
+            text_args = (pending["text"], args.model, args.lang)
+        if prefilter is not None:
+            text_runner = functools.partial(text_runner, prefilter=prefilter)
+        if clusters is not None:
+            text_runner = functools.partial(text_runner, clusters=clusters)
+        if args.comprehend:
+            stage = ComprehendStage()
+            logger.info("Comprehend signals: batched, %d rows per chunk", stage.chunk_rows)
+            text_runner = functools.partial(text_runner, comprehend=stage)
+        jobs["text"] = (text_runner, text_args)
+
+    if "image" in pending:
+        logger.info("=== Image Moderation (model=%s) ===", args.model)
+        if args.pipeline:
+            jobs["image"] = (run_image_moderation_staged, (pending["image"], args.model, args.lang, pipeline_config))
+        else:
+            jobs["image"] = (run_image_moderation, (pending["image"], args.model, args.lang))
+
+    if "video" in pending:
+        logger.info("=== Video Moderation (model=%s) ===", video_model)
+        if args.pipeline:
+            jobs["video"] = (
+                run_video_moderation_staged,
+                (pending["video"], video_model, args.lang, args.num_frames, args.frame_strategy,
+                 args.frame_dedup_threshold, pipeline_config),
+            )
+        else:
+            jobs["video"] = (
+                run_video_moderation,
+                (pending["video"], video_model, args.lang, args.num_frames, args.frame_strategy,
+                 args.frame_dedup_threshold),
+            )
+
+    # Run moderation — modalities run side by side when a worker pool is in use
+    journal.open()
+    interrupted = False
+    try:
+        if executor is None:
+            for name, (fn, fn_args) in jobs.items():
+                fn(*fn_args, on_result=functools.partial(journal.record, name))
+        else:
+            logger.info("Concurrency: %d workers, per-model cap: %s",
+                        args.concurrency, args.model_concurrency or "none")
+            modality_pool = ThreadPoolExecutor(max_workers=max(1, len(jobs)))
+            futures = [
+                modality_pool.submit(
+                    fn, *fn_args, executor=executor, limiter=limiter,
+                    on_result=functools.partial(journal.record, name),
+                )
+                for name, (fn, fn_args) in jobs.items()
+            ]
+            modality_pool.shutdown(wait=False)
+            for f in futures:
+                f.result()
+    except KeyboardInterrupt:
+        interrupted = True
+        raise
+    finally:
+        try:
+            if executor is not None:
+                if interrupted:
+                    logger.warning("Interrupted — waiting for in-flight rows to be journaled (Ctrl-C again to abort)")
+                # Queued rows are dropped; rows already in a Bedrock call finish and reach the journal
+                executor.shutdown(wait=True, cancel_futures=True)
+        finally:
+            journal.close()
+            if interrupted:
+                logger.warning("Finished rows are in %s; rerun with --resume to continue", journal.path)
+    if prefilter is not None:
+        st = prefilter.stats()
+        logger.info(
+            "Lexicon pre-filter: %d texts scanned (%.1f us avg), %d with hits, %d LLM calls avoided "
+            "(%d flagged, %d passed clean)",
+            st["scanned"], st["scan_sec"] * 1e6 / max(1, st["scanned"]), st["with_hits"],
+            st["llm_calls_avoided"], st["decided_hit"], st["decided_clean"],
+        )
+    if clusters is not None:
+        st = clusters.stats()
+        logger.info(
+            "Near-duplicate texts: %d LLM calls avoided (rows reusing the verdict of %d cluster leaders), "
+            "%d rows re-moderated after their leader failed",
+            st["reused"], st["clusters"], st["fallbacks"],
+        )
+    return cache
+
+
+def _batch_backend(args, work_dir):
+    if args.batch_backend == "local":
+        return LocalBatchBackend(os.path.join(work_dir, "local-backend"))
+    return BedrockBatchBackend(args.batch_s3_uri, args.batch_role_arn)
+
+
+def run_batch_inference(args, journal, pending):
+    """Run one --batch-inference step (or all of them for "run").
+
+    Returns True once the job output has been imported into the journal, so the caller
+    writes the reports; False after export / submit / poll.
+    """
+    step = args.batch_inference
+    work_dir = args.batch_dir or os.path.join(args.output_dir, "batch")
+    os.makedirs(work_dir, exist_ok=True)
+    aws_clients.configure_transport(max(1, args.concurrency))
+    backend = _batch_backend(args, work_dir)
+
+    if step in ("export", "run"):
+        if "video" in pending:
+            logger.warning("Batch inference covers text and image rows; video rows are reported as unsupported")
+        executor = make_executor(args.concurrency)
+        try:
+            counts = export_batch(pending, work_dir, args.model, args.lang, executor=executor)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        logger.info("Batch input written to %s (%d records)", work_dir, counts["records"])
+        if step == "export":
+            return False
+
+    if step in ("submit", "run"):
+        submit_batch(backend, work_dir, args.model, args.lang)
+        if step == "submit":
+            return False
+
+    job = load_job(work_dir)
+    if step == "run":
+        if not backend.completes_on_its_own:
+            logger.error(
+                "The %s batch backend has no responder, so job %s only completes once its output files are "
+                "placed in %s; do that, then run --batch-inference import",
+                backend.name, job["job_id"], backend.output_dir(job["job_id"]),
+            )
+            return False
+        try:
+            status, message = wait_for_job(backend, job["job_id"], poll_interval=args.batch_poll_interval,
+                                           timeout=args.batch_timeout or None)
+        except TimeoutError as exc:
+            logger.error("%s; check it with --batch-inference poll and import it once it is done", exc)
+            return False
+    else:
+        status, message = backend.status(job["job_id"])
+        logger.info("Batch job %s: %s %s", job["job_id"], status, message or "")
+    if step == "poll":
+        return False
+    if status not in OUTPUT_STATUSES:
+        logger.error("Batch job %s has no output to import (status %s)", job["job_id"], status)
+        return False
+
+    paths = fetch_output(backend, job["job_id"], work_dir)
+    logger.info("Downloaded %d batch output file(s)", len(paths))
+    journal.open()
+    try:
+        imported = import_batch(work_dir, job["model_id"], journal.record)
+    finally:
+        journal.close()
+    logger.info("Imported %d batch rows", imported)
+    return True
+
+
 def main():
     args = parse_args()
 
@@ -168,54 +696,93 @@ def main():
     do_image = run_all or args.image_only
     do_video = run_all or args.video_only
 
-    # Load xlsx
-    logger.info("Loading test sets from %s", args.excel)
-    texts, image_urls, video_urls = load_test_sets(args.excel)
-    logger.info("Found: %d texts, %d images, %d videos", len(texts), len(image_urls), len(video_urls))
-
     if args.dry_run:
+        logger.info("Scanning test set %s", args.excel)
+        counts = {m: 0 for m in MODALITIES}
+        samples = {m: [] for m in MODALITIES}
+        for m, idx, val in iter_cells(args.excel):
+            counts[m] += 1
+            if len(samples[m]) < 3:
+                samples[m].append((idx, val))
+        logger.info("Found: %d texts, %d images, %d videos", counts["text"], counts["image"], counts["video"])
         logger.info("Dry run complete. Model: %s / Video model: %s / Lang: %s", args.model, video_model, args.lang)
-        for i, (idx, t) in enumerate(texts[:3]):
+        for i, (idx, t) in enumerate(samples["text"]):
             logger.info("  Text sample %d (row %d): %s...", i, idx, t[:80])
-        for i, (idx, u) in enumerate(image_urls[:3]):
+        for i, (idx, u) in enumerate(samples["image"]):
             logger.info("  Image sample %d (row %d): %s", i, idx, u)
-        for i, (idx, u) in enumerate(video_urls[:3]):
+        for i, (idx, u) in enumerate(samples["video"]):
             logger.info("  Video sample %d (row %d): %s", i, idx, u)
         return
 
     os.makedirs(args.output_dir, exist_ok=True)
 
-    text_results = []
-    image_results = []
-    video_results = []
-
-    # Run moderation
-    if do_text and texts:
-        logger.info("=== Text Moderation (%d rows, model=%s) ===", len(texts), args.model)
-        text_results = run_text_moderation(texts, args.model, args.lang)
-
-    if do_image and image_urls:
-        logger.info("=== Image Moderation (%d rows, model=%s) ===", len(image_urls), args.model)
-        image_results = run_image_moderation(image_urls, args.model, args.lang)
-
-    if do_video and video_urls:
-        logger.info("=== Video Moderation (%d rows, model=%s) ===", len(video_urls), video_model)
-        video_results = run_video_moderation(video_urls, video_model, args.lang, args.num_frames)
-
-    # Save results
-    effective_model = args.model
-    json_path = save_results_json(text_results, image_results, video_results, effective_model, args.output_dir)
-    txt_path = save_summary_txt(text_results, image_results, video_results, effective_model, args.output_dir)
-    xlsx_path = save_results_xlsx(text_results, image_results, video_results, effective_model, args.output_dir)
+    journal = CheckpointJournal(
+        args.checkpoint or os.path.join(args.output_dir, "checkpoint.jsonl"),
+        run_info={"input": os.path.abspath(args.excel), "model": args.model, "video_model": video_model,
+                  "lang": args.lang},
+    )
+    if args.resume or args.retry_failed:
+        try:
+            journal.load()
+        except CheckpointMismatchError as e:
+            logger.error("%s", e)
+            sys.exit(1)
+    elif args.batch_inference in (None, "import", "run"):
+        journal.start_fresh()
+
+    # One streamed pass over the input is routed to the modalities, so rows start moderating while
+    # the file is read
+    logger.info("Streaming test set from %s", args.excel)
+    modalities = [m for m, on in zip(MODALITIES, (do_text, do_image, do_video)) if on]
+    pending = {
+        m: journal.pending(m, rows, args.resume, args.retry_failed)
+        for m, rows in iter_test_sets(args.excel, modalities).items()
+    }
+
+    configure_downloads(args.max_media_mb * 1024 * 1024)
+    configure_text_chunking(args.long_text_chunk_bytes, max_workers=args.concurrency)
+    logger.info("Media process pool: %d workers", media_pool.configure_media_pool(args.cpu_workers))
+    media_cache = configure_media_cache(
+        args.media_cache_dir, max_bytes=args.media_cache_max_mb * 1024 * 1024, enabled=not args.no_media_cache,
+    )
 
-    logger.info("Results saved: %s", json_path)
-    logger.info("Summary saved: %s", txt_path)
-    logger.info("Excel saved:   %s", xlsx_path)
+    if args.batch_inference:
+        if not run_batch_inference(args, journal, pending):
+            return
+        cache = None
+    else:
+        cache = run_moderation(args, journal, pending, video_model)
+
+    # Reports are rebuilt from the journal so resumed runs include earlier rows; results are
+    # streamed from disk one at a time straight into every output file
+    report = ReportWriter(args.output_dir, args.model)
+    for modality, enabled in zip(MODALITIES, (do_text, do_image, do_video)):
+        if enabled:
+            report.write_section(modality, journal.results(modality), count=journal.count(modality))
+    paths = report.close()
+
+    logger.info("Results saved: %s", paths["json"])
+    logger.info("JSONL saved:   %s", paths["jsonl"])
+    logger.info("Summary saved: %s", paths["txt"])
+    logger.info("Excel saved:   %s", paths["xlsx"])
 
     # Print quick stats
-    total = len(text_results) + len(image_results) + len(video_results)
-    errors = sum(1 for r in text_results + image_results + video_results if r.error)
+    total, errors = report.summary.total, report.summary.errors
     logger.info("Done: %d total, %d success, %d errors", total, total - errors, errors)
+    if cache is not None and cache.enabled:
+        st = cache.stats()
+        logger.info("Result cache: %d hits, %d misses, %d entries (%.1f MB)",
+                    st["hits"], st["misses"], st["entries"], st["bytes"] / (1024 * 1024))
+        cache.close()
+    if media_cache.enabled:
+        st = media_cache.stats()
+        logger.info("Media cache: %d reused, %d downloaded, %d entries (%.1f MB)",
+                    st["hits"], st["misses"], st["entries"], st["bytes"] / (1024 * 1024))
+    for model_id, st in adaptive_limiter.stats().items():
+        logger.info(
+            "Throttle control %s: final limit=%.2f, %d ok, %d throttled, %d retries",
+            model_id, st["limit"], st["successes"], st["throttles"], st["retries"],
+        )
 
 
 if __name__ == "__main__":
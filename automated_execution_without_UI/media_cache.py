@@ -0,0 +1,164 @@
+"""On-disk LRU cache of downloaded media, keyed by URL.
+
+Each entry is a pair of files named after the SHA-256 of the URL: <key>.bin holds the body and
+<key>.json its validators (ETag / Last-Modified). The body file's mtime is its last use, so
+eviction needs no separate index. Entries are revalidated against the server before reuse.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_EVICT_EVERY = 16  # check the size cap once per this many stores
+_COPY_BYTES = 1024 * 1024
+
+
+class MediaCache:
+    """Thread-safe URL -> body file cache in a directory, capped at max_bytes (least recently used out)."""
+
+    def __init__(self, root, max_bytes=None, enabled=True):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._stores = 0
+        self._lock = threading.Lock()
+        if enabled:
+            os.makedirs(root, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.root, key)
+        return base + ".bin", base + ".json"
+
+    def lookup(self, url):
+        """Return the stored validators ({'etag', 'last_modified', 'size'}) for url, or None."""
+        if not self.enabled:
+            return None
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or not os.path.exists(body_path):
+            return None
+        return meta
+
+    def copy_to(self, url, out):
+        """Copy the cached body for url into the open file out and mark it as recently used.
+
+        Returns False, with nothing written, if the entry was evicted in the meantime; counts
+        as a hit otherwise.
+        """
+        body_path, _ = self._paths(url)
+        try:
+            f = open(body_path, "rb")
+        except FileNotFoundError:
+            return False
+        with f:
+            shutil.copyfileobj(f, out, _COPY_BYTES)
+        os.utime(body_path)
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store_file(self, url, path, etag=None, last_modified=None):
+        """Save a copy of a freshly downloaded body file; responses without validators are not cached."""
+        with self._lock:
+            self.misses += 1
+        if not self.enabled or not (etag or last_modified):
+            return
+        size = os.path.getsize(path)
+        if self.max_bytes and size > self.max_bytes:
+            return
+        body_path, meta_path = self._paths(url)
+        meta = {"url": url, "etag": etag, "last_modified": last_modified, "size": size,
+                "stored_at": time.time()}
+        # Write to temp files and rename so a reader never sees a partial entry
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "wb") as out, open(path, "rb") as f:
+            shutil.copyfileobj(f, out, _COPY_BYTES)
+        os.replace(tmp, body_path)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "wb") as out:
+            out.write(json.dumps(meta).encode("utf-8"))
+        os.replace(tmp, meta_path)
+        with self._lock:
+            self._stores += 1
+            due = self._stores % _EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the directory is under max_bytes."""
+        if not self.enabled or not self.max_bytes:
+            return
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.root):
+                if not name.endswith(".bin"):
+                    continue
+                path = os.path.join(self.root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            freed = removed = 0
+            for _, size, path in sorted(entries):
+                if total - freed <= self.max_bytes:
+                    break
+                for victim in (path, path[:-len(".bin")] + ".json"):
+                    try:
+                        os.remove(victim)
+                    except OSError:
+                        pass
+                freed += size
+                removed += 1
+            if removed:
+                logger.info("Media cache evicted %d entries (%d bytes)", removed, freed)
+
+    def stats(self):
+        """Return {'hits', 'misses', 'entries', 'bytes'}."""
+        entries = size = 0
+        if self.enabled:
+            for name in os.listdir(self.root):
+                if name.endswith(".bin"):
+                    entries += 1
+                    size += os.path.getsize(os.path.join(self.root, name))
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+# ---------------------------------------------------------------------------
+# Process-wide default cache
+# ---------------------------------------------------------------------------
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def configure_media_cache(root, max_bytes=None, enabled=True):
+    """Install the cache returned by default_media_cache()."""
+    global _default_cache
+    with _default_lock:
+        _default_cache = MediaCache(root, max_bytes=max_bytes, enabled=enabled)
+        return _default_cache
+
+
+def default_media_cache():
+    """Return the configured cache, or a disabled one if configure_media_cache() was never called."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = MediaCache(None, enabled=False)
+        return _default_cache
@@ -1,13 +1,33 @@
-import io
+import hashlib
+import logging
 import os
-import subprocess
 import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
-from PIL import Image
+from config import (
+    FRAME_BACKEND,
+    FRAME_HASH_METHOD,
+    IMAGE_MAX_MB,
+    MEDIA_DOWNLOAD_TIMEOUT,
+    MEDIA_MAX_MB,
+    RANGE_DOWNLOAD_MIN_MB,
+    RANGE_DOWNLOAD_PARTS,
+)
+from media_cache import default_media_cache
+from parent_modules import load_parent_module
 
-from config import MEDIA_DOWNLOAD_TIMEOUT
+logger = logging.getLogger(__name__)
+
+frame_extraction = load_parent_module("frame_extraction")
+FRAME_STRATEGIES = frame_extraction.FRAME_STRATEGIES
+
+# CPU-heavy transforms run in the parent project's process pool. Every function a worker runs
+# must live in this module: workers import it by name, but cannot import "parent_*" modules,
+# so parent functions (frame_extraction's, media_pool's shared-memory task) are reached through
+# wrappers here.
+media_pool = load_parent_module("media_pool")
 
 
 def timed_call(func, *args, **kwargs):
@@ -20,73 +40,278 @@ def timed_call(func, *args, **kwargs):
         return None, time.time() - start, str(exc)
 
 
+# ---------------------------------------------------------------------------
+# Downloads
+# ---------------------------------------------------------------------------
+
+_CHUNK_BYTES = 1024 * 1024
+
+_download_limits = {"max_bytes": MEDIA_MAX_MB * 1024 * 1024}
+
+
+class MediaTooLargeError(ValueError):
+    """The media body is larger than the configured download limit."""
+
+
+def configure_downloads(max_bytes):
+    """Set the download size limit (bytes) used by download_media_file() and download_media()."""
+    _download_limits["max_bytes"] = max_bytes
+
+
+def _too_large(size, max_bytes):
+    mb = 1024 * 1024
+    return MediaTooLargeError(f"media is {size / mb:.1f} MB, over the {max_bytes / mb:.0f} MB limit")
+
+
+def _head(session, url, timeout):
+    """HEAD the URL and return its headers, or None when the server does not allow HEAD."""
+    try:
+        resp = session.head(url, timeout=timeout, allow_redirects=True)
+    except Exception as exc:
+        logger.debug("HEAD %s failed: %s", url[:80], exc)
+        return None
+    # e.g. presigned S3 URLs are signed for GET only and answer HEAD with 403
+    return resp.headers if resp.ok else None
+
+
+def _validators_match(meta, headers):
+    etag = headers.get("ETag")
+    if etag and meta.get("etag"):
+        return etag == meta["etag"]
+    last_modified = headers.get("Last-Modified")
+    return bool(last_modified and last_modified == meta.get("last_modified"))
+
+
+def _stream_body(resp, out, max_bytes):
+    total = 0
+    for chunk in resp.iter_content(_CHUNK_BYTES):
+        total += len(chunk)
+        if total > max_bytes:
+            raise _too_large(total, max_bytes)
+        out.write(chunk)
+
+
+def _ranged_download(session, url, timeout, size, etag, out):
+    """Fetch size bytes as RANGE_DOWNLOAD_PARTS parallel Range requests written into out."""
+    part = -(-size // RANGE_DOWNLOAD_PARTS)
+    lock = threading.Lock()
+
+    def fetch(start):
+        end = min(start + part, size) - 1
+        headers = {"Range": f"bytes={start}-{end}"}
+        if etag and not etag.startswith("W/"):
+            headers["If-Range"] = etag  # the server sends the full new body if the file changed
+        with session.get(url, headers=headers, stream=True, timeout=timeout) as resp:
+            if resp.status_code != 206:
+                raise RuntimeError(f"server ignored the Range request (HTTP {resp.status_code})")
+            offset = start
+            for chunk in resp.iter_content(_CHUNK_BYTES):
+                with lock:
+                    out.seek(offset)
+                    out.write(chunk)
+                offset += len(chunk)
+        if offset != end + 1:
+            raise RuntimeError(f"short Range response for bytes {start}-{end}")
+
+    with ThreadPoolExecutor(max_workers=RANGE_DOWNLOAD_PARTS) as pool:
+        for future in [pool.submit(fetch, start) for start in range(0, size, part)]:
+            future.result()
+
+
+class MediaFile:
+    """A downloaded body in a temp file of its own; delete it with close() (or use as a context manager)."""
+
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self._sha256 = None
+
+    def sha256(self):
+        """Hex SHA-256 of the body, read from disk in chunks on first use."""
+        if self._sha256 is None:
+            h = hashlib.sha256()
+            with open(self.path, "rb") as f:
+                for chunk in iter(lambda: f.read(_CHUNK_BYTES), b""):
+                    h.update(chunk)
+            self._sha256 = h.hexdigest()
+        return self._sha256
+
+    def read(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def close(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def download_media_file(url, timeout=MEDIA_DOWNLOAD_TIMEOUT, max_bytes=None):
+    """Download media from URL into a temp file and return it as a MediaFile.
+
+    Uses the parent project's pooled HTTP session, so repeated downloads from the same host
+    reuse keep-alive connections instead of paying a new TLS handshake each time. A HEAD
+    request checks Content-Length against the size limit first, and the body is streamed to
+    disk and abandoned as soon as it passes the limit, so a download never holds the body in
+    memory. Large files that support byte ranges are fetched with parallel Range requests.
+    Bodies with an ETag or Last-Modified header go into the on-disk media cache and are reused
+    only after the server confirms they are unchanged.
+
+    max_bytes lowers the configured limit for this call. The caller owns the returned file.
+    Raises MediaTooLargeError when the body exceeds the limit.
+    """
+    # Looked up per call, so pool workers importing this module do not load boto3 through it
+    aws_clients = load_parent_module("aws_clients")
+    session = aws_clients.http_session()
+    timeout = aws_clients.http_timeout(timeout)
+    max_bytes = min(_download_limits["max_bytes"], max_bytes or _download_limits["max_bytes"])
+    cache = default_media_cache()
+    cached = cache.lookup(url)
+
+    fd, path = tempfile.mkstemp(prefix="media-")
+    try:
+        with os.fdopen(fd, "w+b") as body:
+            _download_body(session, url, timeout, max_bytes, cache, cached, body, path)
+    except BaseException:
+        os.remove(path)
+        raise
+    return MediaFile(path)
+
+
+def _download_body(session, url, timeout, max_bytes, cache, cached, body, path):
+    """Write url's body into body, the open file at path, from the cache while it is still valid."""
+    head = _head(session, url, timeout)
+    if cached and head is not None and _validators_match(cached, head) and cache.copy_to(url, body):
+        return
+    size = int(head.get("Content-Length") or 0) if head is not None else 0
+    if size > max_bytes:
+        raise _too_large(size, max_bytes)
+    etag = head.get("ETag") if head is not None else None
+    last_modified = head.get("Last-Modified") if head is not None else None
+
+    ranged = (
+        size >= RANGE_DOWNLOAD_MIN_MB * 1024 * 1024
+        and head.get("Accept-Ranges", "").lower() == "bytes"
+    )
+    if ranged:
+        try:
+            _ranged_download(session, url, timeout, size, etag, body)
+        except Exception as exc:
+            logger.warning("Range download failed for %s, retrying as one request: %s", url[:80], exc)
+            body.seek(0)
+            body.truncate()
+            ranged = False
+    if not ranged:
+        headers = {}
+        if cached and head is None:
+            # No HEAD: let a conditional GET decide whether the cached copy is still good
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+        with session.get(url, headers=headers, stream=True, timeout=timeout) as resp:
+            if resp.status_code == 304 and cached and cache.copy_to(url, body):
+                return
+            resp.raise_for_status()
+            length = int(resp.headers.get("Content-Length") or 0)
+            if length > max_bytes:
+                raise _too_large(length, max_bytes)
+            etag = resp.headers.get("ETag", etag)
+            last_modified = resp.headers.get("Last-Modified", last_modified)
+            _stream_body(resp, body, max_bytes)
+
+    body.flush()
+    cache.store_file(url, path, etag=etag, last_modified=last_modified)
+
+
 def download_media(url, timeout=MEDIA_DOWNLOAD_TIMEOUT):
-    """Download media from URL and return raw bytes."""
-    resp = requests.get(url, timeout=timeout)
-    resp.raise_for_status()
-    return resp.content
+    """Download an image and return its bytes.
+
+    Goes through download_media_file(), capped at IMAGE_MAX_MB: images are decoded in memory
+    anyway, so only they are read back whole. Videos stay on disk as MediaFile paths.
+    """
+    with download_media_file(url, timeout, max_bytes=IMAGE_MAX_MB * 1024 * 1024) as media:
+        return media.read()
 
 
-def normalize_image_bytes(image_bytes):
-    """Convert image bytes to a Bedrock-compatible format (JPEG/PNG).
+def normalize_image_bytes(image_bytes, model_id=None):
+    """Convert image bytes to a Bedrock-compatible format (JPEG/PNG) sized for the model.
 
     Returns (normalized_bytes, format_string) where format_string is 'jpeg' or 'png'.
-    WebP and other formats are converted to JPEG.
+    JPEG/PNG images within the model's long edge (see the parent image_preprocess.py) and the
+    Bedrock payload limit pass through untouched; larger images and other formats (WebP, BMP,
+    TIFF, etc.) are downscaled and re-encoded as JPEG.
     """
-    img = Image.open(io.BytesIO(image_bytes))
-    fmt = (img.format or "").upper()
+    return media_pool.run_cpu(_normalize_image_bytes, image_bytes, model_id)
+
 
-    if fmt in ("JPEG", "JPG"):
-        return image_bytes, "jpeg"
-    if fmt == "PNG":
-        return image_bytes, "png"
+def _normalize_image_bytes(image_bytes, model_id):
+    image_preprocess = load_parent_module("image_preprocess")
+    data, fmt, _ = image_preprocess.prepare_image(image_bytes, long_edge=image_preprocess.model_long_edge(model_id))
+    return data, fmt
 
-    # Convert everything else (WebP, BMP, TIFF, etc.) to JPEG
-    buf = io.BytesIO()
-    rgb_img = img.convert("RGB") if img.mode != "RGB" else img
-    rgb_img.save(buf, format="JPEG", quality=90)
-    return buf.getvalue(), "jpeg"
 
+def extract_video_frames(video_path, num_frames=5, strategy="uniform"):
+    """Extract frames from a downloaded video file.
 
-def extract_video_frames(video_bytes, num_frames=5):
-    """Extract evenly-spaced frames from video bytes using ffmpeg.
+    Frames are sampled at timestamps computed from the container duration (see the parent
+    frame_extraction.py), so no frame count pass is needed. Short MP4/AVI clips are decoded
+    in-process with OpenCV; others go to ffmpeg, which seeks to each timestamp (FRAME_BACKEND
+    overrides the choice). strategy "uniform" takes evenly spaced frames; "scene" keeps the most
+    distinct of a denser sample so short scenes are not missed.
+
+    Runs in the media process pool, which is handed only the path; the frames come back
+    through shared memory.
 
     Returns a list of (jpeg_bytes, 'jpeg') tuples.
     """
-    with tempfile.TemporaryDirectory() as tmp:
-        video_path = os.path.join(tmp, "input.mp4")
-        with open(video_path, "wb") as f:
-            f.write(video_bytes)
-
-        # Get total frame count
-        probe = subprocess.run(
-            [
-                "ffprobe", "-v", "error", "-select_streams", "v:0",
-                "-count_packets", "-show_entries", "stream=nb_read_packets",
-                "-of", "csv=p=0", video_path,
-            ],
-            capture_output=True, text=True,
-        )
-        total_frames = int(probe.stdout.strip()) if probe.stdout.strip() else 100
-        step = max(1, total_frames // num_frames)
-
-        output_pattern = os.path.join(tmp, "frame_%04d.jpg")
-        subprocess.run(
-            [
-                "ffmpeg", "-i", video_path,
-                "-vf", f"select='not(mod(n\\,{step}))',scale=640:-1",
-                "-vsync", "vfr", "-q:v", "2",
-                "-frames:v", str(num_frames),
-                output_pattern,
-            ],
-            capture_output=True, check=True,
-        )
-
-        frames = []
-        for i in range(1, num_frames + 1):
-            fp = os.path.join(tmp, f"frame_{i:04d}.jpg")
-            if os.path.exists(fp):
-                with open(fp, "rb") as f:
-                    frames.append((f.read(), "jpeg"))
-
-    return frames
+    frames = media_pool.run_cpu_frames(_extract_video_frames, video_path, num_frames, strategy,
+                                       shared_task=_frames_to_shared)
+    return [(jpeg, "jpeg") for jpeg in frames]
+
+
+def _frames_to_shared(name, func, args, kwargs):
+    # Worker side of run_cpu_frames(): parent_media_pool.frames_to_shared is not importable by name
+    return media_pool.frames_to_shared(name, func, args, kwargs)
+
+
+def _extract_video_frames(video_path, num_frames, strategy):
+    return frame_extraction.extract_frames_from_file(video_path, num_frames, strategy=strategy,
+                                                     backend=FRAME_BACKEND)
+
+
+def prepare_direct_video(video_path):
+    """Make a downloaded video file sendable inline to a direct video (Nova) model.
+
+    MP4 files under the 25 MB Converse limit pass through; other containers are remuxed to MP4
+    with a stream copy, and videos still over the limit are transcoded to a lower resolution and
+    bitrate (see the parent video_preprocess.py). Only the result, at most 25 MB, is read into memory.
+
+    Returns (video_bytes, 'mp4', stats) where stats['action'] is 'none', 'remux' or 'transcode'.
+    Raises ValueError when the video cannot be brought under the limit.
+
+    Unlike the transforms above this stays in the calling thread: ffmpeg already does the work
+    in its own process.
+    """
+    video_preprocess = load_parent_module("video_preprocess")
+    return video_preprocess.prepare_direct_video(video_path)
+
+
+def dedupe_video_frames(frames, threshold, method=FRAME_HASH_METHOD):
+    """Drop near-duplicate (jpeg_bytes, fmt) frames by perceptual hash.
+
+    Returns (kept_frames, dropped_count). A negative threshold keeps every frame.
+    """
+    drop = media_pool.run_cpu(_near_duplicates, [data for data, _ in frames], threshold, method)
+    return [frame for frame, dup in zip(frames, drop) if not dup], sum(drop)
+
+
+def _near_duplicates(jpegs, threshold, method):
+    return frame_extraction.near_duplicates(jpegs, threshold, method)
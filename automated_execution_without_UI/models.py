@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 
 @dataclass(frozen=True)
@@ -20,6 +20,19 @@ class ModerationResult:
     summary: str
 
 
+@dataclass(frozen=True)
+class ComprehendSignals:
+    language: str  # dominant language code, "" if detection failed
+    language_score: float = 0.0
+    sentiment: Optional[str] = None  # "POSITIVE", "NEGATIVE", "NEUTRAL", "MIXED"; None if unsupported
+    sentiment_score: Optional[float] = None  # confidence of that sentiment
+    entities: List[str] = field(default_factory=list)  # "TYPE: text"
+    key_phrases: List[str] = field(default_factory=list)
+    toxicity: Optional[float] = None  # highest segment toxicity; English only
+    toxic_labels: List[str] = field(default_factory=list)  # labels scoring >= 0.5 in any segment
+    error: Optional[str] = None
+
+
 @dataclass(frozen=True)
 class TextModerationResult:
     row_index: int
@@ -29,6 +42,13 @@ class TextModerationResult:
     moderation: Optional[ModerationResult]
     raw_llm_response: str
     error: Optional[str]
+    cache_hit: bool = False  # served from the result cache, no Bedrock call
+    comprehend: Optional[ComprehendSignals] = None  # set with --comprehend
+    lexicon_hits: List[str] = field(default_factory=list)  # "category:severity:term", set with --lexicon-policy
+    # Chunked long texts: {"start", "end", "risk", "categories"} per flagged chunk (character offsets)
+    flagged_spans: List[dict] = field(default_factory=list)
+    near_duplicate_of: Optional[int] = None  # row whose verdict was reused (--near-dup-threshold)
+    near_duplicate_similarity: Optional[float] = None  # estimated Jaccard similarity to that row
 
 
 @dataclass(frozen=True)
@@ -42,6 +62,8 @@ class ImageModerationResult:
     moderation: Optional[ModerationResult]
     raw_llm_response: str
     error: Optional[str]
+    cache_hit: bool = False  # served from the result cache, no Bedrock call
+    sent_size_bytes: int = 0  # size after downscaling/re-encoding, as sent to the model
 
 
 @dataclass(frozen=True)
@@ -56,3 +78,5 @@ class VideoModerationResult:
     moderation: Optional[ModerationResult]
     raw_llm_response: str
     error: Optional[str]
+    cache_hit: bool = False  # served from the result cache, no Bedrock call
+    frames_dropped: int = 0  # near-duplicate frames not sent to the model
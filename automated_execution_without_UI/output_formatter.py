@@ -1,9 +1,12 @@
 import json
 import os
+import textwrap
+import threading
 from dataclasses import asdict
 from datetime import datetime, timezone
 
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment, Font, PatternFill
 from openpyxl.utils import get_column_letter
 
@@ -13,25 +16,10 @@ from models import (
     VideoModerationResult,
 )
 
+# Report sections are always written in this order, one contiguous block per modality
+_MODALITIES = ("text", "image", "video")
 
-# ---------------------------------------------------------------------------
-# JSON output
-# ---------------------------------------------------------------------------
-
-def save_results_json(text_results, image_results, video_results, model_id, output_path):
-    """Write results.json containing all moderation results."""
-    data = {
-        "run_timestamp": datetime.now(timezone.utc).isoformat(),
-        "model_id": model_id,
-        "text_moderation": [_serialize_result(r) for r in text_results],
-        "image_moderation": [_serialize_result(r) for r in image_results],
-        "video_moderation": [_serialize_result(r) for r in video_results],
-        "timing_summary": compute_timing_summary(text_results, image_results, video_results),
-    }
-    filepath = os.path.join(output_path, "results.json")
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
-    return filepath
+_CATEGORY_NAMES = ("pornography", "violence", "tobacco_alcohol", "political_sensitivity", "profanity")
 
 
 def _serialize_result(result):
@@ -41,119 +29,300 @@ def _serialize_result(result):
     return d
 
 
+# ---------------------------------------------------------------------------
+# Incremental summary aggregates
+# ---------------------------------------------------------------------------
+
+class SummaryAccumulator:
+    """Running timing / detection / risk counters, updated one result at a time.
+
+    Holds a fixed number of counters regardless of how many rows pass through.
+    """
+
+    def __init__(self):
+        self._timing = {m: {"count": 0, "success": 0, "api_sec": 0.0, "total_sec": 0.0} for m in _MODALITIES}
+        self._detection = {name: {"total": 0, "detected": 0, "severity": {}} for name in _CATEGORY_NAMES}
+        self._risk = {
+            m: {"safe": 0, "low": 0, "medium": 0, "high": 0, "critical": 0, "error": 0} for m in _MODALITIES
+        }
+
+    def add(self, modality, result):
+        t = self._timing[modality]
+        t["count"] += 1
+        if result.error is None:
+            t["success"] += 1
+            t["api_sec"] += result.moderation_time_sec
+            t["total_sec"] += result.moderation_time_sec + getattr(result, "download_time_sec", 0.0)
+
+        m = result.moderation
+        risk = self._risk[modality]
+        if result.error or m is None:
+            risk["error"] += 1
+            return
+        risk[m.overall_risk] = risk.get(m.overall_risk, 0) + 1
+        for name in _CATEGORY_NAMES:
+            d = self._detection[name]
+            cat = getattr(m, name)
+            d["total"] += 1
+            if cat.detected:
+                d["detected"] += 1
+            d["severity"][cat.severity] = d["severity"].get(cat.severity, 0) + 1
+
+    @property
+    def total(self):
+        return sum(t["count"] for t in self._timing.values())
+
+    @property
+    def errors(self):
+        return sum(t["count"] - t["success"] for t in self._timing.values())
+
+    def timing_summary(self):
+        """Per-modality {'count', 'success', 'avg_api_sec', 'avg_total_sec'}."""
+        return {
+            m: {
+                "count": t["count"],
+                "success": t["success"],
+                "avg_api_sec": _avg(t["api_sec"], t["success"]),
+                "avg_total_sec": _avg(t["total_sec"], t["success"]),
+            }
+            for m, t in self._timing.items()
+        }
+
+    def detection_summary(self):
+        """Per-category {'total', 'detected', 'severity': {level: count}} over successfully parsed rows."""
+        return {name: dict(d, severity=dict(d["severity"])) for name, d in self._detection.items()}
+
+    def risk_distribution(self):
+        """Per-modality overall-risk counts; errors and parse failures count as 'error'."""
+        return {m: dict(counts) for m, counts in self._risk.items()}
+
+
+def compute_timing_summary(text_results, image_results, video_results):
+    """Compute per-category timing statistics."""
+    acc = SummaryAccumulator()
+    for modality, results in zip(_MODALITIES, (text_results, image_results, video_results)):
+        for r in results:
+            acc.add(modality, r)
+    return acc.timing_summary()
+
+
+def _avg(total, count):
+    return round(total / count, 3) if count else 0.0
+
+
+# ---------------------------------------------------------------------------
+# JSONL output
+# ---------------------------------------------------------------------------
+
+class JsonlResultWriter:
+    """Thread-safe appender writing one compact {"modality", "result"} line per finished row.
+
+    Every line is flushed as it is written, so the file is usable (and tail-able) while the run
+    is still in progress.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._fh = None
+
+    def open(self):
+        self._fh = open(self.path, "ab")
+        # A crash can leave a half-written last line; start the next record on a fresh line
+        if self._fh.tell() > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._fh.write(b"\n")
+        return self
+
+    @property
+    def closed(self):
+        return self._fh is None
+
+    def write(self, modality, result):
+        """Append one result; returns the byte offset of its line, or None once closed."""
+        line = json.dumps(
+            {"modality": modality, "result": _serialize_result(result)},
+            ensure_ascii=False, default=str,
+        )
+        data = (line + "\n").encode("utf-8")
+        with self._lock:
+            if self._fh is None:  # writer already closed after an interrupt
+                return None
+            offset = self._fh.tell()
+            self._fh.write(data)
+            self._fh.flush()
+        return offset
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------------------------------------------------------------------
+# JSON output
+# ---------------------------------------------------------------------------
+
+class _JsonReportWriter:
+    """Streams results.json one result at a time in the same layout json.dump(indent=2) produced."""
+
+    def __init__(self, path, model_id):
+        self._f = open(path, "w", encoding="utf-8")
+        self._f.write("{\n")
+        self._f.write(f'  "run_timestamp": {json.dumps(datetime.now(timezone.utc).isoformat())},\n')
+        self._f.write(f'  "model_id": {json.dumps(model_id, ensure_ascii=False)},\n')
+        self._first = True
+
+    def begin_section(self, modality, count):
+        self._f.write(f'  "{modality}_moderation": [')
+        self._first = True
+
+    def add(self, modality, result):
+        item = json.dumps(_serialize_result(result), indent=2, ensure_ascii=False, default=str)
+        self._f.write(("\n" if self._first else ",\n") + textwrap.indent(item, "    "))
+        self._first = False
+
+    def end_section(self, modality):
+        self._f.write("],\n" if self._first else "\n  ],\n")
+
+    def close(self, summary):
+        timing = json.dumps(summary.timing_summary(), indent=2)
+        self._f.write('  "timing_summary": ' + textwrap.indent(timing, "  ").lstrip() + "\n}")
+        self._f.close()
+
+
+def save_results_json(text_results, image_results, video_results, model_id, output_path):
+    """Write results.json containing all moderation results."""
+    report = ReportWriter(output_path, model_id, formats=("json",))
+    _write_all(report, text_results, image_results, video_results)
+    return report.close()["json"]
+
+
 # ---------------------------------------------------------------------------
 # Summary text
 # ---------------------------------------------------------------------------
 
-def save_summary_txt(text_results, image_results, video_results, model_id, output_path):
-    """Write summary.txt with human-readable tables."""
-    timestamp = datetime.now(timezone.utc).isoformat()
-    lines = [
-        f"Run: {timestamp}",
-        f"Model: {model_id}",
-        "",
-    ]
+_TXT_HEADERS = {
+    "text": (
+        f" {'Row':>3} | {'Time(s)':>8} | {'Risk':>8} | {'Porn':>6} | {'Violence':>8} | {'Tobacco':>7} | {'Political':>9} | {'Profanity':>9} | Summary",
+        125,
+    ),
+    "image": (
+        f" {'Row':>3} | {'DL(s)':>8} | {'Mod(s)':>8} | {'Size(KB)':>8} | {'Risk':>8} | {'Detected Categories':30} | Summary",
+        120,
+    ),
+    "video": (
+        f" {'Row':>3} | {'DL(s)':>8} | {'Mod(s)':>8} | {'Method':>10} | {'Size(MB)':>8} | {'Risk':>8} | {'Detected Categories':30} | Summary",
+        130,
+    ),
+}
 
-    # --- TEXT ---
-    lines.append("=" * 60)
-    lines.append(f"  TEXT MODERATION ({len(text_results)} rows)")
-    lines.append("=" * 60)
-    lines.append(
-        f" {'Row':>3} | {'Time(s)':>8} | {'Risk':>8} | {'Porn':>6} | {'Violence':>8} | {'Tobacco':>7} | {'Political':>9} | {'Profanity':>9} | Summary"
-    )
-    lines.append("-" * 125)
-    for r in text_results:
-        if r.error:
-            lines.append(f" {r.row_index:>3} | {'ERROR':>8} | {'-':>8} | {'-':>6} | {'-':>8} | {'-':>7} | {'-':>9} | {'-':>9} | {r.error[:50]}")
-        else:
-            m = r.moderation
-            risk = m.overall_risk if m else "-"
-            porn = m.pornography.severity if m else "-"
-            viol = m.violence.severity if m else "-"
-            toba = m.tobacco_alcohol.severity if m else "-"
-            poli = m.political_sensitivity.severity if m else "-"
-            prof = m.profanity.severity if m else "-"
-            summ = (m.summary if m else "")[:50]
-            lines.append(
-                f" {r.row_index:>3} | {r.moderation_time_sec:>8.3f} | {risk:>8} | {porn:>6} | {viol:>8} | {toba:>7} | {poli:>9} | {prof:>9} | {summ}"
-            )
-    lines.append("")
-
-    # --- IMAGE ---
-    lines.append("=" * 60)
-    lines.append(f"  IMAGE MODERATION ({len(image_results)} rows)")
-    lines.append("=" * 60)
-    lines.append(
-        f" {'Row':>3} | {'DL(s)':>8} | {'Mod(s)':>8} | {'Size(KB)':>8} | {'Risk':>8} | {'Detected Categories':30} | Summary"
-    )
-    lines.append("-" * 120)
-    for r in image_results:
-        if r.error:
-            lines.append(f" {r.row_index:>3} | {r.download_time_sec:>8.3f} | {'ERROR':>8} | {'-':>8} | {'-':>8} | {'-':30} | {r.error[:50]}")
-        else:
-            m = r.moderation
-            size_kb = r.image_size_bytes // 1024
-            risk = m.overall_risk if m else "-"
-            detected = _detected_categories(m) if m else "-"
-            summ = (m.summary if m else "")[:50]
-            lines.append(
-                f" {r.row_index:>3} | {r.download_time_sec:>8.3f} | {r.moderation_time_sec:>8.3f} | {size_kb:>8} | {risk:>8} | {detected:30} | {summ}"
-            )
-    lines.append("")
-
-    # --- VIDEO ---
-    lines.append("=" * 60)
-    lines.append(f"  VIDEO MODERATION ({len(video_results)} rows)")
-    lines.append("=" * 60)
-    lines.append(
-        f" {'Row':>3} | {'DL(s)':>8} | {'Mod(s)':>8} | {'Method':>10} | {'Size(MB)':>8} | {'Risk':>8} | {'Detected Categories':30} | Summary"
-    )
-    lines.append("-" * 130)
-    for r in video_results:
-        if r.error:
-            lines.append(
-                f" {r.row_index:>3} | {r.download_time_sec:>8.3f} | {'ERROR':>8} | {r.analysis_method:>10} | {'-':>8} | {'-':>8} | {'-':30} | {r.error[:40]}"
-            )
-        else:
-            m = r.moderation
-            size_mb = r.video_size_bytes / (1024 * 1024)
-            risk = m.overall_risk if m else "-"
-            detected = _detected_categories(m) if m else "-"
-            summ = (m.summary if m else "")[:40]
+
+def _txt_text_line(r):
+    if r.error:
+        return f" {r.row_index:>3} | {'ERROR':>8} | {'-':>8} | {'-':>6} | {'-':>8} | {'-':>7} | {'-':>9} | {'-':>9} | {r.error[:50]}"
+    m = r.moderation
+    risk = m.overall_risk if m else "-"
+    porn = m.pornography.severity if m else "-"
+    viol = m.violence.severity if m else "-"
+    toba = m.tobacco_alcohol.severity if m else "-"
+    poli = m.political_sensitivity.severity if m else "-"
+    prof = m.profanity.severity if m else "-"
+    summ = (m.summary if m else "")[:50]
+    if r.near_duplicate_of is not None:
+        summ = f"[near-dup of row {r.near_duplicate_of}] {summ}"
+    return f" {r.row_index:>3} | {r.moderation_time_sec:>8.3f} | {risk:>8} | {porn:>6} | {viol:>8} | {toba:>7} | {poli:>9} | {prof:>9} | {summ}"
+
+
+def _txt_image_line(r):
+    if r.error:
+        return f" {r.row_index:>3} | {r.download_time_sec:>8.3f} | {'ERROR':>8} | {'-':>8} | {'-':>8} | {'-':30} | {r.error[:50]}"
+    m = r.moderation
+    size_kb = r.image_size_bytes // 1024
+    risk = m.overall_risk if m else "-"
+    detected = _detected_categories(m) if m else "-"
+    summ = (m.summary if m else "")[:50]
+    return f" {r.row_index:>3} | {r.download_time_sec:>8.3f} | {r.moderation_time_sec:>8.3f} | {size_kb:>8} | {risk:>8} | {detected:30} | {summ}"
+
+
+def _txt_video_line(r):
+    if r.error:
+        return f" {r.row_index:>3} | {r.download_time_sec:>8.3f} | {'ERROR':>8} | {r.analysis_method:>10} | {'-':>8} | {'-':>8} | {'-':30} | {r.error[:40]}"
+    m = r.moderation
+    size_mb = r.video_size_bytes / (1024 * 1024)
+    risk = m.overall_risk if m else "-"
+    detected = _detected_categories(m) if m else "-"
+    summ = (m.summary if m else "")[:40]
+    return f" {r.row_index:>3} | {r.download_time_sec:>8.3f} | {r.moderation_time_sec:>8.3f} | {r.analysis_method:>10} | {size_mb:>8.1f} | {risk:>8} | {detected:30} | {summ}"
+
+
+_TXT_LINES = {"text": _txt_text_line, "image": _txt_image_line, "video": _txt_video_line}
+
+
+class _SummaryTxtWriter:
+    """Streams summary.txt: one table per modality, then the timing summary."""
+
+    def __init__(self, path, model_id):
+        self._f = open(path, "w", encoding="utf-8")
+        self._f.write(f"Run: {datetime.now(timezone.utc).isoformat()}\nModel: {model_id}\n\n")
+
+    def begin_section(self, modality, count):
+        header, rule = _TXT_HEADERS[modality]
+        self._f.write("=" * 60 + "\n")
+        self._f.write(f"  {modality.upper()} MODERATION ({count} rows)\n")
+        self._f.write("=" * 60 + "\n")
+        self._f.write(header + "\n")
+        self._f.write("-" * rule + "\n")
+
+    def add(self, modality, result):
+        self._f.write(_TXT_LINES[modality](result) + "\n")
+
+    def end_section(self, modality):
+        self._f.write("\n")
+
+    def close(self, summary):
+        timing = summary.timing_summary()
+        lines = [
+            "=" * 60,
+            "  TIMING SUMMARY",
+            "=" * 60,
+            f" {'Category':>9} | {'Count':>5} | {'Success':>7} | {'Avg API(s)':>10} | {'Avg Total(s)':>12}",
+            "-" * 55,
+        ]
+        for cat in _MODALITIES:
+            t = timing.get(cat, {})
             lines.append(
-                f" {r.row_index:>3} | {r.download_time_sec:>8.3f} | {r.moderation_time_sec:>8.3f} | {r.analysis_method:>10} | {size_mb:>8.1f} | {risk:>8} | {detected:30} | {summ}"
+                f" {cat.capitalize():>9} | {t.get('count', 0):>5} | {t.get('success', 0):>7} | "
+                f"{t.get('avg_api_sec', 0):>10.3f} | {t.get('avg_total_sec', 0):>12.3f}"
             )
-    lines.append("")
-
-    # --- TIMING ---
-    timing = compute_timing_summary(text_results, image_results, video_results)
-    lines.append("=" * 60)
-    lines.append("  TIMING SUMMARY")
-    lines.append("=" * 60)
-    lines.append(f" {'Category':>9} | {'Count':>5} | {'Success':>7} | {'Avg API(s)':>10} | {'Avg Total(s)':>12}")
-    lines.append("-" * 55)
-    for cat in ("text", "image", "video"):
-        t = timing.get(cat, {})
-        lines.append(
-            f" {cat.capitalize():>9} | {t.get('count', 0):>5} | {t.get('success', 0):>7} | "
-            f"{t.get('avg_api_sec', 0):>10.3f} | {t.get('avg_total_sec', 0):>12.3f}"
-        )
-    lines.append("")
+        lines.append("")
+        self._f.write("\n".join(lines))
+        self._f.close()
 
-    filepath = os.path.join(output_path, "summary.txt")
-    with open(filepath, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
-    return filepath
+
+def save_summary_txt(text_results, image_results, video_results, model_id, output_path):
+    """Write summary.txt with human-readable tables."""
+    report = ReportWriter(output_path, model_id, formats=("txt",))
+    _write_all(report, text_results, image_results, video_results)
+    return report.close()["txt"]
 
 
 # ---------------------------------------------------------------------------
 # Excel output
 # ---------------------------------------------------------------------------
 
-_CATEGORY_NAMES = ("pornography", "violence", "tobacco_alcohol", "political_sensitivity", "profanity")
-
 _HEADER_FONT = Font(bold=True, color="FFFFFF", size=11)
 _HEADER_FILL = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
+_HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center")
 _ERROR_FILL = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
 _SEVERITY_FILLS = {
     "high": PatternFill(start_color="FF6B6B", end_color="FF6B6B", fill_type="solid"),
@@ -161,316 +330,375 @@ _SEVERITY_FILLS = {
     "low": PatternFill(start_color="B5E48C", end_color="B5E48C", fill_type="solid"),
     "critical": PatternFill(start_color="D90429", end_color="D90429", fill_type="solid"),
 }
+_CRITICAL_FONT = Font(color="FFFFFF", bold=True)
+_SECTION_FONT = Font(bold=True, size=12)
 _WRAP_ALIGNMENT = Alignment(wrap_text=True, vertical="top")
 
+_WIDTH_SAMPLE_ROWS = 50  # rows (header included) used to estimate column widths
 
-def save_results_xlsx(text_results, image_results, video_results, model_id, output_path):
-    """Write results.xlsx with 4 sheets: Text, Image, Video, Summary."""
-    wb = openpyxl.Workbook()
-
-    _build_text_sheet(wb, text_results)
-    _build_image_sheet(wb, image_results)
-    _build_video_sheet(wb, video_results)
-    _build_summary_sheet(wb, text_results, image_results, video_results, model_id)
 
-    # Remove the default empty sheet created by Workbook()
-    if "Sheet" in wb.sheetnames:
-        del wb["Sheet"]
+def _cat_severity(moderation, name):
+    if moderation is None:
+        return "-"
+    return getattr(moderation, name).severity
 
-    filepath = os.path.join(output_path, "results.xlsx")
-    wb.save(filepath)
-    return filepath
 
+def _cat_details(moderation, name):
+    if moderation is None:
+        return ""
+    return getattr(moderation, name).details
 
-def _style_header_row(ws, num_cols):
-    """Apply header styling to row 1."""
-    for col in range(1, num_cols + 1):
-        cell = ws.cell(row=1, column=col)
-        cell.font = _HEADER_FONT
-        cell.fill = _HEADER_FILL
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-    ws.freeze_panes = "A2"
 
+def _category_cells(m):
+    cells = []
+    for name in _CATEGORY_NAMES:
+        cells += [_cat_severity(m, name), _cat_details(m, name)]
+    return cells
 
-def _apply_severity_fill(cell, severity):
-    """Color-code a cell by severity level."""
-    fill = _SEVERITY_FILLS.get(severity)
-    if fill:
-        if severity == "critical":
-            cell.font = Font(color="FFFFFF", bold=True)
-        cell.fill = fill
 
+def _overall_risk(r):
+    return r.moderation.overall_risk if r.moderation else ("ERROR" if r.error else "-")
 
-def _auto_column_widths(ws, min_width=10, max_width=60):
-    """Set column widths based on content, capped at max_width."""
-    for col_idx in range(1, ws.max_column + 1):
-        widest = min_width
-        for row_idx in range(1, min(ws.max_row + 1, 50)):
-            val = ws.cell(row=row_idx, column=col_idx).value
-            if val is not None:
-                widest = max(widest, min(len(str(val)), max_width))
-        ws.column_dimensions[get_column_letter(col_idx)].width = widest + 2
 
+_CATEGORY_HEADERS = [
+    "Porn Severity", "Porn Details",
+    "Violence Severity", "Violence Details",
+    "Tobacco Severity", "Tobacco Details",
+    "Political Severity", "Political Details",
+    "Profanity Severity", "Profanity Details",
+]
 
-def _cat_severity(moderation, name):
-    if moderation is None:
-        return "-"
-    return getattr(moderation, name).severity
+# Filled when the run used --comprehend
+_COMPREHEND_HEADERS = ["Language", "Sentiment", "Toxicity", "Toxic Labels", "Entities", "Key Phrases"]
 
 
-def _cat_detected(moderation, name):
-    if moderation is None:
-        return False
-    return getattr(moderation, name).detected
+def _comprehend_cells(signals):
+    if signals is None:
+        return [""] * len(_COMPREHEND_HEADERS)
+    return [
+        signals.language or signals.error or "",
+        signals.sentiment or "",
+        "" if signals.toxicity is None else signals.toxicity,
+        ", ".join(signals.toxic_labels),
+        "\n".join(signals.entities),
+        ", ".join(signals.key_phrases),
+    ]
 
 
-def _cat_details(moderation, name):
-    if moderation is None:
+def _near_duplicate_cell(r):
+    if r.near_duplicate_of is None:
         return ""
-    return getattr(moderation, name).details
+    return f"row {r.near_duplicate_of} ({r.near_duplicate_similarity:.2f})"
+
+
+def _span_cell(spans):
+    return "\n".join(f"{s['start']}-{s['end']} {s['risk']}: {', '.join(s['categories'])}" for s in spans)
+
+
+# modality -> (sheet title, headers, row builder, 1-based overall-risk column, extra wrapped columns)
+# The five severity/details pairs follow the overall-risk column, then Summary.
+_SHEETS = {
+    "text": (
+        "Text Moderation",
+        ["Row", "Moderation Time(s)", "Overall Risk"] + _CATEGORY_HEADERS + ["Summary", "Original Text", "Error"]
+        + _COMPREHEND_HEADERS + ["Lexicon Hits", "Flagged Spans", "Near Duplicate Of"],
+        lambda r: [r.row_index, r.moderation_time_sec, _overall_risk(r)] + _category_cells(r.moderation)
+        + [r.moderation.summary if r.moderation else "", r.original_text[:500], r.error or ""]
+        + _comprehend_cells(r.comprehend) + ["\n".join(r.lexicon_hits), _span_cell(r.flagged_spans)]
+        + [_near_duplicate_cell(r)],
+        3, (15, 21, 22, 23, 24),
+    ),
+    "image": (
+        "Image Moderation",
+        ["Row", "Download Time(s)", "Moderation Time(s)", "Size(KB)", "Overall Risk"] + _CATEGORY_HEADERS
+        + ["Summary", "Image URL", "Error", "Sent Size(KB)"],
+        lambda r: [r.row_index, r.download_time_sec, r.moderation_time_sec, r.image_size_bytes // 1024,
+                   _overall_risk(r)] + _category_cells(r.moderation)
+        + [r.moderation.summary if r.moderation else "", r.image_url, r.error or "", r.sent_size_bytes // 1024],
+        5, (),
+    ),
+    "video": (
+        "Video Moderation",
+        ["Row", "Download Time(s)", "Moderation Time(s)", "Method", "Size(MB)", "Overall Risk"]
+        + _CATEGORY_HEADERS + ["Summary", "Video URL", "Error", "Frames Dropped"],
+        lambda r: [r.row_index, r.download_time_sec, r.moderation_time_sec, r.analysis_method,
+                   round(r.video_size_bytes / (1024 * 1024), 1), _overall_risk(r)] + _category_cells(r.moderation)
+        + [r.moderation.summary if r.moderation else "", r.video_url, r.error or "", r.frames_dropped],
+        6, (),
+    ),
+}
 
 
-# --- Text sheet ---
+def _styled(ws, value, font=None, fill=None, alignment=None):
+    cell = WriteOnlyCell(ws, value=value)
+    if font is not None:
+        cell.font = font
+    if fill is not None:
+        cell.fill = fill
+    if alignment is not None:
+        cell.alignment = alignment
+    return cell
 
-def _build_text_sheet(wb, results):
-    ws = wb.create_sheet("Text Moderation")
-    headers = [
-        "Row", "Moderation Time(s)", "Overall Risk",
-        "Porn Severity", "Porn Details",
-        "Violence Severity", "Violence Details",
-        "Tobacco Severity", "Tobacco Details",
-        "Political Severity", "Political Details",
-        "Profanity Severity", "Profanity Details",
-        "Summary", "Original Text", "Error",
-    ]
-    ws.append(headers)
-    _style_header_row(ws, len(headers))
-
-    for r in results:
-        m = r.moderation
-        row = [
-            r.row_index,
-            r.moderation_time_sec,
-            m.overall_risk if m else ("ERROR" if r.error else "-"),
-            _cat_severity(m, "pornography"), _cat_details(m, "pornography"),
-            _cat_severity(m, "violence"), _cat_details(m, "violence"),
-            _cat_severity(m, "tobacco_alcohol"), _cat_details(m, "tobacco_alcohol"),
-            _cat_severity(m, "political_sensitivity"), _cat_details(m, "political_sensitivity"),
-            _cat_severity(m, "profanity"), _cat_details(m, "profanity"),
-            m.summary if m else "",
-            r.original_text[:500],
-            r.error or "",
-        ]
-        ws.append(row)
-        row_idx = ws.max_row
-        # Color severity cells
-        for col, cat_name in [(4, "pornography"), (6, "violence"), (8, "tobacco_alcohol"),
-                              (10, "political_sensitivity"), (12, "profanity")]:
-            _apply_severity_fill(ws.cell(row=row_idx, column=col), _cat_severity(m, cat_name))
-        # Color overall risk
-        _apply_severity_fill(ws.cell(row=row_idx, column=3), m.overall_risk if m else "")
+
+def _header_cells(ws, headers):
+    return [_styled(ws, h, _HEADER_FONT, _HEADER_FILL, _HEADER_ALIGNMENT) for h in headers]
+
+
+def _severity_style(severity):
+    """(font, fill) used to color-code a severity level."""
+    fill = _SEVERITY_FILLS.get(severity)
+    return (_CRITICAL_FONT if severity == "critical" else None), fill
+
+
+class _BufferedSheet:
+    """Write-only worksheet that holds back its first rows to size the columns.
+
+    Write-only sheets emit column widths and pane settings before the first row, so the
+    first _WIDTH_SAMPLE_ROWS rows are buffered, measured, and then flushed; every later row
+    is streamed straight to disk.
+    """
+
+    def __init__(self, wb, title, freeze_header=True, min_width=10, max_width=60):
+        self.ws = wb.create_sheet(title)
+        self._freeze_header = freeze_header
+        self._min_width = min_width
+        self._max_width = max_width
+        self._buffer = []
+
+    def append(self, row):
+        if self._buffer is None:
+            self.ws.append(row)
+            return
+        self._buffer.append(row)
+        if len(self._buffer) >= _WIDTH_SAMPLE_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self._buffer is None:
+            return
+        widths = {}
+        for row in self._buffer:
+            for col_idx, cell in enumerate(row, 1):
+                val = getattr(cell, "value", cell)  # styled header cells and plain values
+                if val is not None:
+                    widths[col_idx] = max(widths.get(col_idx, self._min_width), min(len(str(val)), self._max_width))
+        for col_idx, width in widths.items():
+            self.ws.column_dimensions[get_column_letter(col_idx)].width = width + 2
+        if self._freeze_header:
+            self.ws.freeze_panes = "A2"
+        for row in self._buffer:
+            self.ws.append(row)
+        self._buffer = None
+
+
+class _XlsxReportWriter:
+    """Streams results.xlsx with openpyxl's write-only mode: Text, Image, Video, Summary sheets."""
+
+    def __init__(self, path, model_id):
+        self.path = path
+        self.model_id = model_id
+        self._wb = openpyxl.Workbook(write_only=True)
+        self._sheet = None
+
+    def begin_section(self, modality, count):
+        title, headers = _SHEETS[modality][:2]
+        self._sheet = _BufferedSheet(self._wb, title)
+        self._sheet.append(_header_cells(self._sheet.ws, headers))
+
+    def add(self, modality, result):
+        _, headers, build_row, risk_col, extra_wrap = _SHEETS[modality]
+        ws = self._sheet.ws
+        m = result.moderation
+        cells = [WriteOnlyCell(ws, value=v) for v in build_row(result)]
+
+        # Color severity cells and the overall risk
+        sev_cols = [risk_col + 1 + 2 * k for k in range(len(_CATEGORY_NAMES))]
+        for col, name in zip(sev_cols, _CATEGORY_NAMES):
+            font, fill = _severity_style(_cat_severity(m, name))
+            _apply_style(cells[col - 1], font, fill)
+        font, fill = _severity_style(m.overall_risk if m else "")
+        _apply_style(cells[risk_col - 1], font, fill)
         # Error row highlight
-        if r.error:
-            for col in range(1, len(headers) + 1):
-                ws.cell(row=row_idx, column=col).fill = _ERROR_FILL
+        if result.error:
+            for cell in cells:
+                cell.fill = _ERROR_FILL
         # Wrap text for details and summary columns
-        for col in (5, 7, 9, 11, 13, 14, 15):
-            ws.cell(row=row_idx, column=col).alignment = _WRAP_ALIGNMENT
+        for col in [c + 1 for c in sev_cols] + [risk_col + 11] + list(extra_wrap):
+            cells[col - 1].alignment = _WRAP_ALIGNMENT
+        self._sheet.append(cells)
+
+    def end_section(self, modality):
+        self._sheet.flush()
+        self._sheet = None
+
+    def close(self, summary):
+        self._write_summary_sheet(summary)
+        self._wb.save(self.path)
+
+    def _write_summary_sheet(self, summary):
+        sheet = _BufferedSheet(self._wb, "Summary", freeze_header=False, min_width=12)
+        ws = sheet.ws
+        rows = []
+
+        # Run info
+        rows.append(["Run Timestamp", datetime.now(timezone.utc).isoformat()])
+        rows.append(["Model", self.model_id])
+        rows.append([])
+
+        # Timing summary
+        timing = summary.timing_summary()
+        rows.append(_header_cells(ws, ["Category", "Count", "Success", "Errors", "Avg API(s)", "Avg Total(s)"]))
+        for cat in _MODALITIES:
+            t = timing.get(cat, {})
+            rows.append([
+                cat.capitalize(),
+                t.get("count", 0),
+                t.get("success", 0),
+                t.get("count", 0) - t.get("success", 0),
+                t.get("avg_api_sec", 0),
+                t.get("avg_total_sec", 0),
+            ])
+        rows.append([])
+
+        # Detection summary per category
+        rows.append([_styled(ws, "Detection Summary by Category", font=_SECTION_FONT)])
+        rows.append([])
+        rows.append(_header_cells(ws, ["Category", "Total Checked", "Detected Count", "Detection Rate",
+                                       "High/Critical Count", "Severity Distribution"]))
+        for cat_name, d in summary.detection_summary().items():
+            severity_counts = d["severity"]
+            total, detected = d["total"], d["detected"]
+            high_critical = severity_counts.get("high", 0) + severity_counts.get("critical", 0)
+            dist = ", ".join(f"{k}={v}" for k, v in sorted(severity_counts.items()) if k != "none")
+            rate = f"{detected / total * 100:.1f}%" if total else "N/A"
+            rows.append([cat_name, total, detected, rate, high_critical, dist or "all none"])
+        rows.append([])
+
+        # Overall risk distribution
+        rows.append([_styled(ws, "Overall Risk Distribution", font=_SECTION_FONT)])
+        rows.append([])
+        rows.append(_header_cells(ws, ["Content Type", "safe", "low", "medium", "high", "critical",
+                                       "error/parse_fail"]))
+        for cat, counts in summary.risk_distribution().items():
+            rows.append([cat.capitalize(), counts["safe"], counts["low"], counts["medium"],
+                         counts["high"], counts["critical"], counts["error"]])
+
+        for row in rows:
+            sheet.append(row)
+        sheet.flush()
+
+
+def _apply_style(cell, font, fill):
+    if fill is not None:
+        if font is not None:
+            cell.font = font
+        cell.fill = fill
 
-    _auto_column_widths(ws)
 
+def save_results_xlsx(text_results, image_results, video_results, model_id, output_path):
+    """Write results.xlsx with 4 sheets: Text, Image, Video, Summary."""
+    report = ReportWriter(output_path, model_id, formats=("xlsx",))
+    _write_all(report, text_results, image_results, video_results)
+    return report.close()["xlsx"]
 
-# --- Image sheet ---
 
-def _build_image_sheet(wb, results):
-    ws = wb.create_sheet("Image Moderation")
-    headers = [
-        "Row", "Download Time(s)", "Moderation Time(s)", "Size(KB)", "Overall Risk",
-        "Porn Severity", "Porn Details",
-        "Violence Severity", "Violence Details",
-        "Tobacco Severity", "Tobacco Details",
-        "Political Severity", "Political Details",
-        "Profanity Severity", "Profanity Details",
-        "Summary", "Image URL", "Error",
-    ]
-    ws.append(headers)
-    _style_header_row(ws, len(headers))
-
-    for r in results:
-        m = r.moderation
-        row = [
-            r.row_index,
-            r.download_time_sec,
-            r.moderation_time_sec,
-            r.image_size_bytes // 1024,
-            m.overall_risk if m else ("ERROR" if r.error else "-"),
-            _cat_severity(m, "pornography"), _cat_details(m, "pornography"),
-            _cat_severity(m, "violence"), _cat_details(m, "violence"),
-            _cat_severity(m, "tobacco_alcohol"), _cat_details(m, "tobacco_alcohol"),
-            _cat_severity(m, "political_sensitivity"), _cat_details(m, "political_sensitivity"),
-            _cat_severity(m, "profanity"), _cat_details(m, "profanity"),
-            m.summary if m else "",
-            r.image_url,
-            r.error or "",
-        ]
-        ws.append(row)
-        row_idx = ws.max_row
-        for col, cat_name in [(6, "pornography"), (8, "violence"), (10, "tobacco_alcohol"),
-                              (12, "political_sensitivity"), (14, "profanity")]:
-            _apply_severity_fill(ws.cell(row=row_idx, column=col), _cat_severity(m, cat_name))
-        _apply_severity_fill(ws.cell(row=row_idx, column=5), m.overall_risk if m else "")
-        if r.error:
-            for col in range(1, len(headers) + 1):
-                ws.cell(row=row_idx, column=col).fill = _ERROR_FILL
-        for col in (7, 9, 11, 13, 15, 16):
-            ws.cell(row=row_idx, column=col).alignment = _WRAP_ALIGNMENT
-
-    _auto_column_widths(ws)
-
-
-# --- Video sheet ---
-
-def _build_video_sheet(wb, results):
-    ws = wb.create_sheet("Video Moderation")
-    headers = [
-        "Row", "Download Time(s)", "Moderation Time(s)", "Method", "Size(MB)", "Overall Risk",
-        "Porn Severity", "Porn Details",
-        "Violence Severity", "Violence Details",
-        "Tobacco Severity", "Tobacco Details",
-        "Political Severity", "Political Details",
-        "Profanity Severity", "Profanity Details",
-        "Summary", "Video URL", "Error",
-    ]
-    ws.append(headers)
-    _style_header_row(ws, len(headers))
-
-    for r in results:
-        m = r.moderation
-        row = [
-            r.row_index,
-            r.download_time_sec,
-            r.moderation_time_sec,
-            r.analysis_method,
-            round(r.video_size_bytes / (1024 * 1024), 1),
-            m.overall_risk if m else ("ERROR" if r.error else "-"),
-            _cat_severity(m, "pornography"), _cat_details(m, "pornography"),
-            _cat_severity(m, "violence"), _cat_details(m, "violence"),
-            _cat_severity(m, "tobacco_alcohol"), _cat_details(m, "tobacco_alcohol"),
-            _cat_severity(m, "political_sensitivity"), _cat_details(m, "political_sensitivity"),
-            _cat_severity(m, "profanity"), _cat_details(m, "profanity"),
-            m.summary if m else "",
-            r.video_url,
-            r.error or "",
-        ]
-        ws.append(row)
-        row_idx = ws.max_row
-        for col, cat_name in [(7, "pornography"), (9, "violence"), (11, "tobacco_alcohol"),
-                              (13, "political_sensitivity"), (15, "profanity")]:
-            _apply_severity_fill(ws.cell(row=row_idx, column=col), _cat_severity(m, cat_name))
-        _apply_severity_fill(ws.cell(row=row_idx, column=6), m.overall_risk if m else "")
-        if r.error:
-            for col in range(1, len(headers) + 1):
-                ws.cell(row=row_idx, column=col).fill = _ERROR_FILL
-        for col in (8, 10, 12, 14, 16, 17):
-            ws.cell(row=row_idx, column=col).alignment = _WRAP_ALIGNMENT
-
-    _auto_column_widths(ws)
-
-
-# --- Summary sheet ---
-
-def _build_summary_sheet(wb, text_results, image_results, video_results, model_id):
-    ws = wb.create_sheet("Summary")
-    timestamp = datetime.now(timezone.utc).isoformat()
-
-    # Run info
-    ws.append(["Run Timestamp", timestamp])
-    ws.append(["Model", model_id])
-    ws.append([])
-
-    # Timing summary
-    timing = compute_timing_summary(text_results, image_results, video_results)
-    timing_headers = ["Category", "Count", "Success", "Errors", "Avg API(s)", "Avg Total(s)"]
-    ws.append(timing_headers)
-    _style_header_row_at(ws, ws.max_row, len(timing_headers))
-    for cat in ("text", "image", "video"):
-        t = timing.get(cat, {})
-        ws.append([
-            cat.capitalize(),
-            t.get("count", 0),
-            t.get("success", 0),
-            t.get("count", 0) - t.get("success", 0),
-            t.get("avg_api_sec", 0),
-            t.get("avg_total_sec", 0),
-        ])
-    ws.append([])
-
-    # Detection summary per category
-    ws.append(["Detection Summary by Category"])
-    ws.cell(row=ws.max_row, column=1).font = Font(bold=True, size=12)
-    ws.append([])
-
-    all_results = (
-        [("Text", r) for r in text_results]
-        + [("Image", r) for r in image_results]
-        + [("Video", r) for r in video_results]
-    )
-
-    det_headers = ["Category", "Total Checked", "Detected Count", "Detection Rate",
-                    "High/Critical Count", "Severity Distribution"]
-    ws.append(det_headers)
-    _style_header_row_at(ws, ws.max_row, len(det_headers))
-
-    for cat_name in _CATEGORY_NAMES:
-        total = 0
-        detected = 0
-        severity_counts = {}
-        for _, r in all_results:
-            if r.error or r.moderation is None:
-                continue
-            total += 1
-            cat_obj = getattr(r.moderation, cat_name)
-            if cat_obj.detected:
-                detected += 1
-            sev = cat_obj.severity
-            severity_counts[sev] = severity_counts.get(sev, 0) + 1
-
-        high_critical = severity_counts.get("high", 0) + severity_counts.get("critical", 0)
-        dist = ", ".join(f"{k}={v}" for k, v in sorted(severity_counts.items()) if k != "none")
-        rate = f"{detected / total * 100:.1f}%" if total else "N/A"
-        ws.append([cat_name, total, detected, rate, high_critical, dist or "all none"])
-
-    ws.append([])
-
-    # Overall risk distribution
-    ws.append(["Overall Risk Distribution"])
-    ws.cell(row=ws.max_row, column=1).font = Font(bold=True, size=12)
-    ws.append([])
-    risk_headers = ["Content Type", "safe", "low", "medium", "high", "critical", "error/parse_fail"]
-    ws.append(risk_headers)
-    _style_header_row_at(ws, ws.max_row, len(risk_headers))
-
-    for label, results_list in [("Text", text_results), ("Image", image_results), ("Video", video_results)]:
-        counts = {"safe": 0, "low": 0, "medium": 0, "high": 0, "critical": 0, "error": 0}
-        for r in results_list:
-            if r.error or r.moderation is None:
-                counts["error"] += 1
-            else:
-                risk = r.moderation.overall_risk
-                counts[risk] = counts.get(risk, 0) + 1
-        ws.append([label, counts["safe"], counts["low"], counts["medium"],
-                    counts["high"], counts["critical"], counts["error"]])
-
-    _auto_column_widths(ws, min_width=12)
-
-
-def _style_header_row_at(ws, row_num, num_cols):
-    """Apply header styling to a specific row."""
-    for col in range(1, num_cols + 1):
-        cell = ws.cell(row=row_num, column=col)
-        cell.font = _HEADER_FONT
-        cell.fill = _HEADER_FILL
-        cell.alignment = Alignment(horizontal="center", vertical="center")
+# ---------------------------------------------------------------------------
+# Combined streaming report
+# ---------------------------------------------------------------------------
+
+REPORT_FORMATS = ("jsonl", "json", "txt", "xlsx")
+
+_REPORT_FILES = {
+    "jsonl": "results.jsonl",
+    "json": "results.json",
+    "txt": "summary.txt",
+    "xlsx": "results.xlsx",
+}
+
+
+class _JsonlReportWriter:
+    """results.jsonl: the final, row-ordered result set as one compact line per row."""
+
+    def __init__(self, path, model_id):
+        self._writer = JsonlResultWriter(path)
+        if os.path.exists(path):
+            os.remove(path)
+        self._writer.open()
+
+    def begin_section(self, modality, count):
+        pass
+
+    def add(self, modality, result):
+        self._writer.write(modality, result)
+
+    def end_section(self, modality):
+        pass
+
+    def close(self, summary):
+        self._writer.close()
+
+
+_REPORT_WRITERS = {
+    "jsonl": _JsonlReportWriter,
+    "json": _JsonReportWriter,
+    "txt": _SummaryTxtWriter,
+    "xlsx": _XlsxReportWriter,
+}
+
+
+class ReportWriter:
+    """Write every report format in a single pass over the results.
+
+    Results are fed section by section (text, then image, then video) and written straight
+    through to each output file; only the SummaryAccumulator counters stay in memory.
+    """
+
+    def __init__(self, output_path, model_id, formats=REPORT_FORMATS):
+        unknown = set(formats) - set(REPORT_FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown report format(s): {', '.join(sorted(unknown))}")
+        self.summary = SummaryAccumulator()
+        self.paths = {fmt: os.path.join(output_path, _REPORT_FILES[fmt]) for fmt in formats}
+        self._writers = [_REPORT_WRITERS[fmt](path, model_id) for fmt, path in self.paths.items()]
+        self._next_section = 0
+
+    def write_section(self, modality, results, count=None):
+        """Write one modality's results (any iterable, in row order).
+
+        count is the number of rows, needed up front for the summary.txt heading; it defaults
+        to len(results). Sections must come in text, image, video order; skipped ones are
+        written empty.
+        """
+        pos = _MODALITIES.index(modality)
+        if pos < self._next_section:
+            raise ValueError(f"Section {modality} written out of order")
+        while self._next_section < pos:
+            self._write(_MODALITIES[self._next_section], (), 0)
+        self._write(modality, results, len(results) if count is None else count)
+
+    def _write(self, modality, results, count):
+        for w in self._writers:
+            w.begin_section(modality, count)
+        for r in results:
+            self.summary.add(modality, r)
+            for w in self._writers:
+                w.add(modality, r)
+        for w in self._writers:
+            w.end_section(modality)
+        self._next_section = _MODALITIES.index(modality) + 1
+
+    def close(self):
+        """Finish the remaining sections and summaries; returns {format: file path}."""
+        while self._next_section < len(_MODALITIES):
+            self._write(_MODALITIES[self._next_section], (), 0)
+        for w in self._writers:
+            w.close(self.summary)
+        return self.paths
+
+
+def _write_all(report, text_results, image_results, video_results):
+    for modality, results in zip(_MODALITIES, (text_results, image_results, video_results)):
+        report.write_section(modality, results)
 
 
 # ---------------------------------------------------------------------------
@@ -480,46 +708,8 @@ def _style_header_row_at(ws, row_num, num_cols):
 def _detected_categories(moderation):
     """Return comma-separated list of detected category names."""
     detected = []
-    for name in ("pornography", "violence", "tobacco_alcohol", "political_sensitivity", "profanity"):
+    for name in _CATEGORY_NAMES:
         cat = getattr(moderation, name)
         if cat.detected:
             detected.append(name)
     return ", ".join(detected) if detected else "none"
-
-
-def compute_timing_summary(text_results, image_results, video_results):
-    """Compute per-category timing statistics."""
-    summary = {}
-
-    # Text
-    success_text = [r for r in text_results if r.error is None]
-    summary["text"] = {
-        "count": len(text_results),
-        "success": len(success_text),
-        "avg_api_sec": _avg([r.moderation_time_sec for r in success_text]),
-        "avg_total_sec": _avg([r.moderation_time_sec for r in success_text]),
-    }
-
-    # Image
-    success_img = [r for r in image_results if r.error is None]
-    summary["image"] = {
-        "count": len(image_results),
-        "success": len(success_img),
-        "avg_api_sec": _avg([r.moderation_time_sec for r in success_img]),
-        "avg_total_sec": _avg([r.download_time_sec + r.moderation_time_sec for r in success_img]),
-    }
-
-    # Video
-    success_vid = [r for r in video_results if r.error is None]
-    summary["video"] = {
-        "count": len(video_results),
-        "success": len(success_vid),
-        "avg_api_sec": _avg([r.moderation_time_sec for r in success_vid]),
-        "avg_total_sec": _avg([r.download_time_sec + r.moderation_time_sec for r in success_vid]),
-    }
-
-    return summary
-
-
-def _avg(values):
-    return round(sum(values) / len(values), 3) if values else 0.0
@@ -0,0 +1,28 @@
+"""Load modules from the parent project by file path.
+
+The parent's config.py would clash with this package's config.py on sys.path, so parent
+modules are loaded from their files under a "parent_" prefix. Each one is loaded once and
+shared, so every module here sees the same AWS clients, throttle controller and cache.
+"""
+
+import importlib.util
+import os
+import sys
+
+_PARENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def load_parent_module(name):
+    """Return the parent project's module `name` (e.g. "aws_clients"), loading it on first use."""
+    alias = f"parent_{name}"
+    mod = sys.modules.get(alias)
+    if mod is None:
+        spec = importlib.util.spec_from_file_location(alias, os.path.join(_PARENT_DIR, f"{name}.py"))
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[alias] = mod
+        try:
+            spec.loader.exec_module(mod)
+        except BaseException:
+            del sys.modules[alias]
+            raise
+    return mod
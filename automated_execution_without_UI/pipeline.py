@@ -0,0 +1,247 @@
+"""Staged streaming pipeline for image and video rows.
+
+download (threads) -> CPU prepare (threads feeding the parent project's media process pool) -> LLM (threads)
+
+Stages are connected by bounded queues, so a slow stage blocks the ones before it
+instead of letting downloaded media pile up in memory.
+"""
+
+import logging
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+
+from concurrency import ModelLimiter
+from config import DEFAULT_LANG, FRAME_DEDUP_THRESHOLD
+from llm_moderator import (
+    _is_text_only,
+    image_error_result,
+    moderate_image_bytes,
+    moderate_video_file,
+    needs_frame_extraction,
+    video_error_result,
+)
+from media_utils import (
+    MediaFile,
+    timed_call,
+    download_media,
+    download_media_file,
+    normalize_image_bytes,
+    extract_video_frames,
+    prepare_direct_video,
+    media_pool,
+)
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+@dataclass
+class PipelineConfig:
+    download_workers: int = 4
+    cpu_workers: int = field(default_factory=media_pool.usable_cpus)  # threads handing work to the media pool
+    llm_workers: int = 4
+    queue_size: int = 8  # max items waiting between two stages
+
+
+@dataclass
+class _Job:
+    index: int
+    row_index: int
+    url: str
+    data: Any = None  # image bytes, or the MediaFile of a video
+    dl_time: float = 0.0
+    prepared: Any = None
+    result: Any = None  # set once the row is finished, successfully or not
+
+
+# ---------------------------------------------------------------------------
+# Generic stage runner
+# ---------------------------------------------------------------------------
+
+def _run_stages(items, stages, queue_size, fail, on_result=None, collect=True):
+    """Push items through stages and return the finished jobs' results in input order.
+
+    items may be a lazy iterable; it is consumed only as fast as the first queue drains.
+
+    stages: list of (name, func, num_workers); func(job) mutates the job in place.
+    Jobs whose result is already set skip the remaining stages.
+    fail(job, error_string) builds the error result for an unexpected stage exception.
+    With collect=False results are only handed to on_result and None is returned.
+    """
+    results = {}
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+
+    def _worker(stage_idx, name, func):
+        in_q = queues[stage_idx]
+        out_q = queues[stage_idx + 1] if stage_idx + 1 < len(stages) else None
+        while True:
+            job = in_q.get()
+            if job is _STOP:
+                return
+            if job.result is None:
+                try:
+                    func(job)
+                except Exception as exc:  # stage funcs handle their own errors; this is a safety net
+                    logger.error("%s stage failed for row %d: %s", name, job.row_index, exc)
+                    job.result = fail(job, f"{name} stage failed: {exc}")
+            if out_q is not None:
+                out_q.put(job)
+                continue
+            if collect:
+                results[job.index] = job.result
+            if isinstance(job.data, MediaFile):
+                job.data.close()
+            job.data = job.prepared = None  # release media as soon as the row is done
+            if on_result:
+                on_result(job.result)
+
+    workers = []
+    for stage_idx, (name, func, num_workers) in enumerate(stages):
+        threads = [
+            threading.Thread(target=_worker, args=(stage_idx, name, func), name=f"{name}-{n}", daemon=True)
+            for n in range(max(1, num_workers))
+        ]
+        for t in threads:
+            t.start()
+        workers.append(threads)
+
+    for job in items:
+        queues[0].put(job)
+
+    # Drain stage by stage: a stage's STOP markers go in only after the previous stage has exited
+    for stage_idx, threads in enumerate(workers):
+        for _ in threads:
+            queues[stage_idx].put(_STOP)
+        for t in threads:
+            t.join()
+
+    return [results[i] for i in sorted(results)] if collect else None
+
+
+def _download(job, download=download_media):
+    data, dl_time, dl_error = timed_call(download, job.url)
+    job.data, job.dl_time = data, dl_time
+    return dl_error
+
+
+# ---------------------------------------------------------------------------
+# Image pipeline
+# ---------------------------------------------------------------------------
+
+def run_image_pipeline(image_urls, model_id, lang=DEFAULT_LANG, config=None, limiter=None, on_result=None,
+                       collect=True):
+    """Moderate (row_index, url) pairs through the staged pipeline; results come back in row order."""
+    config = config or PipelineConfig()
+    limiter = limiter or ModelLimiter()
+    jobs = (_Job(index=i, row_index=row_idx, url=url) for i, (row_idx, url) in enumerate(image_urls))
+
+    def download(job):
+        if _is_text_only(model_id):
+            job.result = image_error_result(
+                job.row_index, job.url, model_id, f"Model {model_id} is text-only, cannot process images",
+            )
+            return
+        dl_error = _download(job)
+        if dl_error:
+            job.result = image_error_result(
+                job.row_index, job.url, model_id, f"Download failed: {dl_error}", job.dl_time,
+            )
+
+    def prepare(job):
+        try:
+            job.prepared = normalize_image_bytes(job.data, model_id)
+        except Exception as exc:
+            job.result = image_error_result(
+                job.row_index, job.url, model_id, f"Image conversion failed: {exc}",
+                job.dl_time, len(job.data),
+            )
+
+    def moderate(job):
+        norm_bytes, img_fmt = job.prepared
+        with limiter.slot(model_id):
+            job.result = moderate_image_bytes(
+                job.row_index, job.url, model_id, norm_bytes, img_fmt, job.dl_time, len(job.data), lang=lang,
+            )
+
+    def fail(job, error):
+        return image_error_result(job.row_index, job.url, model_id, error, job.dl_time, len(job.data or b""))
+
+    stages = [
+        ("download", download, config.download_workers),
+        ("cpu", prepare, config.cpu_workers),
+        ("llm", moderate, config.llm_workers),
+    ]
+    return _run_stages(jobs, stages, config.queue_size, fail, on_result, collect)
+
+
+# ---------------------------------------------------------------------------
+# Video pipeline
+# ---------------------------------------------------------------------------
+
+def run_video_pipeline(video_urls, model_id, lang=DEFAULT_LANG, num_frames=5, config=None, limiter=None,
+                       on_result=None, collect=True, frame_strategy="uniform", dedup_threshold=FRAME_DEDUP_THRESHOLD):
+    """Moderate (row_index, url) pairs through the staged pipeline; results come back in row order.
+
+    The CPU stage extracts frames for models without direct video support; for Nova models it
+    remuxes/transcodes the video to fit the direct video limits instead, and frames are
+    extracted only on fallback.
+    """
+    config = config or PipelineConfig()
+    limiter = limiter or ModelLimiter()
+    jobs = (_Job(index=i, row_index=row_idx, url=url) for i, (row_idx, url) in enumerate(video_urls))
+    extract = needs_frame_extraction(model_id)
+
+    def download(job):
+        if _is_text_only(model_id):
+            job.result = video_error_result(
+                job.row_index, job.url, model_id, f"Model {model_id} is text-only, cannot process video",
+                method="unsupported",
+            )
+            return
+        dl_error = _download(job, download_media_file)
+        if dl_error:
+            job.result = video_error_result(
+                job.row_index, job.url, model_id, f"Download failed: {dl_error}", dl_time=job.dl_time,
+            )
+
+    def prepare(job):
+        job.data.sha256()  # the result cache key; hashed here rather than while holding a model slot
+        if not extract:
+            try:
+                job.prepared = prepare_direct_video(job.data.path)
+            except Exception as exc:
+                job.prepared = exc  # moderate_video_file goes straight to frame-based
+            return
+        try:
+            job.prepared = extract_video_frames(job.data.path, num_frames, frame_strategy)
+        except Exception as exc:
+            job.result = video_error_result(
+                job.row_index, job.url, model_id, f"Frame extraction failed: {exc}",
+                "frame_based", job.dl_time, job.data.size,
+            )
+
+    def moderate(job):
+        with limiter.slot(model_id):
+            job.result = moderate_video_file(
+                job.row_index, job.url, model_id, job.data, job.dl_time,
+                lang=lang, num_frames=num_frames, frame_strategy=frame_strategy,
+                dedup_threshold=dedup_threshold,
+                frames=job.prepared if extract else None,
+                direct_video=None if extract else job.prepared,
+            )
+
+    def fail(job, error):
+        return video_error_result(
+            job.row_index, job.url, model_id, error, dl_time=job.dl_time,
+            video_size=job.data.size if job.data else 0,
+        )
+
+    stages = [
+        ("download", download, config.download_workers),
+        ("cpu", prepare, config.cpu_workers),
+        ("llm", moderate, config.llm_workers),
+    ]
+    return _run_stages(jobs, stages, config.queue_size, fail, on_result, collect)
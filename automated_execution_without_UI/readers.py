@@ -0,0 +1,163 @@
+"""Streaming test-set readers.
+
+Every reader yields rows lazily, so moderation can start on the first row while the rest of
+the file is still being read. Supported inputs:
+
+- .xlsx / .xlsm: first sheet, columns A/B/C = text / image URL / video URL, row 1 is a header
+- .csv: same column layout as xlsx, header row skipped
+- .jsonl: one object per line with "text", "image" (or "image_url") and "video" (or "video_url")
+- .parquet: first three columns in schema order, same meaning as xlsx (needs pyarrow)
+
+Row indices are 0-based over data rows, matching the original xlsx loader.
+"""
+
+import csv
+import json
+import os
+import threading
+from collections import deque
+
+import openpyxl
+
+MODALITIES = ("text", "image", "video")
+_COLUMN = {"text": 0, "image": 1, "video": 2}
+_JSONL_KEYS = {
+    "text": ("text",),
+    "image": ("image", "image_url"),
+    "video": ("video", "video_url"),
+}
+
+
+def _iter_xlsx(path):
+    # read_only streams rows from the sheet XML instead of building the whole workbook
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        for row in ws.iter_rows(min_row=2, max_col=3, values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+
+def _iter_csv(path):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        next(reader, None)  # header
+        for row in reader:
+            yield row
+
+
+def _iter_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            yield tuple(
+                next((obj[k] for k in _JSONL_KEYS[m] if obj.get(k) is not None), None)
+                for m in MODALITIES
+            )
+
+
+def _iter_parquet(path, batch_size=4096):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise RuntimeError("Reading .parquet test sets requires pyarrow (pip install pyarrow)") from exc
+    pf = pq.ParquetFile(path)
+    columns = pf.schema_arrow.names[:3]
+    for batch in pf.iter_batches(batch_size=batch_size, columns=columns):
+        cols = [batch.column(i).to_pylist() for i in range(batch.num_columns)]
+        for row in zip(*cols):
+            yield row
+
+
+_READERS = {
+    ".xlsx": _iter_xlsx,
+    ".xlsm": _iter_xlsx,
+    ".csv": _iter_csv,
+    ".jsonl": _iter_jsonl,
+    ".parquet": _iter_parquet,
+}
+
+
+def iter_rows(path):
+    """Yield (row_index, row_tuple) for every data row of the input file."""
+    ext = os.path.splitext(path)[1].lower()
+    reader = _READERS.get(ext)
+    if reader is None:
+        raise ValueError(f"Unsupported input format: {ext} (expected one of {', '.join(sorted(_READERS))})")
+    for idx, row in enumerate(reader(path)):
+        yield idx, row
+
+
+def _cell(row, col):
+    val = row[col] if len(row) > col else None
+    if not val:  # 0 / False cells count as empty, as in the original xlsx loader
+        return None
+    val = str(val).strip()
+    return val or None
+
+
+def iter_cells(path, modalities=MODALITIES):
+    """Yield (modality, row_index, value) for the non-empty cells of the given modalities, in one pass."""
+    columns = [(m, _COLUMN[m]) for m in modalities]
+    for idx, row in iter_rows(path):
+        for m, col in columns:
+            val = _cell(row, col)
+            if val is not None:
+                yield m, idx, val
+
+
+def iter_test_set(path, modality):
+    """Yield (row_index, value) for the non-empty cells of one modality's column."""
+    for _, idx, val in iter_cells(path, (modality,)):
+        yield idx, val
+
+
+def iter_test_sets(path, modalities=MODALITIES):
+    """Route one pass over the input to a lazy (row_index, value) iterator per modality.
+
+    The file is read on demand by whichever iterator runs out first; cells of the other
+    modalities are queued until their iterator reaches them. The iterators may be consumed
+    from different threads. One that is consumed much later than the others (e.g. when the
+    modalities run one after another) queues its (row_index, value) pairs in memory meanwhile.
+
+    Returns:
+        dict: {modality: iterator of (row_index, value)}
+    """
+    cells = iter_cells(path, modalities)
+    queues = {m: deque() for m in modalities}
+    lock = threading.Lock()
+
+    def _next(modality):
+        queue = queues[modality]
+        with lock:
+            while not queue:
+                cell = next(cells, None)
+                if cell is None:
+                    return None
+                queues[cell[0]].append(cell[1:])
+            return queue.popleft()
+
+    def _iter(modality):
+        while True:
+            item = _next(modality)
+            if item is None:
+                return
+            yield item
+
+    return {m: _iter(m) for m in modalities}
+
+
+def load_test_sets(path):
+    """Load text, image URLs, and video URLs fully into memory.
+
+    Returns (texts, image_urls, video_urls) — each a list of (row_index, value).
+    Prefer iter_test_sets() for large inputs.
+    """
+    out = {m: [] for m in MODALITIES}
+    for m, idx, val in iter_cells(path):
+        out[m].append((idx, val))
+    return out["text"], out["image"], out["video"]
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The batch modules import each other as top-level modules, as when main.py runs
+_BATCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+if _BATCH_DIR not in sys.path:
+    sys.path.insert(0, _BATCH_DIR)
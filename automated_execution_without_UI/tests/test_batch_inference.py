@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+
+import pytest
+
+from batch_inference import (
+    LocalBatchBackend,
+    export_batch,
+    fetch_output,
+    import_batch,
+    load_job,
+    submit_batch,
+    wait_for_job,
+)
+
+_MODEL_ID = "global.anthropic.claude-sonnet-4-6"
+
+
+def _verdict(risk):
+    categories = {name: {"detected": False, "severity": "none", "details": ""}
+                  for name in ("pornography", "violence", "tobacco_alcohol", "political_sensitivity", "profanity")}
+    if risk != "safe":
+        categories["profanity"] = {"detected": True, "severity": risk, "details": "insult"}
+    return {"categories": categories, "overall_risk": risk, "summary": f"{risk} text"}
+
+
+def _stub_responder(record):
+    """Anthropic-style modelOutput; fails one record and answers the rest by their text."""
+    text = record["modelInput"]["messages"][0]["content"][-1]["text"]
+    if "explode" in text:
+        raise RuntimeError("model error")
+    risk = "high" if "idiot" in text else "safe"
+    return {"content": [{"type": "text", "text": "```json\n" + json.dumps(_verdict(risk)) + "\n```"}]}
+
+
+def test_export_local_run_import(tmp_path):
+    work_dir = str(tmp_path / "batch")
+    os.makedirs(work_dir)
+    pending = {
+        "text": iter([(0, "have a nice day"), (1, "you idiot"), (2, "please explode"), (3, "see you soon")]),
+        "video": iter([(0, "https://example.com/v.mp4")]),
+    }
+    counts = export_batch(pending, work_dir, _MODEL_ID, lang="en", max_records_per_file=3)
+    assert counts == {"records": 4, "files": 2, "errors": 1}
+
+    backend = LocalBatchBackend(str(tmp_path / "local-backend"), responder=_stub_responder)
+    submit_batch(backend, work_dir, _MODEL_ID, lang="en", job_name="job-1")
+    job = load_job(work_dir)
+    assert job["job_id"] == "job-1" and job["backend"] == "local"
+    assert wait_for_job(backend, job["job_id"], poll_interval=0, timeout=5) == ("Completed", "")
+    assert len(fetch_output(backend, job["job_id"], work_dir)) == 2
+
+    results = {}
+    imported = import_batch(work_dir, job["model_id"], lambda modality, r: results.setdefault((modality, r.row_index), r))
+    assert imported == 5
+    assert results[("text", 0)].moderation.overall_risk == "safe"
+    assert results[("text", 1)].moderation.profanity.severity == "high"
+    assert results[("text", 2)].error == "Batch record failed: model error"
+    assert results[("text", 3)].error is None
+    assert "does not support video" in results[("video", 0)].error
+
+
+def test_wait_for_job_times_out_without_output(tmp_path):
+    work_dir = str(tmp_path / "batch")
+    os.makedirs(work_dir)
+    export_batch({"text": iter([(0, "hello there")])}, work_dir, _MODEL_ID, lang="en")
+    backend = LocalBatchBackend(str(tmp_path / "local-backend"))
+    job_id = submit_batch(backend, work_dir, _MODEL_ID, job_name="job-2")
+    with pytest.raises(TimeoutError, match="still InProgress"):
+        wait_for_job(backend, job_id, poll_interval=0, timeout=0.2)
+
+
+def test_cli_run_with_local_backend_fails_instead_of_polling(tmp_path, caplog):
+    import main
+    from checkpoint import CheckpointJournal
+
+    args = argparse.Namespace(
+        batch_inference="run", batch_dir=str(tmp_path / "batch"), output_dir=str(tmp_path), concurrency=1,
+        batch_backend="local", batch_s3_uri=None, batch_role_arn=None, model=_MODEL_ID, lang="en",
+        batch_poll_interval=60, batch_timeout=0,
+    )
+    journal = CheckpointJournal(str(tmp_path / "checkpoint.jsonl"))
+    assert main.run_batch_inference(args, journal, {"text": iter([(0, "hello there")])}) is False
+    assert "has no responder" in caplog.text
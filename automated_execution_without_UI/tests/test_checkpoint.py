@@ -0,0 +1,50 @@
+import pytest
+
+from checkpoint import CheckpointJournal, CheckpointMismatchError
+from models import TextModerationResult
+
+_RUN = {"input": "/data/set.xlsx", "model": "m1", "video_model": "m1", "lang": "en"}
+
+
+def _text(row, error=None):
+    return TextModerationResult(
+        row_index=row, original_text=f"text {row}", model_id="m1", moderation_time_sec=0.1,
+        moderation=None, raw_llm_response="", error=error,
+    )
+
+
+def _journal_rows(path, run_info=_RUN):
+    journal = CheckpointJournal(path, run_info=run_info).start_fresh().open()
+    journal.record("text", _text(0))
+    journal.record("text", _text(1, error="ThrottlingException"))
+    journal.close()
+
+
+def test_resume_with_the_same_run(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    _journal_rows(path)
+    journal = CheckpointJournal(path, run_info=dict(_RUN)).load()
+    assert journal.count("text") == 2
+    assert list(journal.pending("text", [(0, "a"), (1, "b"), (2, "c")], resume=True)) == [(2, "c")]
+    assert [r.row_index for r in journal.results("text")] == [0, 1]
+    # Appending after a resume keeps the single header line
+    journal.open()
+    journal.record("text", _text(2))
+    journal.close()
+    assert CheckpointJournal(path, run_info=_RUN).load().count("text") == 3
+
+
+@pytest.mark.parametrize("key, value", [("input", "/data/other.xlsx"), ("model", "m2"), ("lang", "zh")])
+def test_resume_refuses_another_run(tmp_path, key, value):
+    path = str(tmp_path / "checkpoint.jsonl")
+    _journal_rows(path)
+    with pytest.raises(CheckpointMismatchError, match=key):
+        CheckpointJournal(path, run_info={**_RUN, key: value}).load()
+
+
+def test_journal_without_header_still_loads(tmp_path, caplog):
+    path = str(tmp_path / "checkpoint.jsonl")
+    _journal_rows(path, run_info=None)
+    journal = CheckpointJournal(path, run_info=_RUN).load()
+    assert journal.count("text") == 2
+    assert "no run header" in caplog.text
@@ -0,0 +1,100 @@
+import glob
+import os
+import shutil
+import tempfile
+import types
+
+import pytest
+
+import media_utils
+from media_cache import MediaCache
+
+_VIDEOS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "..", "examples", "videos", "*.mp4")))
+
+
+@pytest.fixture
+def live_pool():
+    media_utils.media_pool.configure_media_pool(2)
+    yield
+    media_utils.media_pool.shutdown_media_pool()
+    media_utils.media_pool.configure_media_pool()
+
+
+@pytest.mark.skipif(not _VIDEOS, reason="no example video")
+@pytest.mark.skipif(media_utils.frame_extraction.cv2 is None and not shutil.which("ffmpeg"),
+                    reason="needs OpenCV or ffmpeg")
+def test_extract_video_frames_in_worker_processes(live_pool, caplog):
+    for _ in range(2):  # a broken pool is rebuilt on the next call, so the second one would fail again
+        frames = media_utils.extract_video_frames(_VIDEOS[0], num_frames=3)
+        assert len(frames) == 3
+        assert all(jpeg.startswith(b"\xff\xd8") and fmt == "jpeg" for jpeg, fmt in frames)
+    assert "Media pool broke" not in caplog.text
+    if os.path.isdir("/dev/shm"):
+        assert not [n for n in os.listdir("/dev/shm") if n.startswith("mf")]
+
+
+class _Response:
+    def __init__(self, status, headers, body=b""):
+        self.status_code, self.headers, self.body = status, headers, body
+        self.ok = status < 400
+
+    def iter_content(self, size):
+        for start in range(0, len(self.body), size):
+            yield self.body[start:start + size]
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class _Session:
+    def __init__(self, body, etag):
+        self.body, self.etag, self.gets = body, etag, 0
+
+    def head(self, url, **kwargs):
+        return _Response(200, {"Content-Length": str(len(self.body)), "ETag": self.etag})
+
+    def get(self, url, **kwargs):
+        self.gets += 1
+        return _Response(200, {"ETag": self.etag}, self.body)
+
+
+@pytest.fixture
+def fake_http(monkeypatch, tmp_path):
+    session = _Session(os.urandom(3 * 1024 * 1024 + 5), '"v1"')
+    aws_clients = types.SimpleNamespace(http_session=lambda: session, http_timeout=lambda timeout: timeout)
+    monkeypatch.setattr(media_utils, "load_parent_module", lambda name: aws_clients)
+    cache = MediaCache(str(tmp_path / "media-cache"))
+    monkeypatch.setattr(media_utils, "default_media_cache", lambda: cache)
+    return session
+
+
+def _temp_downloads():
+    return [n for n in os.listdir(tempfile.gettempdir()) if n.startswith("media-")]
+
+
+def test_download_media_file_streams_to_disk_and_reuses_the_cache(fake_http):
+    before = _temp_downloads()
+    with media_utils.download_media_file("https://example.com/v.mp4") as first:
+        assert first.size == len(fake_http.body)
+        with open(first.path, "rb") as f:
+            assert f.read() == fake_http.body
+    assert not os.path.exists(first.path)
+    with media_utils.download_media_file("https://example.com/v.mp4") as second:
+        assert second.read() == fake_http.body
+    assert fake_http.gets == 1  # the second download came from the media cache
+    assert _temp_downloads() == before
+
+
+def test_images_are_capped_below_the_video_limit(fake_http, monkeypatch):
+    monkeypatch.setattr(media_utils, "IMAGE_MAX_MB", 2)
+    before = _temp_downloads()
+    with pytest.raises(media_utils.MediaTooLargeError):
+        media_utils.download_media("https://example.com/big.png")
+    assert _temp_downloads() == before
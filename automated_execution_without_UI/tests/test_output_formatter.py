@@ -0,0 +1,87 @@
+import json
+
+import openpyxl
+
+from checkpoint import CheckpointJournal
+from models import (
+    ImageModerationResult,
+    ModerationCategory,
+    ModerationResult,
+    TextModerationResult,
+    VideoModerationResult,
+)
+from output_formatter import ReportWriter, _WIDTH_SAMPLE_ROWS
+
+_CATEGORIES = ("pornography", "violence", "tobacco_alcohol", "political_sensitivity", "profanity")
+
+
+def _moderation(risk="safe"):
+    categories = {name: ModerationCategory(detected=False, severity="none", details="") for name in _CATEGORIES}
+    categories["violence"] = ModerationCategory(detected=risk != "safe", severity="high" if risk != "safe" else "none",
+                                                details="weapon shown" if risk != "safe" else "")
+    return ModerationResult(**categories, overall_risk=risk, summary=f"{risk} content")
+
+
+def _text(row, risk="safe", error=None, **kwargs):
+    return TextModerationResult(
+        row_index=row, original_text=f"text {row}", model_id="m", moderation_time_sec=0.5,
+        moderation=None if error else _moderation(risk), raw_llm_response="{}", error=error, **kwargs,
+    )
+
+
+def test_report_writes_every_format_from_the_journal(tmp_path):
+    """End to end as main.py does it: results journaled, then streamed from the journal into every report."""
+    journal = CheckpointJournal(str(tmp_path / "checkpoint.jsonl")).start_fresh().open()
+    # More text rows than the width sample, so the sheet flushes mid-section and streams the rest
+    text_rows = _WIDTH_SAMPLE_ROWS + 5
+    for row in range(text_rows):
+        journal.record("text", _text(row, risk="high" if row % 2 else "safe"))
+    journal.record("text", _text(text_rows, error="ThrottlingException"))
+    journal.record("text", _text(text_rows + 1, near_duplicate_of=1, near_duplicate_similarity=0.9))
+    journal.record("image", ImageModerationResult(
+        row_index=0, image_url="https://example.com/a.jpg", model_id="m", download_time_sec=0.1,
+        moderation_time_sec=1.0, image_size_bytes=4096, moderation=_moderation("medium"),
+        raw_llm_response="{}", error=None, sent_size_bytes=2048,
+    ))
+    journal.record("video", VideoModerationResult(
+        row_index=0, video_url="https://example.com/v.mp4", model_id="m", analysis_method="frame_based",
+        download_time_sec=0.2, moderation_time_sec=2.0, video_size_bytes=1 << 20, moderation=None,
+        raw_llm_response="", error="download failed",
+    ))
+    journal.close()
+
+    report = ReportWriter(str(tmp_path), "m")
+    for modality in ("text", "image", "video"):
+        report.write_section(modality, journal.results(modality), count=journal.count(modality))
+    paths = report.close()
+
+    total_text = text_rows + 2
+    assert report.summary.total == total_text + 2
+    assert report.summary.errors == 2
+
+    wb = openpyxl.load_workbook(paths["xlsx"], read_only=True)
+    assert wb.sheetnames == ["Text Moderation", "Image Moderation", "Video Moderation", "Summary"]
+    text_sheet = list(wb["Text Moderation"].iter_rows(values_only=True))
+    assert text_sheet[0][:3] == ("Row", "Moderation Time(s)", "Overall Risk")
+    assert len(text_sheet) == 1 + total_text
+    assert text_sheet[2][2] == "high"
+    assert text_sheet[-1][-1] == "row 1 (0.90)"
+    assert list(wb["Video Moderation"].iter_rows(values_only=True))[1][5] == "ERROR"
+    summary_cells = [c for row in wb["Summary"].iter_rows(values_only=True) for c in row if c is not None]
+    assert "Detection Summary by Category" in summary_cells
+    wb.close()
+
+    with open(paths["json"], encoding="utf-8") as f:
+        data = json.load(f)
+    assert len(data["text_moderation"]) == total_text
+    assert data["image_moderation"][0]["sent_size_bytes"] == 2048
+    assert data["timing_summary"]["video"] == {"count": 1, "success": 0, "avg_api_sec": 0.0, "avg_total_sec": 0.0}
+
+    with open(paths["jsonl"], encoding="utf-8") as f:
+        assert sum(1 for _ in f) == total_text + 2
+
+    with open(paths["txt"], encoding="utf-8") as f:
+        summary_txt = f.read()
+    assert f"TEXT MODERATION ({total_text} rows)" in summary_txt
+    assert "[near-dup of row 1]" in summary_txt
+    assert "TIMING SUMMARY" in summary_txt
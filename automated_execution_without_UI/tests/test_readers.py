@@ -0,0 +1,52 @@
+import threading
+
+import readers
+from readers import iter_cells, iter_test_sets, load_test_sets
+
+
+def _write_csv(path, rows):
+    path.write_text("text,image,video\n" + "".join(",".join(row) + "\n" for row in rows), encoding="utf-8")
+    return str(path)
+
+
+def test_one_pass_routes_every_modality(tmp_path, monkeypatch):
+    rows = [(f"text {i}", f"https://e.com/{i}.jpg" if i % 2 else "", f"https://e.com/{i}.mp4" if i % 3 == 0 else "")
+            for i in range(30)]
+    path = _write_csv(tmp_path / "set.csv", rows)
+    opened = []
+    real_iter_rows = readers.iter_rows
+    monkeypatch.setattr(readers, "iter_rows", lambda p: opened.append(p) or real_iter_rows(p))
+
+    routed = iter_test_sets(path)
+    # Drained one after another, as the runners do without a worker pool
+    got = {m: list(it) for m, it in routed.items()}
+
+    assert len(opened) == 1
+    texts, images, videos = load_test_sets(path)
+    assert got == {"text": texts, "image": images, "video": videos}
+    assert [idx for idx, _ in got["image"]] == list(range(1, 30, 2))
+
+
+def test_iterators_consumed_from_threads(tmp_path):
+    rows = [(f"text {i}", f"https://e.com/{i}.jpg", "") for i in range(500)]
+    path = _write_csv(tmp_path / "set.csv", rows)
+    routed = iter_test_sets(path, ("text", "image"))
+    got = {}
+    threads = [threading.Thread(target=lambda m=m: got.__setitem__(m, list(routed[m]))) for m in routed]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert got["text"] == [(i, f"text {i}") for i in range(500)]
+    assert got["image"] == [(i, f"https://e.com/{i}.jpg") for i in range(500)]
+
+
+def test_iter_cells_skips_other_modalities(tmp_path):
+    path = _write_csv(tmp_path / "set.csv", [("hello", "https://e.com/a.jpg", "")])
+    assert list(iter_cells(path, ("image",))) == [("image", 0, "https://e.com/a.jpg")]
+
+
+def test_falsy_cells_are_empty(tmp_path):
+    path = tmp_path / "set.jsonl"
+    path.write_text('{"text": 0, "image": false}\n{"text": 1, "video": "  "}\n', encoding="utf-8")
+    assert list(iter_cells(str(path))) == [("text", 1, "1")]
@@ -0,0 +1,16 @@
+from text_clusters import NearDuplicateTexts
+
+
+def test_texts_differing_only_in_numbers_are_not_clustered():
+    clusters = NearDuplicateTexts(0.8)
+    rows = [f"Your order #{n} has shipped, total ${n * 7}.99" for n in range(61)]
+    claims = [clusters.claim(row, text) for row, text in enumerate(rows)]
+    assert all(claim.leader for claim in claims)
+
+
+def test_spacing_and_case_variants_share_the_leader():
+    clusters = NearDuplicateTexts(0.8)
+    leader = clusters.claim(0, "Win a free iPhone now!!! Click http://spam.example/abc to claim your prize today")
+    member = clusters.claim(1, "WIN a FREE iphone now ... click http://spam.example/abc to claim your prize today!")
+    assert leader.leader and not member.leader
+    assert member.cluster is leader.cluster
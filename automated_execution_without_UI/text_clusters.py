@@ -0,0 +1,110 @@
+"""Near-duplicate text clusters: one LLM call per cluster of near-identical texts.
+
+The first text of a cluster (its leader) is moderated as usual. Later texts whose MinHash
+similarity to the leader reaches the threshold are members: they wait for the leader's
+verdict, also while it is still in flight, and reuse it instead of calling the LLM.
+"""
+
+import logging
+import threading
+from dataclasses import replace
+
+from parent_modules import load_parent_module
+
+logger = logging.getLogger(__name__)
+
+text_minhash = load_parent_module("text_minhash")
+
+
+class _Cluster:
+    def __init__(self, leader_row):
+        self.leader_row = leader_row
+        self.done = threading.Event()
+        self.result = None  # the leader's result, None if it failed
+        self.members = 0
+
+
+class Claim:
+    """A row's place in a cluster: leaders moderate and resolve(), members follow()."""
+
+    def __init__(self, cluster, leader, similarity=1.0):
+        self.cluster = cluster
+        self.leader = leader
+        self.similarity = similarity
+
+
+class NearDuplicateTexts:
+    """Thread-safe clustering of a run's text rows by MinHash/LSH similarity."""
+
+    def __init__(self, threshold, min_chars=30, max_entries=100000):
+        self.threshold = threshold
+        self.min_chars = min_chars
+        self._index = text_minhash.NearDuplicateIndex(threshold, max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "clusters": 0, "reused": 0, "fallbacks": 0}
+
+    def claim(self, row_index, text):
+        """Join the cluster of the most similar earlier text, or start a new one.
+
+        Returns a Claim, or None for texts too short to compare.
+        """
+        if len(text) < self.min_chars:
+            return None
+        signature = text_minhash.minhash(text)
+        if signature is None:
+            return None
+        # Query and insert under one lock, so two near-identical rows never both become leaders
+        with self._lock:
+            match = self._index.query(signature)
+            if match is not None:
+                _, similarity, cluster = match
+                return Claim(cluster, leader=False, similarity=similarity)
+            cluster = _Cluster(row_index)
+            self._index.add(row_index, signature, cluster)
+            self._stats["leaders"] += 1
+            return Claim(cluster, leader=True)
+
+    def resolve(self, claim, result):
+        """Publish a leader's result (None if its call raised) to its members; a failed leader leaves the index."""
+        cluster = claim.cluster
+        if result is not None and result.error is None and result.moderation is not None:
+            cluster.result = result
+        else:
+            self._index.remove(cluster.leader_row)
+        cluster.done.set()
+
+    def follow(self, claim, row_index, text):
+        """Wait for the leader and return its verdict as this row's result, or None if the leader failed."""
+        cluster = claim.cluster
+        cluster.done.wait()
+        leader = cluster.result
+        with self._lock:
+            if leader is None:
+                self._stats["fallbacks"] += 1
+                return None
+            self._stats["reused"] += 1
+            cluster.members += 1
+            if cluster.members == 1:
+                self._stats["clusters"] += 1
+        return replace(
+            leader,
+            row_index=row_index,
+            original_text=text,
+            moderation_time_sec=0.0,
+            cache_hit=False,
+            comprehend=None,
+            lexicon_hits=[],
+            flagged_spans=[],  # offsets of the leader's text do not apply here
+            near_duplicate_of=cluster.leader_row,
+            near_duplicate_similarity=round(claim.similarity, 3),
+        )
+
+    def stats(self):
+        """Return {'leaders', 'clusters', 'reused', 'fallbacks'}.
+
+        leaders: texts moderated as the first of a potential cluster; clusters: leaders whose
+        verdict was reused at least once; reused: rows answered from a leader's verdict (LLM
+        calls avoided); fallbacks: rows moderated themselves because their leader failed.
+        """
+        with self._lock:
+            return dict(self._stats)
@@ -1,24 +1,285 @@
+import os
+import random
+import threading
+import time
+
 import boto3
+import requests
+from botocore.config import Config
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Transport settings below come from the environment; this module can be imported before config.py
+load_dotenv()
 
 # Initialize AWS clients with specific region
 region = 'us-west-2'  # Using us-west-2 region
 
+# ---------------------------------------------------------------------------
+# Transport: pooled connections shared by every outbound call
+# ---------------------------------------------------------------------------
+
+DEFAULT_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 10))
+READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 60))
+# LLM calls on video or long outputs can take minutes before the first byte arrives
+BEDROCK_READ_TIMEOUT = float(os.environ.get('BEDROCK_READ_TIMEOUT', 300))
+
+_transport_lock = threading.Lock()
+_pool_size = DEFAULT_POOL_SIZE
+_http_session = None
+
+
+def pool_size_for(concurrency):
+    """Connection pool size for a workload running up to `concurrency` calls at once."""
+    return max(DEFAULT_POOL_SIZE, 2 * int(concurrency or 0))
+
+
+def client_config(**overrides):
+    """
+    Build the botocore Config used by every AWS client
+
+    Args:
+        **overrides: botocore Config options that replace the shared defaults
+
+    Returns:
+        Config: pooled keep-alive config with explicit connect/read timeouts
+    """
+    base = Config(
+        max_pool_connections=_pool_size,
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        tcp_keepalive=True,
+        retries={'mode': 'standard', 'max_attempts': 3},
+    )
+    return base.merge(Config(**overrides)) if overrides else base
+
+
+def http_session():
+    """Return the process-wide requests.Session with pooled keep-alive connections."""
+    global _http_session
+    with _transport_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=_pool_size,
+                pool_maxsize=_pool_size,
+                max_retries=Retry(
+                    total=2, connect=2, read=0, backoff_factor=0.5,
+                    status_forcelist=(502, 503, 504), allowed_methods=frozenset({'GET', 'HEAD'}),
+                ),
+            )
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _http_session = session
+        return _http_session
+
+
+def http_timeout(read_timeout=None):
+    """(connect, read) timeout tuple for requests calls."""
+    return (CONNECT_TIMEOUT, read_timeout or READ_TIMEOUT)
+
+
+def _build_clients():
+    global rekognition_client, comprehend_client, bedrock_client, transcribe_client, s3_client
+    rekognition_client = boto3.client('rekognition', region_name=region, config=client_config())
+    comprehend_client = boto3.client('comprehend', region_name=region, config=client_config())
+    # Bedrock retries are handled by call_with_adaptive_retry() so throttles reach the AIMD controller
+    bedrock_client = boto3.client(
+        'bedrock-runtime', region_name=region,
+        config=client_config(read_timeout=BEDROCK_READ_TIMEOUT, retries={'mode': 'standard', 'max_attempts': 1}),
+    )
+    transcribe_client = boto3.client('transcribe', region_name=region, config=client_config())
+    s3_client = boto3.client('s3', region_name=region, config=client_config())
+
+
+def configure_transport(concurrency):
+    """
+    Size connection pools for the given concurrency and rebuild the shared clients
+
+    Modules that imported a client object directly keep the old one; call this at startup,
+    before any work is scheduled.
+
+    Args:
+        concurrency (int): Maximum number of calls expected in flight at once
+
+    Returns:
+        int: the pool size now in use
+    """
+    global _pool_size, _http_session
+    with _transport_lock:
+        _pool_size = pool_size_for(concurrency)
+        if _http_session is not None:
+            _http_session.close()
+            _http_session = None
+    _build_clients()
+    return _pool_size
+
+
 # Initialize AWS clients
-rekognition_client = boto3.client('rekognition', region_name=region)
-comprehend_client = boto3.client('comprehend', region_name=region)
-bedrock_client = boto3.client('bedrock-runtime', region_name=region)
-transcribe_client = boto3.client('transcribe', region_name=region)
-s3_client = boto3.client('s3', region_name=region)
+_build_clients()
+
+# ---------------------------------------------------------------------------
+# Adaptive (AIMD) concurrency control for Bedrock calls
+# ---------------------------------------------------------------------------
+
+THROTTLE_ERROR_CODES = {
+    'ThrottlingException',
+    'TooManyRequestsException',
+    'ServiceUnavailableException',
+    'ModelNotReadyException',
+}
+
+
+class AdaptiveConcurrencyController:
+    """Per-model concurrency limit that adapts to Bedrock throttling.
+
+    Each successful call raises the limit by increase/limit (about +increase per full window),
+    and a throttle or 5xx response multiplies it by decrease. Decreases are spaced at least
+    cooldown seconds apart so one burst of throttles only halves the limit once.
+    """
+
+    def __init__(self, initial=4, min_limit=1, max_limit=64, increase=1.0, decrease=0.5, cooldown=1.0):
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self._cond = threading.Condition()
+        self._models = {}
+
+    def configure(self, initial=None, min_limit=None, max_limit=None):
+        """Update the bounds; limits already learned for a model are clamped to the new range."""
+        with self._cond:
+            if initial is not None:
+                self.initial = initial
+            if min_limit is not None:
+                self.min_limit = min_limit
+            if max_limit is not None:
+                self.max_limit = max_limit
+            for st in self._models.values():
+                st['limit'] = min(self.max_limit, max(self.min_limit, st['limit']))
+            self._cond.notify_all()
+
+    def _state(self, model_id):
+        st = self._models.get(model_id)
+        if st is None:
+            st = {
+                'limit': float(min(self.max_limit, max(self.min_limit, self.initial))),
+                'in_flight': 0, 'successes': 0, 'throttles': 0, 'retries': 0, 'last_decrease': 0.0,
+            }
+            self._models[model_id] = st
+        return st
+
+    def acquire(self, model_id):
+        """Block until a call slot is free for model_id."""
+        with self._cond:
+            st = self._state(model_id)
+            while st['in_flight'] >= max(1, int(st['limit'])):
+                self._cond.wait()
+            st['in_flight'] += 1
+
+    def release(self, model_id, outcome):
+        """Free a slot. outcome is 'success', 'throttle' or 'error' (errors leave the limit alone)."""
+        with self._cond:
+            st = self._state(model_id)
+            st['in_flight'] -= 1
+            if outcome == 'success':
+                st['successes'] += 1
+                st['limit'] = min(self.max_limit, st['limit'] + self.increase / st['limit'])
+            elif outcome == 'throttle':
+                st['throttles'] += 1
+                now = time.monotonic()
+                if now - st['last_decrease'] >= self.cooldown:
+                    st['limit'] = max(self.min_limit, st['limit'] * self.decrease)
+                    st['last_decrease'] = now
+            self._cond.notify_all()
+
+    def record_retry(self, model_id):
+        with self._cond:
+            self._state(model_id)['retries'] += 1
+
+    def stats(self):
+        """Return {model_id: {limit, successes, throttles, retries}}."""
+        with self._cond:
+            return {
+                model_id: {
+                    'limit': round(st['limit'], 2),
+                    'successes': st['successes'],
+                    'throttles': st['throttles'],
+                    'retries': st['retries'],
+                }
+                for model_id, st in self._models.items()
+            }
+
+
+adaptive_limiter = AdaptiveConcurrencyController()
+
+
+def _classify_error(exc):
+    """Return 'throttle' for throttles/5xx, 'transient' for connection errors, None if not retryable."""
+    if isinstance(exc, ClientError):
+        code = exc.response.get('Error', {}).get('Code', '')
+        status = exc.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0)
+        if code in THROTTLE_ERROR_CODES or status == 429 or status >= 500:
+            return 'throttle'
+        return None
+    if isinstance(exc, (BotoConnectionError, HTTPClientError)):
+        return 'transient'
+    return None
+
+
+def call_with_adaptive_retry(model_id, fn, max_attempts=6, base_delay=0.5, max_delay=20.0):
+    """
+    Run fn() under the adaptive per-model limit, retrying throttles with jittered backoff
+
+    Args:
+        model_id (str): The model ID the call is made against
+        fn (callable): Zero-argument function performing the Bedrock call
+        max_attempts (int): Total attempts before the last error is re-raised
+        base_delay (float): Backoff base in seconds; attempt n sleeps up to base_delay * 2**n
+        max_delay (float): Upper bound for a single backoff sleep
+
+    Returns:
+        Whatever fn() returns
+    """
+    for attempt in range(max_attempts):
+        adaptive_limiter.acquire(model_id)
+        try:
+            result = fn()
+        except Exception as e:
+            kind = _classify_error(e)
+            adaptive_limiter.release(model_id, 'throttle' if kind == 'throttle' else 'error')
+            if kind is None or attempt == max_attempts - 1:
+                raise
+            adaptive_limiter.record_retry(model_id)
+            # Full jitter keeps retrying workers from re-synchronizing
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+            continue
+        adaptive_limiter.release(model_id, 'success')
+        return result
+
 
 def invoke_model(body, contentType, accept, modelId):
-    response = bedrock_client.invoke_model(
+    response = call_with_adaptive_retry(modelId, lambda: bedrock_client.invoke_model(
         body=body,
         contentType=contentType,
         accept=accept,
         modelId=modelId
-    )
+    ))
     return response
 
+# Strings converse_with_model() returns instead of raising; never cache these
+ERROR_RESPONSES = ("Model invocation error", "Model returned empty response")
+
+
+def is_error_response(text):
+    return not isinstance(text, str) or text.startswith(ERROR_RESPONSES)
+
+
 def converse_with_model(model_id, system_prompts, messages, max_tokens=2000, temperature=0.3):
     """
     Start or continue a conversation using Bedrock's Converse API
@@ -34,7 +295,7 @@ def converse_with_model(model_id, system_prompts, messages, max_tokens=2000, tem
         str: Model's response text
     """
     try:
-        response = bedrock_client.converse(
+        response = call_with_adaptive_retry(model_id, lambda: bedrock_client.converse(
             modelId=model_id,
             system=system_prompts,
             messages=messages,
@@ -42,7 +303,7 @@ def converse_with_model(model_id, system_prompts, messages, max_tokens=2000, tem
                 "temperature": temperature,
                 "maxTokens": max_tokens,
             }
-        )
+        ))
         
         content = response['output']['message']['content']
         print("Using model: "+model_id)
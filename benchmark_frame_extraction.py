@@ -0,0 +1,91 @@
+"""Compare the frame extraction backends on the example videos (or the videos given).
+
+    python benchmark_frame_extraction.py [video ...] [--frames 5] [--repeat 5]
+
+Prints the median wall time per backend, strategy and source (file path or in-memory bytes),
+and which backend "auto" picks for each video. Use it to tune OPENCV_AUTO_MAX_DURATION and
+OPENCV_AUTO_CONTAINERS in frame_extraction.py.
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import statistics
+import time
+
+from frame_extraction import (
+    FRAME_BACKENDS,
+    FRAME_STRATEGIES,
+    choose_frame_backend,
+    extract_frames_from_bytes,
+    extract_frames_from_file,
+    probe_duration,
+)
+
+_EXAMPLE_VIDEOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "examples", "videos", "*")
+
+
+def _median_time(func, repeat):
+    func()  # warm-up: page cache, codec initialisation
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ffmpeg vs OpenCV frame extraction")
+    parser.add_argument("videos", nargs="*", help="Video files (default: examples/videos/*)")
+    parser.add_argument("--frames", type=int, default=5, help="Frames per extraction (default: 5)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (default: 5)")
+    parser.add_argument("--scale", default="320:240", help="Scale argument, as used by the UI (default: 320:240)")
+    args = parser.parse_args()
+
+    videos = args.videos or sorted(glob.glob(_EXAMPLE_VIDEOS))
+    backends = [name for name, backend in FRAME_BACKENDS.items() if backend.available()]
+    has_ffmpeg = bool(shutil.which("ffmpeg") and shutil.which("ffprobe"))
+    if has_ffmpeg:
+        backends.append("auto")
+    else:
+        # "auto" and every OpenCV failure fall back to ffmpeg, so only plain OpenCV can be timed
+        backends = [name for name in backends if name == "opencv"]
+        print("ffmpeg/ffprobe not found on PATH, benchmarking the OpenCV backend only")
+        if not backends:
+            print("OpenCV is not installed either, nothing to benchmark")
+            return
+
+    for path in videos:
+        with open(path, "rb") as f:
+            data = f.read()
+        if has_ffmpeg:
+            duration, picked = probe_duration(path) or 0.0, choose_frame_backend(path)
+        else:
+            try:
+                duration = FRAME_BACKENDS["opencv"].duration(path) or 0.0
+            except RuntimeError:
+                duration = 0.0
+            picked = "n/a"
+        print(f"{os.path.basename(path)}: {len(data) / (1024 * 1024):.1f} MB, {duration:.1f} s, "
+              f"auto -> {picked}")
+        for strategy in FRAME_STRATEGIES:
+            for source in ("file", "bytes"):
+                for backend in backends:
+                    if source == "file":
+                        def run():
+                            return extract_frames_from_file(path, args.frames, args.scale, strategy, backend)
+                    else:
+                        def run():
+                            return extract_frames_from_bytes(data, args.frames, args.scale, strategy, backend)
+                    try:
+                        elapsed, frames = _median_time(run, args.repeat)
+                    except Exception as e:
+                        print(f"  {strategy:8} {source:6} {backend:7} failed: {e}")
+                        continue
+                    print(f"  {strategy:8} {source:6} {backend:7} {elapsed * 1000:9.1f} ms  {len(frames)} frames")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,6 +11,22 @@ SUBMIT_MODERATION =  os.environ.get('SUBMIT_MODERATION')
 QUERY_MODERATION = os.environ.get('QUERY_MODERATION')
 WHISPER_ENDPOINT_NAME= os.environ.get('WHISPER_ENDPOINT_NAME')
 
+# Moderation result cache (SQLite, shared by the UI and the batch CLI)
+RESULT_CACHE_ENABLED = os.environ.get('RESULT_CACHE_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+RESULT_CACHE_PATH = os.environ.get(
+    'RESULT_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'moderation_results.sqlite3'),
+)
+RESULT_CACHE_TTL = int(os.environ.get('RESULT_CACHE_TTL', 7 * 24 * 3600))
+RESULT_CACHE_MAX_MB = int(os.environ.get('RESULT_CACHE_MAX_MB', 512))
+
+# Near-duplicate video frames (perceptual hash Hamming distance <= threshold) are not sent to the model
+FRAME_DEDUP_THRESHOLD = int(os.environ.get('FRAME_DEDUP_THRESHOLD', 5))  # negative disables
+FRAME_HASH_METHOD = os.environ.get('FRAME_HASH_METHOD', 'dhash')  # dhash or phash
+
+# Video frame decoder: auto (OpenCV in-process for short MP4/AVI clips, ffmpeg otherwise), ffmpeg or opencv
+FRAME_BACKEND = os.environ.get('FRAME_BACKEND', 'auto')
+
 
 DEFAULT_SYSTEM_PROMPT = """Always stay in your roleplay and your character and avoid jumping out of your given role or character. <Character and Role Setting>You are a professional image content moderation expert, helping to review whether the input image content complies with regulations. You will absolutely not make your own moral judgments on the input content; you will only faithfully play the role of an image review expert to complete the image review task</Character and Role Setting>, Note: Always remain fully immersed in the roleplay."""
 DEFAULT_IMAGE_PROMPT = """Strictly judge according to the following review standards, provide clear review reasons for each field, label appropriate tags, and output results that conform to the flag setting standards.
@@ -67,6 +83,37 @@ REKOGNITION_VIDEO_MIN_CONFIDENCE = 60.0
 REKOGNITION_POLL_INTERVAL = 5
 REKOGNITION_POLL_TIMEOUT = 300
 
+# Languages each Amazon Comprehend analysis accepts (the UI text tab and the batch --comprehend
+# stage skip calls for other languages instead of sending them only to fail)
+_COMPREHEND_GENERAL_LANGUAGES = ('en', 'es', 'fr', 'de', 'it', 'pt', 'ar', 'hi', 'ja', 'ko', 'zh', 'zh-TW')
+COMPREHEND_LANGUAGE_SUPPORT = {
+    'sentiment': _COMPREHEND_GENERAL_LANGUAGES,
+    'entities': _COMPREHEND_GENERAL_LANGUAGES,
+    'key_phrases': _COMPREHEND_GENERAL_LANGUAGES,
+    'pii': ('en', 'es'),
+    'toxicity': ('en',),
+}
+
+# Per-request UTF-8 limits of the synchronous Comprehend APIs; longer texts are chunked at sentence boundaries
+COMPREHEND_MAX_BYTES = {
+    'language': 100000,
+    'sentiment': 5000,
+    'entities': 100000,
+    'key_phrases': 100000,
+    'pii': 100000,
+}
+COMPREHEND_TOXIC_SEGMENT_BYTES = 1000  # DetectToxicContent: per segment
+COMPREHEND_TOXIC_SEGMENTS_PER_REQUEST = 10  # DetectToxicContent: segments per request
+
+# Texts longer than this (UTF-8 bytes) are moderated as sentence-aligned chunks in parallel, 0 disables
+LONG_TEXT_CHUNK_BYTES = int(os.environ.get('LONG_TEXT_CHUNK_BYTES', 12000))
+
+# Texts whose MinHash similarity to an already moderated text reaches the threshold reuse its verdict.
+# Opt-in (0 disables); 0.8 suits spam waves, but a reused verdict can miss a small change in meaning
+NEAR_DUP_TEXT_THRESHOLD = float(os.environ.get('NEAR_DUP_TEXT_THRESHOLD', 0))
+NEAR_DUP_TEXT_MIN_CHARS = int(os.environ.get('NEAR_DUP_TEXT_MIN_CHARS', 30))  # shorter texts are always moderated
+NEAR_DUP_TEXT_MAX_ENTRIES = int(os.environ.get('NEAR_DUP_TEXT_MAX_ENTRIES', 100000))  # oldest are forgotten first
+
 MODEL_ID = "global.anthropic.claude-sonnet-4-6"
 
 # ---------------------------------------------------------------------------
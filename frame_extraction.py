@@ -0,0 +1,560 @@
+import io
+import json
+import logging
+import os
+import subprocess
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+try:
+    import cv2
+except ImportError:  # the OpenCV backend is then unavailable and ffmpeg is used
+    cv2 = None
+
+logger = logging.getLogger(__name__)
+
+# "uniform" samples at fixed intervals, "scene" keeps the most distinct of many candidates
+FRAME_STRATEGIES = ("uniform", "scene")
+
+_SCENE_CANDIDATES_PER_FRAME = 8
+_SCENE_MIN_CANDIDATES = 32
+_SCENE_THUMB_SIZE = (64, 36)
+_SCENE_HIST_BINS = 32
+
+# One seeked ffmpeg input per timestamp pays off for a handful of frames; denser samples (scene
+# candidates) are cheaper to take from a single sequential decode
+_FFMPEG_MAX_SEEK_INPUTS = 16
+
+# Perceptual hashes for near-duplicate frame removal; both are 64 bits
+HASH_METHODS = ("dhash", "phash")
+_HASH_SIZE = 8
+_PHASH_SIZE = 32
+
+# JPEG start-of-image marker; it cannot occur inside a frame's entropy-coded data
+_JPEG_SOI = b"\xff\xd8"
+
+_FFMPEG = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin"]
+_JPEG_PIPE_OUTPUT = ["-f", "image2pipe", "-c:v", "mjpeg", "-q:v", "2", "pipe:1"]
+
+# "auto" decodes with in-process OpenCV for clips up to this long in these containers (see choose_frame_backend);
+# benchmark_frame_extraction.py measures both backends on the sample videos
+OPENCV_AUTO_CONTAINERS = ("mp4", "avi")
+OPENCV_AUTO_MAX_DURATION = 120.0
+_OPENCV_SEEK_GAP_SECONDS = 1.0  # farther targets are seeked to, nearer ones grabbed through
+_OPENCV_JPEG_QUALITY = 95  # close to ffmpeg's -q:v 2
+
+
+def probe_duration(video_path):
+    """
+    Read the video duration from container metadata, without demuxing the file
+
+    Args:
+        video_path (str): Video file path
+
+    Returns:
+        float | None: duration in seconds, or None if the container does not record one
+    """
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "format=duration:stream=duration",
+            "-of", "json", video_path,
+        ],
+        capture_output=True,
+    )
+    try:
+        info = json.loads(result.stdout or b"{}")
+    except ValueError:
+        return None
+    candidates = [s.get("duration") for s in info.get("streams", [])]
+    candidates.append(info.get("format", {}).get("duration"))
+    for value in candidates:
+        try:
+            duration = float(value)
+        except (TypeError, ValueError):
+            continue
+        if duration > 0:
+            return duration
+    return None
+
+
+def frame_timestamps(duration, num_frames):
+    """
+    N evenly spaced timestamps, each at the middle of its slice of the video
+
+    Args:
+        duration (float): Video duration in seconds
+        num_frames (int): Number of frames wanted
+
+    Returns:
+        list[float]: timestamps in seconds
+    """
+    step = duration / num_frames
+    return [round(step * (i + 0.5), 3) for i in range(num_frames)]
+
+
+def split_jpegs(data):
+    """Split concatenated JPEG images (ffmpeg image2pipe output) into a list of byte strings."""
+    starts = []
+    pos = data.find(_JPEG_SOI)
+    while pos != -1:
+        starts.append(pos)
+        pos = data.find(_JPEG_SOI, pos + 2)
+    return [data[start:end] for start, end in zip(starts, starts[1:] + [len(data)])]
+
+
+def _run_ffmpeg(args):
+    """Run ffmpeg and return its stdout."""
+    proc = subprocess.run(_FFMPEG + args, capture_output=True)
+    if proc.returncode != 0 and not proc.stdout:
+        raise RuntimeError(f"ffmpeg failed: {proc.stderr.decode('utf-8', 'replace').strip()[-500:]}")
+    return proc.stdout
+
+
+def _seek_frames(video_path, timestamps, scale):
+    """One ffmpeg process: one input per timestamp, each seeked to its keyframe, one frame each."""
+    args = []
+    for ts in timestamps:
+        args += ["-ss", str(ts), "-i", video_path]
+    branches = "".join(
+        f"[{i}:v:0]trim=end_frame=1,setpts=PTS-STARTPTS,scale={scale},setsar=1[f{i}];"
+        for i in range(len(timestamps))
+    )
+    labels = "".join(f"[f{i}]" for i in range(len(timestamps)))
+    graph = f"{branches}{labels}concat=n={len(timestamps)}:v=1:a=0[out]"
+    out = _run_ffmpeg(args + ["-filter_complex", graph, "-map", "[out]", "-vsync", "vfr"] + _JPEG_PIPE_OUTPUT)
+    return split_jpegs(out)
+
+
+def _stream_frames(video_path, num_frames, duration, scale):
+    """
+    One sequential pass (used when seeking fails or the container records no duration)
+
+    The fps filter keeps one frame per slice and ffmpeg stops reading as soon as the last one
+    is written. Without a known duration the first num_frames keyframes are used.
+    """
+    if duration:
+        half_step = duration / num_frames / 2
+        vf = f"trim=start={half_step:.3f},setpts=PTS-STARTPTS,fps={num_frames / duration:.6f},scale={scale}"
+        input_args = ["-i", video_path]
+    else:
+        vf = f"scale={scale}"
+        input_args = ["-skip_frame", "nokey", "-i", video_path]
+    out = _run_ffmpeg(input_args + ["-vf", vf, "-vsync", "vfr", "-frames:v", str(num_frames)] + _JPEG_PIPE_OUTPUT)
+    return split_jpegs(out)
+
+
+def scene_scores(jpegs):
+    """
+    Score each frame by how much it differs from the previous one
+
+    Frames are decoded to small grayscale thumbnails; the score is the L1 distance between
+    luminance histograms plus the mean absolute pixel difference, so both cuts and large
+    motion within a shot register. The first frame scores infinity.
+
+    Args:
+        jpegs (list[bytes]): JPEG-encoded frames in time order
+
+    Returns:
+        numpy.ndarray: one score per frame
+    """
+    thumbs = np.stack([
+        np.asarray(Image.open(io.BytesIO(jpeg)).convert("L").resize(_SCENE_THUMB_SIZE), dtype=np.float32)
+        for jpeg in jpegs
+    ])
+    hists = np.stack([
+        np.histogram(thumb, bins=_SCENE_HIST_BINS, range=(0, 256))[0] for thumb in thumbs
+    ]) / thumbs[0].size
+    scores = np.empty(len(jpegs))
+    scores[0] = np.inf
+    scores[1:] = (
+        np.abs(np.diff(hists, axis=0)).sum(axis=1) / 2
+        + np.abs(np.diff(thumbs, axis=0)).mean(axis=(1, 2)) / 255
+    )
+    return scores
+
+
+def select_scene_frames(jpegs, num_frames):
+    """
+    Pick the num_frames most distinct frames, returned in time order
+
+    Picks are greedy by scene score; a small bonus for distance from frames already picked
+    spreads the selection out when scores tie (e.g. a static video).
+
+    Args:
+        jpegs (list[bytes]): Candidate frames in time order
+        num_frames (int): Number of frames to keep
+
+    Returns:
+        list[bytes]: the selected frames
+    """
+    if len(jpegs) <= num_frames:
+        return list(jpegs)
+    scores = np.nan_to_num(scene_scores(jpegs), posinf=np.float32(1e6))
+    positions = np.arange(len(jpegs))
+    distance = np.full(len(jpegs), float(len(jpegs)))
+    taken = np.zeros(len(jpegs), dtype=bool)
+    for _ in range(num_frames):
+        gain = scores + 1e-3 * distance / len(jpegs)
+        gain[taken] = -np.inf
+        best = int(np.argmax(gain))
+        taken[best] = True
+        distance = np.minimum(distance, np.abs(positions - best))
+    return [jpeg for jpeg, keep in zip(jpegs, taken) if keep]
+
+
+def _gray_pixels(frames, size):
+    """Stack frames (PIL Images, file paths or encoded bytes) as float32 grayscale arrays of size."""
+    arrays = []
+    for frame in frames:
+        if isinstance(frame, Image.Image):
+            img = frame
+        else:
+            img = Image.open(frame if isinstance(frame, str) else io.BytesIO(frame))
+        arrays.append(np.asarray(img.convert("L").resize(size, Image.LANCZOS), dtype=np.float32))
+    return np.stack(arrays)
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n))
+    matrix[0] *= np.sqrt(1 / 2)
+    return matrix * np.sqrt(2 / n)
+
+
+def frame_hashes(frames, method="dhash"):
+    """
+    Compute 64-bit perceptual hashes for a batch of frames
+
+    dhash compares horizontally adjacent pixels of a 9x8 thumbnail; phash thresholds the
+    low-frequency 8x8 block of a 32x32 DCT at its median. Both run on the whole batch at once.
+
+    Args:
+        frames (list): PIL Images, file paths or encoded image bytes
+        method (str): One of HASH_METHODS
+
+    Returns:
+        numpy.ndarray: boolean array of shape (len(frames), 64)
+    """
+    if method == "dhash":
+        pixels = _gray_pixels(frames, (_HASH_SIZE + 1, _HASH_SIZE))
+        bits = pixels[:, :, 1:] > pixels[:, :, :-1]
+    elif method == "phash":
+        pixels = _gray_pixels(frames, (_PHASH_SIZE, _PHASH_SIZE))
+        dct = _dct_matrix(_PHASH_SIZE)
+        low = np.einsum("ij,njk,lk->nil", dct, pixels, dct)[:, :_HASH_SIZE, :_HASH_SIZE]
+        flat = low.reshape(len(frames), -1)
+        # The DC term carries overall brightness, not structure, so it is left out of the median
+        bits = flat > np.median(flat[:, 1:], axis=1, keepdims=True)
+    else:
+        raise ValueError(f"Unknown hash method: {method}")
+    return bits.reshape(len(frames), -1)
+
+
+def near_duplicates(frames, threshold, method="dhash"):
+    """
+    Find frames that are near-duplicates of an earlier kept frame
+
+    Args:
+        frames (list): PIL Images, file paths or encoded image bytes, in time order
+        threshold (int): Maximum Hamming distance (of 64 bits) that still counts as a duplicate;
+            a negative value disables deduplication
+        method (str): One of HASH_METHODS
+
+    Returns:
+        list[bool]: True for each frame that should be dropped
+    """
+    if threshold is None or threshold < 0 or len(frames) < 2:
+        return [False] * len(frames)
+    bits = frame_hashes(frames, method)
+    distances = (bits[:, None, :] != bits[None, :, :]).sum(axis=2)
+    kept = []
+    for i in range(len(frames)):
+        if not kept or distances[i, kept].min() > threshold:
+            kept.append(i)
+    drop = [True] * len(frames)
+    for i in kept:
+        drop[i] = False
+    return drop
+
+
+def dedupe_frames(frames, threshold, method="dhash"):
+    """
+    Drop near-duplicate frames (see near_duplicates)
+
+    Returns:
+        tuple: (kept frames in their original order, number of frames dropped)
+    """
+    drop = near_duplicates(frames, threshold, method)
+    return [frame for frame, dup in zip(frames, drop) if not dup], sum(drop)
+
+
+def _scene_candidates(num_frames):
+    return max(_SCENE_MIN_CANDIDATES, num_frames * _SCENE_CANDIDATES_PER_FRAME)
+
+
+def _check_strategy(strategy):
+    if strategy not in FRAME_STRATEGIES:
+        raise ValueError(f"Unknown frame strategy: {strategy}")
+
+
+def extract_frames_from_file(video_path, num_frames, scale="640:-2", strategy="uniform", backend="auto"):
+    """
+    Extract JPEG frames from a video file
+
+    Frames are taken at evenly spaced timestamps; with the ffmpeg backend only the GOPs around
+    them are decoded, with OpenCV the clip is decoded in-process (see choose_frame_backend for
+    "auto"). With the "scene" strategy, several times more candidates are sampled and the most
+    distinct are kept; ffmpeg takes that many in one sequential pass rather than one seek each.
+
+    Args:
+        video_path (str): Path to the video file
+        num_frames (int): Number of frames to extract
+        scale (str): ffmpeg scale filter arguments (width:height)
+        strategy (str): One of FRAME_STRATEGIES
+        backend (str): "auto" or a FRAME_BACKENDS name
+
+    Returns:
+        list[bytes]: JPEG-encoded frames in time order
+    """
+    _check_strategy(strategy)
+    num_frames = max(1, int(num_frames))
+    if backend == "auto":
+        backend = choose_frame_backend(video_path)
+    impl = _get_backend(backend)
+    if strategy == "scene":
+        candidates = _decode(impl, lambda b: b.frames_from_file(video_path, _scene_candidates(num_frames), scale))
+        return select_scene_frames(candidates, num_frames)
+    return _decode(impl, lambda b: b.frames_from_file(video_path, num_frames, scale))
+
+
+def extract_frames_from_bytes(video_bytes, num_frames, scale="640:-2", strategy="uniform", backend="auto"):
+    """
+    Extract JPEG frames from in-memory video bytes
+
+    The bytes are written to one temp file and extracted as by extract_frames_from_file, so
+    ffmpeg seeks to each timestamp instead of decoding the whole stream from a pipe.
+
+    Args:
+        video_bytes (bytes): Encoded video
+        num_frames (int): Number of frames to extract
+        scale (str): ffmpeg scale filter arguments (width:height)
+        strategy (str): One of FRAME_STRATEGIES
+        backend (str): "auto" or a FRAME_BACKENDS name
+
+    Returns:
+        list[bytes]: JPEG-encoded frames in time order
+    """
+    _check_strategy(strategy)
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = _write_temp(tmp, video_bytes)
+        return extract_frames_from_file(video_path, num_frames, scale, strategy, backend)
+
+
+def _decode(impl, call):
+    """call(backend), retried with ffmpeg if another backend fails or finds no frames."""
+    ffmpeg = FRAME_BACKENDS["ffmpeg"]
+    if impl is ffmpeg:
+        return call(impl)
+    try:
+        frames = call(impl)
+        if frames:
+            return frames
+        logger.warning("%s frame backend returned no frames, retrying with ffmpeg", impl.name)
+    except Exception as e:
+        logger.warning("%s frame backend failed, retrying with ffmpeg: %s", impl.name, e)
+    return call(ffmpeg)
+
+
+def _write_temp(tmp_dir, video_bytes):
+    video_path = os.path.join(tmp_dir, "input")
+    with open(video_path, "wb") as f:
+        f.write(video_bytes)
+    return video_path
+
+
+# ---------------------------------------------------------------------------
+# Decode backends
+# ---------------------------------------------------------------------------
+
+class FrameBackend:
+    """
+    Decodes N evenly spaced frames of a video file into JPEG bytes
+
+    Subclasses implement frames_from_file(); in-memory videos reach them through the temp file
+    written by extract_frames_from_bytes(). Register new ones with register_frame_backend().
+    """
+
+    name = None
+
+    def available(self):
+        """Whether the backend's dependencies are installed."""
+        return True
+
+    def frames_from_file(self, video_path, num_frames, scale):
+        raise NotImplementedError
+
+
+class FFmpegBackend(FrameBackend):
+    """ffprobe for the duration, then a single ffmpeg process whose JPEGs are read from a pipe."""
+
+    name = "ffmpeg"
+
+    def frames_from_file(self, video_path, num_frames, scale):
+        duration = probe_duration(video_path)
+        if duration and num_frames <= _FFMPEG_MAX_SEEK_INPUTS:
+            try:
+                frames = _seek_frames(video_path, frame_timestamps(duration, num_frames), scale)
+                if frames:
+                    return frames
+            except RuntimeError as e:
+                logger.warning("Seek-based frame extraction failed, decoding sequentially: %s", e)
+        return _stream_frames(video_path, num_frames, duration, scale)
+
+
+class OpenCVBackend(FrameBackend):
+    """
+    In-process cv2.VideoCapture, so no process is spawned per video
+
+    Frame count and rate come from the container. Nearby targets are reached by grabbing
+    frames sequentially, distant ones by seeking to the frame index.
+    """
+
+    name = "opencv"
+
+    def available(self):
+        return cv2 is not None
+
+    def _open(self, video_path):
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            cap.release()
+            raise RuntimeError(f"OpenCV cannot open {video_path}")
+        return cap
+
+    @staticmethod
+    def _frame_info(cap):
+        count, fps = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), cap.get(cv2.CAP_PROP_FPS)
+        return (count, fps) if count > 0 and fps > 0 else (0, 0.0)
+
+    def duration(self, video_path):
+        """Duration in seconds from the frame count and rate, or None if the container lacks them."""
+        cap = self._open(video_path)
+        try:
+            count, fps = self._frame_info(cap)
+            return count / fps if count else None
+        finally:
+            cap.release()
+
+    def frames_from_file(self, video_path, num_frames, scale):
+        cap = self._open(video_path)
+        try:
+            count, fps = self._frame_info(cap)
+            if not count:
+                raise RuntimeError("frame count or rate not recorded in the container")
+            targets = [min(count - 1, int(ts * fps)) for ts in frame_timestamps(count / fps, num_frames)]
+            seek_gap = max(1, int(fps * _OPENCV_SEEK_GAP_SECONDS))
+            jpegs, pos = [], 0  # pos: index of the frame the next read() returns
+            for target in targets:
+                if target - pos > seek_gap:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                    pos = target
+                while pos < target and cap.grab():
+                    pos += 1
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                pos += 1
+                jpegs.append(_encode_bgr(frame, scale))
+            return jpegs
+        finally:
+            cap.release()
+
+
+def _scaled_size(scale, width, height):
+    """Output size for ffmpeg-style scale arguments ("W:H", -1 keeps the aspect ratio, -2 also rounds to even)."""
+    target_w, target_h = (int(v) for v in scale.split(":"))
+    if target_w < 0 and target_h < 0:
+        return width, height
+    if target_w < 0:
+        target_w = max(-target_w, round(width * target_h / height / -target_w) * -target_w)
+    elif target_h < 0:
+        target_h = max(-target_h, round(height * target_w / width / -target_h) * -target_h)
+    return target_w, target_h
+
+
+def _encode_bgr(frame, scale):
+    height, width = frame.shape[:2]
+    size = _scaled_size(scale, width, height)
+    if size != (width, height):
+        interpolation = cv2.INTER_AREA if size[0] < width else cv2.INTER_LINEAR
+        frame = cv2.resize(frame, size, interpolation=interpolation)
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, _OPENCV_JPEG_QUALITY])
+    if not ok:
+        raise RuntimeError("OpenCV JPEG encoding failed")
+    return buf.tobytes()
+
+
+FRAME_BACKENDS = {}
+
+
+def register_frame_backend(backend):
+    """Make a FrameBackend instance selectable by its name."""
+    FRAME_BACKENDS[backend.name] = backend
+
+
+def _get_backend(name):
+    if name not in FRAME_BACKENDS:
+        raise ValueError(f"Unknown frame backend: {name}")
+    impl = FRAME_BACKENDS[name]
+    if not impl.available():
+        logger.warning("Frame backend %s is not available, using ffmpeg", name)
+        return FRAME_BACKENDS["ffmpeg"]
+    return impl
+
+
+register_frame_backend(FFmpegBackend())
+register_frame_backend(OpenCVBackend())
+
+
+def sniff_container(head):
+    """
+    Identify the container from the first 12 bytes of a file
+
+    Returns:
+        str | None: "mp4" (MP4/QuickTime family), "avi", "matroska" (MKV/WebM) or None
+    """
+    if head[4:8] in (b"ftyp", b"moov", b"mdat", b"wide", b"free"):
+        return "mp4"
+    if head[:4] == b"RIFF" and head[8:12] == b"AVI ":
+        return "avi"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "matroska"
+    return None
+
+
+def choose_frame_backend(video_path):
+    """
+    Backend that "auto" uses for a file
+
+    OpenCV for short clips in containers whose frame index it reads reliably, where spawning
+    ffprobe and ffmpeg costs more than the decode itself; ffmpeg for everything else, where its
+    keyframe seeking touches far less of the video.
+
+    Returns:
+        str: "opencv" or "ffmpeg"
+    """
+    opencv = FRAME_BACKENDS["opencv"]
+    if not opencv.available():
+        return "ffmpeg"
+    with open(video_path, "rb") as f:
+        head = f.read(12)
+    if sniff_container(head) not in OPENCV_AUTO_CONTAINERS:
+        return "ffmpeg"
+    try:
+        duration = opencv.duration(video_path)
+    except RuntimeError:
+        return "ffmpeg"
+    return "opencv" if duration and duration <= OPENCV_AUTO_MAX_DURATION else "ffmpeg"
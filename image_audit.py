@@ -1,34 +1,49 @@
+import concurrent.futures
 import json
-import io
-import os
-import cv2
+import logging
+import time
 import boto3
-from aws_clients import rekognition_client, invoke_model, converse_with_model
+import aws_clients  # clients looked up per call: configure_transport() rebuilds them
+from aws_clients import invoke_model, converse_with_model, is_error_response
+from result_cache import cache_key, default_cache
+from image_preprocess import REKOGNITION_IMAGE_MAX_BYTES, describe_savings, model_long_edge
 import utils
 import config
-import numpy as np
-from PIL import Image
 from config import DEFAULT_SYSTEM_PROMPT, DEFAULT_IMAGE_PROMPT
 
+# Shared by all requests: each image fans out 4 calls (LLM + 3 Rekognition), so this serves a
+# few concurrent users before calls start to queue
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix="image-audit")
+
+def rekognition_image_bytes(image):
+    """Image bytes for Rekognition, shrunk only if they exceed its 5 MB payload limit"""
+    media = utils.ImageMedia.of(image)
+    image_bytes, _ = media.encoded()
+    if len(image_bytes) <= REKOGNITION_IMAGE_MAX_BYTES:
+        return image_bytes
+    image_bytes, _, stats = media.prepared(None, max_bytes=REKOGNITION_IMAGE_MAX_BYTES)
+    logging.info(f"Rekognition image: {describe_savings(stats)}")
+    return image_bytes
+
 def rekognition_detect_moderation_labels_result(image):
-    image_bytes = utils.get_image_bytes(image)
-    response = rekognition_client.detect_moderation_labels(
+    image_bytes = rekognition_image_bytes(image)
+    response = aws_clients.rekognition_client.detect_moderation_labels(
         Image={'Bytes': image_bytes},
     )
     labels = [label['Name'] + f" ({label['Confidence']:.2f}%)" for label in response['ModerationLabels']]
     return "Moderation Labels:\n" + "\n".join(labels)
 
 def rekognition_detect_labels_result(image):
-    image_bytes = utils.get_image_bytes(image)
-    response = rekognition_client.detect_labels(
+    image_bytes = rekognition_image_bytes(image)
+    response = aws_clients.rekognition_client.detect_labels(
         Image={'Bytes': image_bytes},
     )
     labels = [label['Name'] + f" ({label['Confidence']:.2f}%)" for label in response['Labels']]
     return "Detected Labels:\n" + "\n".join(labels)
 
 def rekognition_detect_faces_result(image):
-    image_bytes = utils.get_image_bytes(image)
-    response = rekognition_client.detect_faces(
+    image_bytes = rekognition_image_bytes(image)
+    response = aws_clients.rekognition_client.detect_faces(
         Image={'Bytes': image_bytes},
         Attributes=['ALL']
     )
@@ -43,46 +58,46 @@ def rekognition_detect_faces_result(image):
         result.append(f"  Top Emotion: {emotions[0]['Type']} ({emotions[0]['Confidence']:.2f}%)")
     return "Detected Faces:\n" + "\n".join(result)
 
+def _timed(func, *args):
+    start = time.time()
+    result = func(*args)
+    return result, time.time() - start
+
 def process_image(image, system_prompt, model_id):
-    import time
+    """
+    Run the LLM audit and the three Rekognition analyses on one image, all four in flight at once
 
-    llm_start = time.time()
-    llm_res = llm_result(image, system_prompt, model_id)
-    llm_elapsed = time.time() - llm_start
+    Returns:
+        tuple: (llm_result, moderation_labels, labels, faces, llm_elapsed, rek_elapsed) where
+        rek_elapsed is the slowest of the three Rekognition calls, i.e. their wall-clock time
+    """
+    # Decode once; the LLM and the three Rekognition calls share the encoded bytes
+    image = utils.ImageMedia.of(image)
 
-    rek_start = time.time()
-    moderation_result = rekognition_detect_moderation_labels_result(image)
-    labels_result = rekognition_detect_labels_result(image)
-    faces_result = rekognition_detect_faces_result(image)
-    rek_elapsed = time.time() - rek_start
+    llm_future = _executor.submit(_timed, llm_result, image, system_prompt, model_id)
+    rek_futures = [
+        _executor.submit(_timed, func, image)
+        for func in (rekognition_detect_moderation_labels_result,
+                     rekognition_detect_labels_result,
+                     rekognition_detect_faces_result)
+    ]
+
+    llm_res, llm_elapsed = llm_future.result()
+    (moderation_result, moderation_elapsed), (labels_result, labels_elapsed), (faces_result, faces_elapsed) = [
+        future.result() for future in rek_futures
+    ]
+    rek_elapsed = max(moderation_elapsed, labels_elapsed, faces_elapsed)
 
     return llm_res, moderation_result, labels_result, faces_result, llm_elapsed, rek_elapsed
 
 def llm_result(image, system_prompt, model_id):
     """Audit image using the selected model"""
     try:
-        # Handle different image input types
-        if isinstance(image, str):
-            # If image is a file path
-            if os.path.isfile(image):
-                with open(image, "rb") as f:
-                    image_bytes = f.read()
-            else:
-                raise ValueError(f"File not found: {image}")
-        elif isinstance(image, Image.Image):
-            # Convert PIL Image to bytes
-            buffered = io.BytesIO()
-            image.save(buffered, format="PNG")
-            image_bytes = buffered.getvalue()
-        elif isinstance(image, np.ndarray):
-            # Convert NumPy array to bytes
-            pil_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-            buffered = io.BytesIO()
-            pil_image.save(buffered, format="PNG")
-            image_bytes = buffered.getvalue()
-        else:
-            raise ValueError("Unsupported image type")
-        
+        # Downscale to what the model can use and re-encode as JPEG instead of full-size PNG
+        media = utils.ImageMedia.of(image)
+        image_bytes, image_format, stats = media.prepared(model_long_edge(model_id))
+        logging.info(f"LLM image: {describe_savings(stats)}")
+
         # Prepare messages for Claude model
         message = {
             "role": "user",
@@ -92,7 +107,7 @@ def llm_result(image, system_prompt, model_id):
                 },
                 {
                     "image": {
-                        "format": "png",
+                        "format": image_format,
                         "source": {
                             "bytes": image_bytes
                         }
@@ -103,14 +118,15 @@ def llm_result(image, system_prompt, model_id):
         
         messages = [message]
         
-        # Use the existing converse_with_model function
-        llm_analysis = converse_with_model(
+        # Use the existing converse_with_model function; identical requests are served from the result cache
+        key = cache_key("ui-image", image_bytes, model_id, system_prompt, DEFAULT_IMAGE_PROMPT)
+        llm_analysis = default_cache().get_or_compute(key, lambda: converse_with_model(
             model_id=model_id,
             system_prompts=[{"text": system_prompt}] if system_prompt else None,
             messages=messages,
             max_tokens=2000,
             temperature=0.3
-        )
+        ), should_store=lambda r: not is_error_response(r))
 
         return llm_analysis
         
@@ -0,0 +1,134 @@
+import io
+import logging
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# ---------------------------------------------------------------------------
+# Capability table
+# ---------------------------------------------------------------------------
+
+# Longest edge (px) worth sending per model family; larger images are downscaled by the
+# service anyway, so extra pixels only cost upload time and image tokens.
+# Matched by substring against the model ID, first match wins.
+MODEL_IMAGE_LONG_EDGE = (
+    ("anthropic.claude", 1568),
+    ("amazon.nova", 1568),
+    ("qwen", 1280),
+    ("kimi", 1568),
+)
+DEFAULT_IMAGE_LONG_EDGE = 1568
+JPEG_QUALITY = 85
+
+# Payload limits
+BEDROCK_IMAGE_MAX_BYTES = 3_750_000  # per image in a Converse request
+BEDROCK_IMAGE_MAX_EDGE = 8000
+REKOGNITION_IMAGE_MAX_BYTES = 5 * 1024 * 1024  # Image.Bytes
+REKOGNITION_IMAGE_MIN_EDGE = 80
+
+_MIN_JPEG_QUALITY = 50
+
+
+def model_long_edge(model_id):
+    """
+    Longest image edge to send to a model
+
+    Args:
+        model_id (str): Bedrock model ID, or None for the default
+
+    Returns:
+        int: long edge in pixels
+    """
+    for marker, long_edge in MODEL_IMAGE_LONG_EDGE:
+        if model_id and marker in model_id:
+            return long_edge
+    return DEFAULT_IMAGE_LONG_EDGE
+
+
+def _open(image, decoded=None):
+    if isinstance(image, Image.Image):
+        return image, None
+    if isinstance(image, str):
+        with open(image, "rb") as f:
+            data = f.read()
+    else:
+        data = bytes(image)
+    return decoded if decoded is not None else Image.open(io.BytesIO(data)), data
+
+
+def _encode_jpeg(img, quality):
+    if img.mode != "RGB":
+        if img.mode in ("RGBA", "LA", "P"):
+            # Flatten transparency onto white so it does not turn black
+            rgba = img.convert("RGBA")
+            flat = Image.new("RGB", rgba.size, (255, 255, 255))
+            flat.paste(rgba, mask=rgba.split()[-1])
+            img = flat
+        else:
+            img = img.convert("RGB")
+    buffered = io.BytesIO()
+    img.save(buffered, format="JPEG", quality=quality, optimize=True)
+    return buffered.getvalue()
+
+
+def prepare_image(image, long_edge=DEFAULT_IMAGE_LONG_EDGE, max_bytes=BEDROCK_IMAGE_MAX_BYTES,
+                  quality=JPEG_QUALITY, decoded=None):
+    """
+    Downscale and re-encode an image for a model or Rekognition call
+
+    JPEG/PNG inputs that already fit long_edge and max_bytes are passed through byte for byte.
+    Anything else is EXIF-rotated, resized so its longest edge is at most long_edge, and
+    encoded as JPEG; quality and then size are reduced until the payload fits max_bytes.
+
+    Args:
+        image (bytes | str | PIL.Image.Image): Encoded image bytes, a file path, or a PIL Image
+        long_edge (int | None): Maximum longest edge in pixels (None: only the payload limit applies)
+        max_bytes (int): Maximum encoded size
+        quality (int): JPEG quality for re-encoded images
+        decoded (PIL.Image.Image | None): Already opened image for these bytes, to avoid decoding twice
+
+    Returns:
+        tuple: (image_bytes, format, stats) where format is "jpeg" or "png" and stats holds
+        original_bytes, sent_bytes, original_size and sent_size (width, height)
+    """
+    img, data = _open(image, decoded)
+    original_size = img.size
+    fmt = (img.format or "").upper()
+    max_edge = min(long_edge or BEDROCK_IMAGE_MAX_EDGE, BEDROCK_IMAGE_MAX_EDGE)
+
+    if data is not None and fmt in ("JPEG", "PNG") and max(img.size) <= max_edge and len(data) <= max_bytes:
+        sent, sent_fmt, sent_size = data, fmt.lower(), img.size
+    else:
+        img = ImageOps.exif_transpose(img)
+        if max(img.size) > max_edge:
+            img = img.copy()
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        sent = _encode_jpeg(img, quality)
+        while len(sent) > max_bytes:
+            if quality > _MIN_JPEG_QUALITY:
+                quality = max(_MIN_JPEG_QUALITY, quality - 15)
+            else:
+                smaller = (max(1, int(img.width * 0.75)), max(1, int(img.height * 0.75)))
+                if min(smaller) < REKOGNITION_IMAGE_MIN_EDGE:
+                    break
+                img = img.resize(smaller, Image.LANCZOS)
+            sent = _encode_jpeg(img, quality)
+        sent_fmt, sent_size = "jpeg", img.size
+
+    stats = {
+        "original_bytes": len(data) if data is not None else None,
+        "sent_bytes": len(sent),
+        "original_size": original_size,
+        "sent_size": sent_size,
+    }
+    return sent, sent_fmt, stats
+
+
+def describe_savings(stats):
+    """One-line summary of what preprocessing did to an image, for logs and UI output."""
+    (ow, oh), (sw, sh) = stats["original_size"], stats["sent_size"]
+    line = f"{ow}x{oh} -> {sw}x{sh}, {stats['sent_bytes'] / 1024:.0f} KB sent"
+    if stats["original_bytes"]:
+        line += f" (original {stats['original_bytes'] / 1024:.0f} KB)"
+    return line
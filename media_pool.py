@@ -0,0 +1,172 @@
+import atexit
+import logging
+import multiprocessing
+import os
+import secrets
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+# Read directly from the environment (not config.py): the batch CLI loads this module next to its own config
+load_dotenv()
+
+# Spawned workers: callers are multi-threaded (Gradio handlers, batch worker threads), where fork is unsafe
+_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def usable_cpus():
+    """Number of CPUs this process may run on (respects affinity masks and container CPU sets)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _env_workers():
+    value = os.environ.get('MEDIA_POOL_WORKERS', '').strip()
+    return int(value) if value else usable_cpus()
+
+
+_pool = None
+_workers = _env_workers()
+_lock = threading.Lock()
+
+
+def configure_media_pool(workers=None):
+    """
+    Set the size of the media transform process pool, replacing a running pool
+
+    Args:
+        workers (int | None): Worker processes; None reads MEDIA_POOL_WORKERS (default: usable CPUs),
+            0 runs transforms in the calling thread
+
+    Returns:
+        int: the configured worker count
+    """
+    global _pool, _workers
+    with _lock:
+        old, _pool = _pool, None
+        _workers = _env_workers() if workers is None else max(0, int(workers))
+    if old is not None:
+        old.shutdown(wait=True)
+    return _workers
+
+
+def media_pool_workers():
+    """Configured worker count (0: transforms run in the calling thread)."""
+    return _workers
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None and _workers > 0:
+            # Created on first use so importing this module never starts processes
+            _pool = ProcessPoolExecutor(max_workers=_workers, mp_context=_MP_CONTEXT)
+        return _pool
+
+
+def run_cpu(func, *args, **kwargs):
+    """
+    Run a CPU-heavy media transform in the process pool and wait for its result
+
+    func and its arguments are pickled, so func must be a module-level function of a module
+    the worker can import by name. Falls back to calling func here when the pool is disabled
+    or a worker died.
+
+    Returns:
+        the return value of func(*args, **kwargs)
+    """
+    global _pool
+    pool = _get_pool()
+    if pool is None:
+        return func(*args, **kwargs)
+    try:
+        return pool.submit(func, *args, **kwargs).result()
+    except BrokenProcessPool as e:
+        logger.warning("Media pool broke (%s), restarting it and running this task inline", e)
+        with _lock:
+            if _pool is pool:
+                _pool = None
+        return func(*args, **kwargs)
+
+
+def shutdown_media_pool():
+    """Stop the worker processes (registered to run at exit)."""
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+atexit.register(shutdown_media_pool)
+
+
+# ---------------------------------------------------------------------------
+# Shared-memory hand-off for frame batches
+# ---------------------------------------------------------------------------
+
+def run_cpu_frames(func, *args, shared_task=None, **kwargs):
+    """
+    Run a frame-producing transform in the process pool; the frames come back through shared memory
+
+    The parent names the shared memory block up front and unlinks it itself whatever happens,
+    so a worker error or a failed copy never leaves the block in /dev/shm. (A block a worker
+    creates after the parent stopped waiting is removed by the resource tracker at exit.)
+    Only a small tuple of frame sizes is pickled through the result pipe.
+
+    Args:
+        func (callable): Module-level function returning a list of encoded frames (bytes)
+        shared_task (callable | None): The function the worker runs, called as
+            shared_task(name, func, args, kwargs) and returning frames_to_shared(...) of the same
+            arguments. Defaults to frames_to_shared itself, which the worker can only import when
+            this module is loaded under its own name; callers that load it under another name
+            pass a module-level wrapper from an importable module.
+
+    Returns:
+        list[bytes]: the frames
+    """
+    name = "mf" + secrets.token_hex(12)  # short: macOS caps shared memory names at 31 characters
+    block = None
+    try:
+        sizes = run_cpu(shared_task or frames_to_shared, name, func, args, kwargs)
+        if isinstance(sizes, list):  # the frames themselves: none, or the task ran in this process
+            return sizes
+        block = shared_memory.SharedMemory(name=name)
+        frames, offset = [], 0
+        for size in sizes:
+            frames.append(bytes(block.buf[offset:offset + size]))
+            offset += size
+        return frames
+    finally:
+        if block is None:
+            try:  # the worker may have created the block before it failed
+                block = shared_memory.SharedMemory(name=name)
+            except FileNotFoundError:
+                pass
+        if block is not None:
+            block.close()
+            block.unlink()
+
+
+def frames_to_shared(name, func, args, kwargs):
+    """Worker side of run_cpu_frames(): write func's frames into the block called name, return their sizes."""
+    frames = func(*args, **kwargs)
+    if multiprocessing.parent_process() is None or not frames:  # ran inline, or nothing to share
+        return list(frames)
+    sizes = tuple(len(frame) for frame in frames)
+    block = shared_memory.SharedMemory(name=name, create=True, size=sum(sizes))
+    try:
+        offset = 0
+        for frame, size in zip(frames, sizes):
+            block.buf[offset:offset + size] = frame
+            offset += size
+    finally:
+        block.close()  # the parent copies the frames out and unlinks the block
+    return sizes
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Modes: "on" reads and writes, "refresh" skips reads but stores fresh results, "off" does nothing
+CACHE_MODES = ("on", "refresh", "off")
+
+_EVICT_EVERY = 64  # run TTL/size eviction once per this many writes
+
+
+def cache_key(*parts):
+    """
+    Build a content-addressed cache key
+
+    Args:
+        *parts: str or bytes pieces (content bytes, model ID, prompts, language, ...)
+
+    Returns:
+        str: hex SHA-256 over the length-prefixed parts
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        if part is None:
+            part = b""
+        elif isinstance(part, str):
+            part = part.encode("utf-8")
+        elif not isinstance(part, (bytes, bytearray, memoryview)):
+            part = str(part).encode("utf-8")
+        # Length prefix so ("ab", "c") and ("a", "bc") hash differently
+        h.update(len(part).to_bytes(8, "big"))
+        h.update(part)
+    return h.hexdigest()
+
+
+class ResultCache:
+    """Persistent SQLite cache of moderation results with TTL and size-based LRU eviction.
+
+    Values are JSON-serializable objects. Safe to share between threads.
+    """
+
+    def __init__(self, path, ttl_seconds=None, max_bytes=None, mode="on"):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if mode != "off":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_results_last_access ON results(last_access)")
+            self._conn.commit()
+
+    @property
+    def enabled(self):
+        return self.mode != "off"
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss / in refresh mode."""
+        if self.mode != "on":
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload.encode("utf-8")), now, now),
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict_locked(now)
+
+    def get_or_compute(self, key, compute, should_store=None):
+        """Return the cached value for key, else compute() and store it if should_store(value) allows."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = compute()
+        if should_store is None or should_store(value):
+            self.put(key, value)
+        return value
+
+    def evict(self):
+        """Drop expired entries, then least-recently-used ones until under max_bytes."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._evict_locked(time.time())
+
+    def _evict_locked(self, now):
+        if self.ttl_seconds:
+            self._conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+        if self.max_bytes:
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total > self.max_bytes:
+                excess = total - self.max_bytes
+                freed = 0
+                doomed = []
+                for key, size in self._conn.execute("SELECT key, size FROM results ORDER BY last_access ASC"):
+                    doomed.append((key,))
+                    freed += size
+                    if freed >= excess:
+                        break
+                self._conn.executemany("DELETE FROM results WHERE key = ?", doomed)
+                logger.info("Result cache evicted %d entries (%d bytes)", len(doomed), freed)
+        self._conn.commit()
+
+    def stats(self):
+        """Return {'hits', 'misses', 'entries', 'bytes'}."""
+        entries = size = 0
+        if self.enabled:
+            with self._lock:
+                entries, size = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+                ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self.mode = "off"
+                self._evict_locked(time.time())
+                self._conn.close()
+                self._conn = None
+
+
+# ---------------------------------------------------------------------------
+# Process-wide default cache
+# ---------------------------------------------------------------------------
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def configure_default_cache(path, ttl_seconds=None, max_bytes=None, mode="on"):
+    """Install the cache returned by default_cache(); replaces (and closes) any previous one."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is not None:
+            _default_cache.close()
+        _default_cache = ResultCache(path, ttl_seconds=ttl_seconds, max_bytes=max_bytes, mode=mode)
+        return _default_cache
+
+
+def default_cache():
+    """Return the configured cache, or a disabled one if configure_default_cache() was never called."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache(":memory:", mode="off")
+        return _default_cache
@@ -1,153 +1,266 @@
+import concurrent.futures
+import itertools
 import json
-from aws_clients import comprehend_client, invoke_model, converse_with_model
+import threading
+import time
+import aws_clients  # clients looked up per call: configure_transport() rebuilds them
+from aws_clients import invoke_model, converse_with_model, is_error_response
+from result_cache import cache_key, default_cache
 import config
+from config import (
+    COMPREHEND_LANGUAGE_SUPPORT,
+    COMPREHEND_MAX_BYTES,
+    COMPREHEND_TOXIC_SEGMENT_BYTES,
+    COMPREHEND_TOXIC_SEGMENTS_PER_REQUEST,
+    LONG_TEXT_CHUNK_BYTES,
+    NEAR_DUP_TEXT_MAX_ENTRIES,
+    NEAR_DUP_TEXT_MIN_CHARS,
+    NEAR_DUP_TEXT_THRESHOLD,
+)
+from text_chunking import chunk_text
+from text_minhash import NearDuplicateIndex, minhash
 
-def analyze_text_with_comprehend(text):
-    # Detect dominant language
-    language_response = comprehend_client.detect_dominant_language(Text=text)
-    dominant_language = language_response['Languages'][0]['LanguageCode']
-    
-    # Map ISO language codes to human-readable names
-    language_names = {
-        'zh': 'Chinese',
-        'en': 'English',
-        'ja': 'Japanese',
-        'ko': 'Korean',
-        'es': 'Spanish',
-        'fr': 'French',
-        'de': 'German',
-        'pt': 'Portuguese',
-        'it': 'Italian',
-        'ru': 'Russian'
-    }
-    
-    detected_language = language_names.get(dominant_language, dominant_language)
-    
-    # Sentiment Detection
+# Map ISO language codes to human-readable names
+LANGUAGE_NAMES = {
+    'zh': 'Chinese',
+    'en': 'English',
+    'ja': 'Japanese',
+    'ko': 'Korean',
+    'es': 'Spanish',
+    'fr': 'French',
+    'de': 'German',
+    'pt': 'Portuguese',
+    'it': 'Italian',
+    'ru': 'Russian'
+}
+
+# Shared by all requests: each text runs the LLM call plus up to five Comprehend calls at once
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix="text-audit")
+# Per-chunk calls of long texts; a separate pool, so analyses waiting on their chunks never starve it
+_chunk_executor = concurrent.futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix="text-audit-chunk")
+
+# Segments scoring at least this are reported as toxic spans
+TOXIC_SPAN_MIN_SCORE = 0.5
+
+LLM_UNAVAILABLE = "LLM analysis result unavailable"
+
+# Near-duplicate reuse of LLM analyses: one MinHash index per (model, prompt)
+_near_dup_indexes = {}
+_near_dup_lock = threading.Lock()
+_near_dup_ids = itertools.count()
+
+def _dumps(result):
+    return json.dumps(result, ensure_ascii=False, indent=2)
+
+def _map_chunks(func, text, max_bytes):
+    """
+    Call func(chunk) on each sentence-aligned chunk of text concurrently
+
+    Returns:
+        list: (start, end, func result) per chunk, in text order
+    """
+    spans = chunk_text(text, max_bytes)
+    if len(spans) == 1:
+        return [(0, len(text), func(text))]
+    results = _chunk_executor.map(lambda span: func(text[span[0]:span[1]]), spans)
+    return [(start, end, result) for (start, end), result in zip(spans, results)]
+
+def _sentiment(text, language_code, language):
     try:
-        sentiment_response = comprehend_client.detect_sentiment(
-            Text=text,
-            LanguageCode=dominant_language
+        chunks = _map_chunks(
+            lambda chunk: aws_clients.comprehend_client.detect_sentiment(Text=chunk, LanguageCode=language_code),
+            text, COMPREHEND_MAX_BYTES['sentiment'],
         )
-        sentiment_result = json.dumps({
-            "Language": detected_language,
-            "Sentiment": sentiment_response['Sentiment'],
-            "Sentiment Scores": {
-                "Positive": f"{sentiment_response['SentimentScore']['Positive']:.2%}",
-                "Negative": f"{sentiment_response['SentimentScore']['Negative']:.2%}",
-                "Neutral": f"{sentiment_response['SentimentScore']['Neutral']:.2%}",
-                "Mixed": f"{sentiment_response['SentimentScore']['Mixed']:.2%}"
-            }
-        }, ensure_ascii=False, indent=2)
+        # Long texts: average the chunk scores weighted by chunk length
+        scores = {
+            name: sum(r['SentimentScore'][name] * (end - start) for start, end, r in chunks) / len(text)
+            for name in ('Positive', 'Negative', 'Neutral', 'Mixed')
+        }
+        sentiment = chunks[0][2]['Sentiment'] if len(chunks) == 1 else max(scores, key=scores.get).upper()
+        return _dumps({
+            "Language": language,
+            "Sentiment": sentiment,
+            "Sentiment Scores": {name: f"{score:.2%}" for name, score in scores.items()}
+        })
     except Exception as e:
-        sentiment_result = json.dumps({
-            "Error": f"Sentiment analysis not supported for this language ({dominant_language})"
-        }, ensure_ascii=False, indent=2)
-    
-    # Entities Detection
+        return _dumps({"Error": f"Sentiment analysis failed: {str(e)}"})
+
+def _entities(text, language_code, language):
     try:
-        entities_response = comprehend_client.detect_entities(
-            Text=text,
-            LanguageCode=dominant_language
+        chunks = _map_chunks(
+            lambda chunk: aws_clients.comprehend_client.detect_entities(Text=chunk, LanguageCode=language_code),
+            text, COMPREHEND_MAX_BYTES['entities'],
         )
-        entities_result = json.dumps({
-            "Language": detected_language,
-            "Entities": [{"Text": e['Text'], "Type": e['Type']} for e in entities_response['Entities']]
-        }, ensure_ascii=False, indent=2)
+        return _dumps({
+            "Language": language,
+            "Entities": [{"Text": e['Text'], "Type": e['Type']} for _, _, r in chunks for e in r['Entities']]
+        })
     except Exception as e:
-        entities_result = json.dumps({
-            "Error": f"Entity recognition not supported for this language ({dominant_language})"
-        }, ensure_ascii=False, indent=2)
-    
-    # Key Phrases Detection
+        return _dumps({"Error": f"Entity recognition failed: {str(e)}"})
+
+def _key_phrases(text, language_code, language):
     try:
-        key_phrases_response = comprehend_client.detect_key_phrases(
-            Text=text,
-            LanguageCode=dominant_language
+        chunks = _map_chunks(
+            lambda chunk: aws_clients.comprehend_client.detect_key_phrases(Text=chunk, LanguageCode=language_code),
+            text, COMPREHEND_MAX_BYTES['key_phrases'],
         )
-        key_phrases_result = json.dumps({
-            "Language": detected_language,
-            "Key Phrases": [kp['Text'] for kp in key_phrases_response['KeyPhrases']]
-        }, ensure_ascii=False, indent=2)
+        return _dumps({
+            "Language": language,
+            "Key Phrases": [kp['Text'] for _, _, r in chunks for kp in r['KeyPhrases']]
+        })
     except Exception as e:
-        key_phrases_result = json.dumps({
-            "Error": f"Key phrases extraction not supported for this language ({dominant_language})"
-        }, ensure_ascii=False, indent=2)
-    
-    # PII Entities Detection
-    if dominant_language in ['en', 'es']:
-        try:
-            pii_response = comprehend_client.detect_pii_entities(
-                Text=text,
-                LanguageCode=dominant_language
-            )
-            pii_result = json.dumps({
-                "Language": detected_language,
-                "Personal Sensitive Information": [
-                    {
-                        "Type": e['Type'],
-                        "Confidence": f"{e['Score']:.2%}",
-                        "Start Position": e['BeginOffset'],
-                        "End Position": e['EndOffset']
-                    } for e in pii_response['Entities']
-                ]
-            }, ensure_ascii=False, indent=2)
-        except Exception as e:
-            pii_result = json.dumps({
-                "Error": f"PII detection failed: {str(e)}"
-            }, ensure_ascii=False, indent=2)
-    else:
-        pii_result = json.dumps({
-            "Error": f"PII detection not supported for this language ({dominant_language})"
-        }, ensure_ascii=False, indent=2)
-    
-    # Toxic Content Detection
-    if dominant_language == 'en':
-        try:
-            # Prepare text segments in the required dictionary format
-            text_segments = [
-                {"Text": text[i:i+1000]} 
-                for i in range(0, len(text), 1000)
+        return _dumps({"Error": f"Key phrases extraction failed: {str(e)}"})
+
+def _pii(text, language_code, language):
+    try:
+        chunks = _map_chunks(
+            lambda chunk: aws_clients.comprehend_client.detect_pii_entities(Text=chunk, LanguageCode=language_code),
+            text, COMPREHEND_MAX_BYTES['pii'],
+        )
+        # Offsets are shifted by the chunk start so they point into the full text
+        return _dumps({
+            "Language": language,
+            "Personal Sensitive Information": [
+                {
+                    "Type": e['Type'],
+                    "Confidence": f"{e['Score']:.2%}",
+                    "Start Position": start + e['BeginOffset'],
+                    "End Position": start + e['EndOffset']
+                } for start, _, r in chunks for e in r['Entities']
             ]
-            
-            toxic_response = comprehend_client.detect_toxic_content(
-                TextSegments=text_segments,
-                LanguageCode='en'
-            )
-            
-            toxic_labels = []
-            overall_toxicity = 0
-            for segment_result in toxic_response.get('ResultList', []):
-                # Extract labels from each segment
-                segment_toxic_labels = [
-                    {
-                        "Name": label['Name'],
-                        "Confidence": f"{label['Score']:.2%}"
-                    } for label in segment_result.get('Labels', [])
-                ]
-                toxic_labels.extend(segment_toxic_labels)
-                
-                # Track overall toxicity
-                overall_toxicity = max(overall_toxicity, segment_result.get('Toxicity', 0))
-            
-            toxic_result = json.dumps({
-                "Language": detected_language,
-                "Harmful Content Labels": toxic_labels,
-                "Overall Toxicity": f"{overall_toxicity:.2%}"
-            }, ensure_ascii=False, indent=2)
-        except Exception as e:
-            toxic_result = json.dumps({
-                "Error": f"Harmful content detection failed: {str(e)}"
-            }, ensure_ascii=False, indent=2)
-    else:
-        toxic_result = json.dumps({
-            "Error": f"Harmful content detection only supports English (current language: {dominant_language})"
-        }, ensure_ascii=False, indent=2)
-    
-    return sentiment_result, entities_result, key_phrases_result, pii_result, toxic_result
+        })
+    except Exception as e:
+        return _dumps({"Error": f"PII detection failed: {str(e)}"})
+
+def _toxicity(text, language_code, language):
+    try:
+        # Sentence-aligned segments within the per-segment limit, sent in requests of at most
+        # the per-request segment count, all requests at once
+        segments = chunk_text(text, COMPREHEND_TOXIC_SEGMENT_BYTES)
+        requests = [
+            segments[i:i + COMPREHEND_TOXIC_SEGMENTS_PER_REQUEST]
+            for i in range(0, len(segments), COMPREHEND_TOXIC_SEGMENTS_PER_REQUEST)
+        ]
+        responses = _chunk_executor.map(
+            lambda request: aws_clients.comprehend_client.detect_toxic_content(
+                TextSegments=[{"Text": text[start:end]} for start, end in request],
+                LanguageCode=language_code
+            ),
+            requests,
+        )
+
+        label_scores = {}
+        toxic_spans = []
+        overall_toxicity = 0
+        for request, toxic_response in zip(requests, responses):
+            for (start, end), segment_result in zip(request, toxic_response.get('ResultList', [])):
+                # Keep the highest score per label across segments
+                for label in segment_result.get('Labels', []):
+                    label_scores[label['Name']] = max(label_scores.get(label['Name'], 0), label['Score'])
+                toxicity = segment_result.get('Toxicity', 0)
+                overall_toxicity = max(overall_toxicity, toxicity)
+                if toxicity >= TOXIC_SPAN_MIN_SCORE:
+                    toxic_spans.append({"Start Position": start, "End Position": end, "Toxicity": f"{toxicity:.2%}"})
+
+        return _dumps({
+            "Language": language,
+            "Harmful Content Labels": [
+                {"Name": name, "Confidence": f"{score:.2%}"} for name, score in label_scores.items()
+            ],
+            "Overall Toxicity": f"{overall_toxicity:.2%}",
+            "Toxic Spans": toxic_spans
+        })
+    except Exception as e:
+        return _dumps({"Error": f"Harmful content detection failed: {str(e)}"})
+
+# Output order of analyze_text_with_comprehend, with the message for unsupported languages
+_COMPREHEND_ANALYSES = (
+    ('sentiment', _sentiment, "Sentiment analysis not supported for this language ({code})"),
+    ('entities', _entities, "Entity recognition not supported for this language ({code})"),
+    ('key_phrases', _key_phrases, "Key phrases extraction not supported for this language ({code})"),
+    ('pii', _pii, "PII detection not supported for this language ({code})"),
+    ('toxicity', _toxicity, "Harmful content detection only supports English (current language: {code})"),
+)
+
+def analyze_text_with_comprehend(text):
+    """
+    Detect the language, then run the supported Comprehend analyses for it concurrently
+
+    Returns:
+        tuple: JSON strings (sentiment, entities, key_phrases, pii, toxicity); analyses the
+        language does not support hold an error message instead of being called
+    """
+    # Detection reads the first chunk only: the language of a long text is settled well before 100 KB
+    first_start, first_end = chunk_text(text, COMPREHEND_MAX_BYTES['language'])[0]
+    language_response = aws_clients.comprehend_client.detect_dominant_language(Text=text[first_start:first_end])
+    dominant_language = language_response['Languages'][0]['LanguageCode']
+    detected_language = LANGUAGE_NAMES.get(dominant_language, dominant_language)
+
+    futures = {
+        name: _executor.submit(func, text, dominant_language, detected_language)
+        for name, func, _ in _COMPREHEND_ANALYSES
+        if dominant_language in COMPREHEND_LANGUAGE_SUPPORT[name]
+    }
+    return tuple(
+        futures[name].result() if name in futures else _dumps({"Error": unsupported.format(code=dominant_language)})
+        for name, _, unsupported in _COMPREHEND_ANALYSES
+    )
+
+def _near_dup_index(model_id, prompt):
+    if NEAR_DUP_TEXT_THRESHOLD <= 0:
+        return None
+    with _near_dup_lock:
+        index = _near_dup_indexes.get((model_id, prompt))
+        if index is None:
+            index = NearDuplicateIndex(NEAR_DUP_TEXT_THRESHOLD, max_entries=NEAR_DUP_TEXT_MAX_ENTRIES)
+            _near_dup_indexes[(model_id, prompt)] = index
+        return index
 
 def analyze_text_with_llm(text, prompt, model_id):
-    """Analyze text content using the selected model"""
+    """
+    Analyze text content using the selected model
+
+    A text whose MinHash similarity to an earlier analyzed text reaches NEAR_DUP_TEXT_THRESHOLD
+    (same model and prompt) gets that text's analysis, headed by a note, without a model call.
+    The index is shared by every UI session, so only analyses are kept, never the texts.
+    """
+    index = _near_dup_index(model_id, prompt) if len(text) >= NEAR_DUP_TEXT_MIN_CHARS else None
+    signature = minhash(text) if index is not None else None
+    if signature is not None:
+        match = index.query(signature)
+        if match is not None:
+            _, similarity, analysis = match
+            return (f"[Near-duplicate of an earlier text (estimated similarity {similarity:.0%}), "
+                    f"its analysis is reused]\n\n{analysis}")
+
+    analysis = _analyze_text_in_chunks(text, prompt, model_id)
+    if signature is not None and not is_error_response(analysis) and LLM_UNAVAILABLE not in analysis:
+        index.add(next(_near_dup_ids), signature, analysis)
+    return analysis
+
+def _analyze_text_in_chunks(text, prompt, model_id):
+    """
+    Texts over LONG_TEXT_CHUNK_BYTES are split into sentence-aligned chunks that are analyzed
+    concurrently; the analyses are joined in text order, each headed by its character range.
+    """
+    spans = chunk_text(text, LONG_TEXT_CHUNK_BYTES) if LONG_TEXT_CHUNK_BYTES else [(0, len(text))]
+    if len(spans) == 1:
+        return _analyze_chunk_with_llm(text, prompt, model_id)
+
+    def analyze(numbered):
+        n, (start, end) = numbered
+        part_prompt = (f"{prompt}\n\nThis is part {n} of {len(spans)} of a longer text "
+                       f"(characters {start}-{end}); analyze this part only.")
+        return _analyze_chunk_with_llm(text[start:end], part_prompt, model_id)
+
+    analyses = _chunk_executor.map(analyze, enumerate(spans, 1))
+    return "\n\n".join(
+        f"### Part {n}/{len(spans)} (characters {start}-{end})\n{analysis}"
+        for n, ((start, end), analysis) in enumerate(zip(spans, analyses), 1)
+    )
+
+def _analyze_chunk_with_llm(text, prompt, model_id):
+    """Analyze one text (or one chunk of a long text) in a single model call"""
     
     # Prepare the message for conversation
     messages = [
@@ -164,30 +277,43 @@ def analyze_text_with_llm(text, prompt, model_id):
     # Prepare system prompts
     system_prompts = [{"text": "You are a text content analyzer. Analyze the following text and provide insights."}]
     
-    # Use the converse API
+    # Use the converse API; identical requests are served from the result cache
+    key = cache_key("ui-text", text, model_id, prompt, system_prompts[0]["text"])
     try:
-        analysis = converse_with_model(
+        analysis = default_cache().get_or_compute(key, lambda: converse_with_model(
             model_id=model_id,
             system_prompts=system_prompts,
             messages=messages,
             max_tokens=2000,
             temperature=0.3
-        )
+        ), should_store=lambda r: not is_error_response(r))
     except Exception as e:
         print(f"Text analysis error: {str(e)}")
-        analysis = "LLM analysis result unavailable"
+        analysis = LLM_UNAVAILABLE
     
     return analysis
 
+def _timed(func, *args):
+    start = time.time()
+    result = func(*args)
+    return result, time.time() - start
+
 def process_text(text, prompt, model_id):
-    import time
+    """
+    Run the LLM analysis and the Comprehend analyses on one text, all in flight at once
+
+    The LLM call does not depend on the language, so it starts before language detection.
 
-    llm_start = time.time()
-    llm_analysis = analyze_text_with_llm(text, prompt, model_id)
-    llm_elapsed = time.time() - llm_start
+    Returns:
+        tuple: (llm_analysis, sentiment, entities, key_phrases, pii_entities, toxic_content,
+        llm_elapsed, comprehend_elapsed) where comprehend_elapsed covers detection plus the
+        slowest of the calls that follow it
+    """
+    llm_future = _executor.submit(_timed, analyze_text_with_llm, text, prompt, model_id)
 
-    comprehend_start = time.time()
-    sentiment, entities, key_phrases, pii_entities, toxic_content = analyze_text_with_comprehend(text)
-    comprehend_elapsed = time.time() - comprehend_start
+    (sentiment, entities, key_phrases, pii_entities, toxic_content), comprehend_elapsed = _timed(
+        analyze_text_with_comprehend, text
+    )
+    llm_analysis, llm_elapsed = llm_future.result()
 
     return llm_analysis, sentiment, entities, key_phrases, pii_entities, toxic_content, llm_elapsed, comprehend_elapsed
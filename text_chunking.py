@@ -0,0 +1,88 @@
+import re
+
+# A sentence ends after terminal punctuation (plus closing quotes/brackets) and the whitespace
+# after it; CJK terminators need no following space. Line breaks always end a sentence.
+_SENTENCE_END = re.compile(r'[.!?]+["\'’”)\]]*\s+|[。！？；…]+[」』”’）]*\s*|\n+')
+
+
+def utf8_len(text):
+    """Size of text in UTF-8 bytes, the unit of the Bedrock and Comprehend request limits."""
+    return len(text.encode('utf-8'))
+
+
+def sentence_spans(text):
+    """
+    Split text into sentences
+
+    Args:
+        text (str): Text to split
+
+    Returns:
+        list: (start, end) character offsets covering the whole text; each sentence keeps its
+        trailing punctuation and whitespace
+    """
+    spans, start = [], 0
+    for match in _SENTENCE_END.finditer(text):
+        spans.append((start, match.end()))
+        start = match.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+
+def _hard_split(text, start, end, max_bytes):
+    """Cut one over-long sentence into pieces of at most max_bytes, preferring to cut after whitespace."""
+    spans = []
+    piece_start, size, last_space = start, 0, None
+    pos = start
+    while pos < end:
+        n = utf8_len(text[pos])
+        if size + n > max_bytes and pos > piece_start:
+            cut = last_space if last_space is not None else pos
+            spans.append((piece_start, cut))
+            piece_start, size, last_space = cut, utf8_len(text[cut:pos]), None
+            continue
+        size += n
+        pos += 1
+        if text[pos - 1].isspace():
+            last_space = pos
+    if piece_start < end:
+        spans.append((piece_start, end))
+    return spans
+
+
+def chunk_text(text, max_bytes):
+    """
+    Split text into chunks of whole sentences, each at most max_bytes in UTF-8
+
+    Sentences are packed greedily into chunks. A sentence longer than max_bytes is cut at
+    whitespace (or, for text without spaces, between characters) so that no chunk goes over
+    the limit and no character is split.
+
+    Args:
+        text (str): Text to split
+        max_bytes (int): Maximum UTF-8 size of one chunk
+
+    Returns:
+        list: (start, end) character offsets of the chunks, in order and covering the whole
+        text; a single (0, len(text)) span when the text already fits
+    """
+    if utf8_len(text) <= max_bytes:
+        return [(0, len(text))]
+    chunks = []
+    start = end = size = 0
+    for s_start, s_end in sentence_spans(text):
+        s_size = utf8_len(text[s_start:s_end])
+        if size and size + s_size > max_bytes:
+            chunks.append((start, end))
+            size = 0
+        if s_size > max_bytes:
+            chunks.extend(_hard_split(text, s_start, s_end, max_bytes))
+            continue
+        if not size:
+            start = s_start
+        end = s_end
+        size += s_size
+    if size:
+        chunks.append((start, end))
+    return chunks
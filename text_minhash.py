@@ -0,0 +1,115 @@
+import threading
+import unicodedata
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+SHINGLE_SIZE = 4  # characters per shingle; works for both spaced (en) and unspaced (zh) text
+NUM_PERM = 64
+LSH_BANDS = 16  # 16 bands of 4 rows: pairs above ~0.5 similarity meet in at least one bucket
+_ROWS = NUM_PERM // LSH_BANDS
+_PRIME = (1 << 31) - 1
+
+# Fixed seed: signatures must agree between runs and processes
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+
+def normalize_text(text):
+    """
+    Reduce a text to what near-duplicate matching compares
+
+    Case and full-width forms are folded and only letters and digits are kept, so spacing and
+    punctuation changes vanish. Digits are kept as they are: texts that differ only in an
+    amount, a date or a count must not share a verdict.
+    """
+    return "".join(c for c in unicodedata.normalize("NFKC", text).casefold() if c.isalnum())
+
+
+def minhash(text):
+    """
+    MinHash signature of the character shingles of a text
+
+    Args:
+        text (str): Text to sign
+
+    Returns:
+        numpy.ndarray | None: NUM_PERM uint32 values, or None when the normalized text is
+        shorter than one shingle
+    """
+    norm = normalize_text(text)
+    if len(norm) < SHINGLE_SIZE:
+        return None
+    shingles = {norm[i:i + SHINGLE_SIZE] for i in range(len(norm) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+    # One universal hash per permutation: (a * h + b) mod p, minimum over the shingles
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """
+    LSH index of MinHash signatures for finding earlier near-duplicate texts
+
+    Signatures are split into LSH_BANDS bands; texts sharing a band are candidates, and a
+    candidate matches when the share of equal signature values (an estimate of the Jaccard
+    similarity of the shingle sets) reaches the threshold. The oldest entries are dropped
+    once max_entries is reached. Thread-safe.
+    """
+
+    def __init__(self, threshold, max_entries=100000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (signature, value)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bands(signature):
+        return [(b, signature[b * _ROWS:(b + 1) * _ROWS].tobytes()) for b in range(LSH_BANDS)]
+
+    def query(self, signature):
+        """
+        Find the most similar indexed text
+
+        Returns:
+            tuple | None: (key, similarity, value) of the best match at or above the threshold
+        """
+        with self._lock:
+            candidates = {key for band in self._bands(signature) for key in self._buckets.get(band, ())}
+            best = None
+            for key in candidates:
+                other, value = self._entries[key]
+                similarity = float(np.count_nonzero(other == signature)) / NUM_PERM
+                if similarity >= self.threshold and (best is None or similarity > best[1]):
+                    best = (key, similarity, value)
+            return best
+
+    def add(self, key, signature, value=None):
+        """Index a signature under key, replacing an earlier entry with the same key."""
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (signature, value)
+            for band in self._bands(signature):
+                self._buckets.setdefault(band, []).append(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def remove(self, key):
+        """Drop key from the index (no-op if absent)."""
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for band in self._bands(entry[0]):
+            keys = self._buckets.get(band)
+            if keys is not None:
+                keys.remove(key)
+                if not keys:
+                    del self._buckets[band]
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,55 +1,134 @@
 import io
 import base64
+import threading
 from PIL import Image
 import cv2
 import numpy as np
 import logging
 import os
 
-def encode_image(image):
-    try:
+from image_preprocess import BEDROCK_IMAGE_MAX_BYTES, prepare_image
+from media_pool import run_cpu
+
+
+class ImageMedia:
+    """
+    One image, decoded at most once, with each encoded form memoized on first use
+
+    Accepts a file path, encoded bytes, a PIL Image or a BGR NumPy array. When the source is
+    already JPEG or PNG bytes, those bytes are passed through instead of being re-encoded.
+    Safe to share between the threads that call the LLM and Rekognition for the same image.
+    """
+
+    def __init__(self, image):
+        self._lock = threading.RLock()
+        self._image = None
+        self._cache = {}
+        self.raw_bytes = None
         if isinstance(image, str):
             # If image is a file path
-            if os.path.isfile(image):
-                with Image.open(image) as img:
-                    image = img.copy()
-            else:
+            if not os.path.isfile(image):
                 raise ValueError(f"File not found: {image}")
+            with open(image, "rb") as f:
+                self.raw_bytes = f.read()
+        elif isinstance(image, (bytes, bytearray, memoryview)):
+            self.raw_bytes = bytes(image)
         elif isinstance(image, np.ndarray):
             # Convert NumPy array to PIL Image
-            image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-        elif not isinstance(image, Image.Image):
-            raise ValueError("Unsupported image type. Expected PIL Image, NumPy array, or file path.")
+            self._image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        elif isinstance(image, Image.Image):
+            self._image = image
+        else:
+            raise ValueError("Unsupported image type. Expected PIL Image, NumPy array, bytes, or file path.")
+
+    @classmethod
+    def of(cls, image):
+        """Wrap image, or return it unchanged if it already is an ImageMedia."""
+        return image if isinstance(image, cls) else cls(image)
 
+    @property
+    def image(self):
+        """The PIL Image, opened on first access (PIL decodes pixels only when they are used)."""
+        with self._lock:
+            if self._image is None:
+                self._image = Image.open(io.BytesIO(self.raw_bytes))
+            return self._image
+
+    @property
+    def format(self):
+        """Source format as reported by PIL ("JPEG", "PNG", ...), or None for in-memory images."""
+        if self.raw_bytes is not None:
+            return self.image.format
+        return self._image.format
+
+    def _memo(self, key, build):
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = build()
+            return self._cache[key]
+
+    def _encode(self, image_format):
+        img = self.image
+        if image_format == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
         buffered = io.BytesIO()
-        image_format = image.format if image.format is not None else 'JPEG'
-        image_format = 'PNG' if image_format.upper() == 'PNG' else 'JPEG'
-        image.save(buffered, format=image_format)
-        return base64.b64encode(buffered.getvalue()).decode('utf-8')
+        img.save(buffered, format=image_format)
+        return buffered.getvalue()
+
+    def jpeg(self):
+        """JPEG bytes (the source bytes if they already are JPEG)."""
+        if self.raw_bytes is not None and self.format == "JPEG":
+            return self.raw_bytes
+        return self._memo("jpeg", lambda: self._encode("JPEG"))
+
+    def png(self):
+        """PNG bytes (the source bytes if they already are PNG)."""
+        if self.raw_bytes is not None and self.format == "PNG":
+            return self.raw_bytes
+        return self._memo("png", lambda: self._encode("PNG"))
+
+    def encoded(self):
+        """
+        Bytes in a format every AWS image API accepts
+
+        Returns:
+            tuple: (image_bytes, format) with format "jpeg" or "png"; JPEG and PNG sources are
+            passed through, in-memory images become JPEG and other formats lossless PNG
+        """
+        image_format = self.format
+        if image_format is None or image_format.upper() in ("JPEG", "JPG"):
+            return self.jpeg(), "jpeg"
+        return self.png(), "png"
+
+    def base64(self):
+        """Base64 text of encoded()."""
+        return self._memo("base64", lambda: base64.b64encode(self.encoded()[0]).decode("utf-8"))
+
+    def prepared(self, long_edge, max_bytes=BEDROCK_IMAGE_MAX_BYTES):
+        """
+        Downscaled payload for a model or Rekognition call (see image_preprocess.prepare_image)
+
+        Returns:
+            tuple: (image_bytes, format, stats), memoized per (long_edge, max_bytes)
+        """
+        def build():
+            if self.raw_bytes is not None:
+                # Decode/resize/re-encode in the media process pool; only the bytes cross over
+                return run_cpu(prepare_image, self.raw_bytes, long_edge=long_edge, max_bytes=max_bytes)
+            return prepare_image(self.image, long_edge=long_edge, max_bytes=max_bytes)
+        return self._memo(("prepared", long_edge, max_bytes), build)
+
+
+def encode_image(image):
+    try:
+        return ImageMedia.of(image).base64()
     except Exception as e:
         logging.error(f"Error encoding image: {e}")
         raise
 
 def get_image_bytes(image):
     try:
-        if isinstance(image, str):
-            # If image is a file path
-            if os.path.isfile(image):
-                with Image.open(image) as img:
-                    image = img.copy()
-            else:
-                raise ValueError(f"File not found: {image}")
-        elif isinstance(image, np.ndarray):
-            # Convert NumPy array to PIL Image
-            image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-        elif not isinstance(image, Image.Image):
-            raise ValueError("Unsupported image type. Expected PIL Image, NumPy array, or file path.")
-
-        image_bytes = io.BytesIO()
-        image_format = image.format if image.format is not None else 'JPEG'
-        image_format = 'JPEG' if image_format.upper() in ['JPEG', 'JPG'] else 'PNG'
-        image.save(image_bytes, format=image_format)
-        return image_bytes.getvalue()
+        return ImageMedia.of(image).encoded()[0]
     except Exception as e:
         logging.error(f"Error getting image bytes: {e}")
         raise
@@ -1,59 +1,54 @@
-import subprocess
-import os
-import tempfile
-import io
-from PIL import Image
-from aws_clients import converse_with_model
+from aws_clients import converse_with_model, is_error_response
+from result_cache import cache_key, default_cache
+from frame_extraction import extract_frames_from_file, near_duplicates, probe_duration
+from config import FRAME_BACKEND, FRAME_DEDUP_THRESHOLD, FRAME_HASH_METHOD
+from media_pool import run_cpu, run_cpu_frames
+from utils import ImageMedia
+from video_preprocess import bedrock_video_format, describe_video_prep, prepare_direct_video
 import logging
 
-def extract_frames(video_path, num_frames):
-    with tempfile.TemporaryDirectory() as temp_dir:
-        # Extract frames using ffmpeg
-        output_pattern = os.path.join(temp_dir, "frame_%04d.jpg")
-        subprocess.run([
-            "ffmpeg", "-i", video_path, 
-            "-vf", f"select='not(mod(n,{max(1, int(video_info(video_path)['nb_frames'] / num_frames))}))' ,scale=320:240", 
-            "-vsync", "vfr", "-q:v", "2", "-frames:v", str(num_frames), output_pattern
-        ], check=True)
-
-        # Read the extracted frames
-        frames = []
-        for i in range(1, num_frames + 1):
-            frame_path = os.path.join(temp_dir, f"frame_{i:04d}.jpg")
-            if os.path.exists(frame_path):
-                with Image.open(frame_path) as img:
-                    frames.append(img.copy())
-
-    return frames
+def extract_frame_media(video_path, num_frames, strategy="uniform"):
+    # Seek straight to the sampled timestamps in the media pool; the JPEGs come back through
+    # shared memory and are sent as-is
+    jpegs = run_cpu_frames(
+        extract_frames_from_file, video_path, int(num_frames), scale="320:240", strategy=strategy,
+        backend=FRAME_BACKEND,
+    )
+    return [ImageMedia(jpeg) for jpeg in jpegs]
+
+def extract_frames(video_path, num_frames, strategy="uniform"):
+    return [media.image for media in extract_frame_media(video_path, num_frames, strategy)]
 
 def video_info(video_path):
-    result = subprocess.run([
-        "ffprobe", "-v", "error", "-select_streams", "v:0", 
-        "-count_packets", "-show_entries", "stream=nb_read_packets", 
-        "-of", "csv=p=0", video_path
-    ], capture_output=True, text=True)
-    nb_frames = int(result.stdout.strip())
-    return {"nb_frames": nb_frames}
-
-def analyze_video_content(frames, prompt, model_id):
+    return {"duration": probe_duration(video_path)}
+
+def dedupe_video_frames(frames):
+    """Drop near-duplicate frames (configured by FRAME_DEDUP_THRESHOLD); returns (frames, dropped)."""
+    try:
+        # Hash the JPEGs in the media pool (extracted frames are JPEG already, so nothing is re-encoded)
+        jpegs = [ImageMedia.of(frame).jpeg() for frame in frames]
+        drop = run_cpu(near_duplicates, jpegs, FRAME_DEDUP_THRESHOLD, FRAME_HASH_METHOD)
+    except Exception as e:
+        logging.error(f"Frame deduplication failed, sending all frames: {str(e)}")
+        return frames, 0
+    return [frame for frame, dup in zip(frames, drop) if not dup], sum(drop)
+
+def analyze_video_content(frames, prompt, model_id, dedupe=True):
     """Analyze video frame content using the selected model"""
-    
+
+    # Near-identical frames (static shots, screen recordings) cost image tokens without adding information
+    if dedupe:
+        frames, dropped = dedupe_video_frames(frames)
+        if dropped:
+            logging.info(f"Skipped {dropped} near-duplicate frames")
+
     # Prepare the message content with frames
     content = [{"text": prompt}]
+    frame_bytes = []
     for i, frame in enumerate(frames):
         try:
-            # Handle both PIL Image objects and frame paths
-            if isinstance(frame, str):
-                # If frame is a path, open it as PIL Image
-                with Image.open(frame) as img:
-                    img_byte_arr = io.BytesIO()
-                    img.save(img_byte_arr, format='JPEG')
-                    image_bytes = img_byte_arr.getvalue()
-            else:
-                # If frame is already a PIL Image
-                img_byte_arr = io.BytesIO()
-                frame.save(img_byte_arr, format='JPEG')
-                image_bytes = img_byte_arr.getvalue()
+            # Handles ImageMedia, PIL Image objects and frame paths; JPEG sources are sent as-is
+            image_bytes = ImageMedia.of(frame).jpeg()
             content.append({
                 "image": {
                     "format": "jpeg",
@@ -63,6 +58,7 @@ def analyze_video_content(frames, prompt, model_id):
                 }
             })
             content.append({"text": f"Frame {i+1}"})
+            frame_bytes.append(image_bytes)
         except Exception as e:
             logging.error(f"Error encoding frame {i+1}: {str(e)}")
             continue
@@ -78,15 +74,16 @@ def analyze_video_content(frames, prompt, model_id):
     # Prepare system prompts
     system_prompts = [{"text": "You are a video content analyzer. Analyze the following video frames and provide insights."}]
     
-    # Use the converse API
+    # Use the converse API; identical frame sets are served from the result cache
+    key = cache_key("ui-video-frames", model_id, prompt, system_prompts[0]["text"], *frame_bytes)
     try:
-        analysis = converse_with_model(
+        analysis = default_cache().get_or_compute(key, lambda: converse_with_model(
             model_id=model_id,
             system_prompts=system_prompts,
             messages=messages,
             max_tokens=2000,
             temperature=0.3
-        )
+        ), should_store=lambda r: not is_error_response(r))
     except Exception as e:
         logging.error(f"Video analysis error: {str(e)}")
         analysis = "Video content analysis result unavailable"
@@ -103,60 +100,77 @@ def video_direct_understanding(video_path, prompt, model_id, is_s3_path=False):
             {"text": "You are an expert video content analyzer. Analyze the video content and provide detailed insights."}
         ]
 
-        content = []
+        prep_notes = []
+        key = None
 
         if is_s3_path:
             if not video_path.startswith("s3://"):
                 raise ValueError(f"Invalid S3 path format: {video_path}. S3 path must start with 's3://'")
-            content.append({
-                "video": {
-                    "format": "mp4",
-                    "source": {
-                        "s3Location": {"uri": video_path}
-                    }
+            # S3 sources are not size limited like inline bytes; only the container name has to be right
+            video_block = {
+                "format": bedrock_video_format(video_path),
+                "source": {
+                    "s3Location": {"uri": video_path}
                 }
-            })
+            }
             logging.info(f"Using S3 video path: {video_path}")
         else:
             with open(video_path, 'rb') as video_file:
                 binary_data = video_file.read()
-            content.append({
-                "video": {
-                    "format": "mp4",
-                    "source": {"bytes": binary_data}
-                }
-            })
-
-        content.append({"text": prompt})
-
-        messages = [{"role": "user", "content": content}]
+            video_block = None
+            # S3 objects can change behind the same URI, so only uploaded bytes are cached
+            key = cache_key("ui-video-direct", binary_data, model_id, prompt, system_prompts[0]["text"])
 
-        try:
-            analysis = converse_with_model(
+        def call_model():
+            block = video_block
+            if block is None:
+                # Remux/transcode only on a cache miss; preparation raises if the video cannot fit
+                data, fmt, stats = prepare_direct_video(binary_data)
+                if stats["action"] != "none":
+                    prep_notes.append(describe_video_prep(stats))
+                    logging.info(f"Direct video {prep_notes[-1]}")
+                block = {"format": fmt, "source": {"bytes": data}}
+            messages = [{"role": "user", "content": [{"video": block}, {"text": prompt}]}]
+            return converse_with_model(
                 model_id=model_id,
                 system_prompts=system_prompts,
                 messages=messages,
                 max_tokens=2000,
                 temperature=0.3
             )
+
+        try:
+            if key is None:
+                analysis = call_model()
+            else:
+                analysis = default_cache().get_or_compute(
+                    key, call_model, should_store=lambda r: not is_error_response(r),
+                )
+        except ValueError as e:
+            # Raised by prepare_direct_video when even a transcode cannot fit the inline limit
+            logging.error(f"Video direct analysis error: {str(e)}")
+            return f"Error processing video: {str(e)}. Please try the frame-based analysis method.", None
         except Exception as e:
             logging.error(f"Video direct analysis error: {str(e)}")
             analysis = "Video content analysis result unavailable"
 
-        return "Successfully completed direct video analysis", analysis
+        note = f" (video {prep_notes[0]})" if prep_notes else ""
+        return f"Successfully completed direct video analysis{note}", analysis
     except Exception as e:
         logging.error(f"Error in direct video understanding: {str(e)}")
         return f"Error processing video: {str(e)}", None
 
-def process_video(video, num_frames, prompt, model_id, analysis_method="frame", is_s3_path=False):
+def process_video(video, num_frames, prompt, model_id, analysis_method="frame", is_s3_path=False, frame_strategy="uniform"):
     if video is None:
         return None, "Please upload a video or provide an S3 path", None
 
     try:
         if analysis_method == "frame" and not is_s3_path:
-            frames = extract_frames(video, int(num_frames))
-            analysis = analyze_video_content(frames, prompt, model_id)
-            return frames, f"Successfully extracted {len(frames)} frames and completed content analysis", analysis
+            frames = extract_frame_media(video, int(num_frames), frame_strategy)
+            kept, dropped = dedupe_video_frames(frames)
+            analysis = analyze_video_content(kept, prompt, model_id, dedupe=False)
+            skipped = f" ({dropped} near-duplicate frames skipped)" if dropped else ""
+            return [media.image for media in kept], f"Successfully extracted {len(frames)} frames{skipped} and completed content analysis", analysis
         else:  # direct or S3 path
             result_message, analysis = video_direct_understanding(video, prompt, model_id, is_s3_path)
             return None, result_message, analysis
@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import subprocess
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Payload limit for a video sent inline (bytes) in a Converse request; S3 sources may be larger
+DIRECT_VIDEO_MAX_BYTES = 25 * 1024 * 1024
+
+# Containers the Converse API accepts, keyed by file extension
+BEDROCK_VIDEO_FORMATS = {
+    ".mp4": "mp4", ".m4v": "mp4", ".mov": "mov", ".mkv": "mkv", ".webm": "webm", ".flv": "flv",
+    ".mpeg": "mpeg", ".mpg": "mpg", ".wmv": "wmv", ".3gp": "three_gp",
+}
+
+# Codecs that can be stream-copied into MP4 and decoded by the model
+MP4_COPY_CODECS = ("h264", "hevc")
+
+# Transcode ladder: (output height, minimum video kbps worth spending at that height)
+TRANSCODE_LADDER = ((720, 1200), (480, 600), (360, 0))
+TRANSCODE_MAX_KBPS = 2500
+TRANSCODE_MAX_FPS = 15  # the model samples about one frame per second, so more frames only cost bits
+TRANSCODE_FALLBACK_KBPS = 800  # when the container does not record a duration
+
+_SIZE_HEADROOM = 0.9  # single-pass rate control overshoots a little
+_MAX_TRANSCODE_ATTEMPTS = 3
+
+_FFMPEG = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y"]
+
+
+def bedrock_video_format(path):
+    """
+    Converse API video format name for a file path or S3 URI, judged by its extension
+
+    Args:
+        path (str): File path or s3:// URI
+
+    Returns:
+        str: format name ("mp4" when the extension is unknown)
+    """
+    return BEDROCK_VIDEO_FORMATS.get(os.path.splitext(path)[1].lower(), "mp4")
+
+
+def probe_video(path):
+    """
+    Read container and first video stream details with ffprobe
+
+    Args:
+        path (str): Video file path
+
+    Returns:
+        dict: container (ffprobe format_name), brand (MP4 major brand or ""), codec, width,
+        height, fps and duration (None when not recorded)
+    """
+    result = subprocess.run(
+        [
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "format=format_name,duration:format_tags=major_brand"
+                             ":stream=codec_name,width,height,avg_frame_rate",
+            "-of", "json", path,
+        ],
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr.decode('utf-8', 'replace').strip()[-500:]}")
+    info = json.loads(result.stdout or b"{}")
+    fmt = info.get("format", {})
+    stream = (info.get("streams") or [{}])[0]
+
+    def number(value):
+        try:
+            if isinstance(value, str) and "/" in value:
+                num, den = value.split("/")
+                return float(num) / float(den) if float(den) else None
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    return {
+        "container": fmt.get("format_name", ""),
+        "brand": fmt.get("tags", {}).get("major_brand", "").strip(),
+        "codec": stream.get("codec_name"),
+        "width": stream.get("width"),
+        "height": stream.get("height"),
+        "fps": number(stream.get("avg_frame_rate")),
+        "duration": number(fmt.get("duration")),
+    }
+
+
+def _is_mp4(info):
+    # ffprobe names one demuxer for MOV and MP4; QuickTime files carry the "qt" brand
+    return "mp4" in info["container"].split(",") and info["brand"] != "qt"
+
+
+def _run(args):
+    proc = subprocess.run(_FFMPEG + args, capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {proc.stderr.decode('utf-8', 'replace').strip()[-500:]}")
+
+
+def _remux(src, dst):
+    """Copy the video stream into an MP4 container without re-encoding (audio is dropped)."""
+    _run(["-i", src, "-map", "0:v:0", "-c:v", "copy", "-an", "-movflags", "+faststart", "-f", "mp4", dst])
+
+
+def _transcode_plan(info, max_bytes):
+    """Pick (height, video kbps) so the output should fit max_bytes."""
+    if info["duration"]:
+        budget = int(max_bytes * 8 * _SIZE_HEADROOM / info["duration"] / 1000)
+    else:
+        budget = TRANSCODE_FALLBACK_KBPS
+    kbps = max(1, min(budget, TRANSCODE_MAX_KBPS))
+    height = next(h for h, min_kbps in TRANSCODE_LADDER if kbps >= min_kbps)
+    return height, kbps
+
+
+def _transcode(src, dst, info, height, kbps):
+    """Re-encode the video stream as H.264 at height (never upscaled) and kbps, without audio."""
+    if info["height"]:
+        height = min(height, info["height"])
+    height -= height % 2
+    filters = [f"scale=-2:{height}"]
+    if info["fps"] and info["fps"] > TRANSCODE_MAX_FPS:
+        filters.append(f"fps={TRANSCODE_MAX_FPS}")
+    _run([
+        "-i", src, "-map", "0:v:0", "-an", "-vf", ",".join(filters),
+        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p",
+        "-b:v", f"{kbps}k", "-maxrate", f"{kbps}k", "-bufsize", f"{kbps * 2}k",
+        "-movflags", "+faststart", "-f", "mp4", dst,
+    ])
+
+
+def prepare_direct_video(video, max_bytes=DIRECT_VIDEO_MAX_BYTES):
+    """
+    Make a video sendable inline to a direct video model as MP4 within max_bytes
+
+    MP4 files that already fit are passed through byte for byte. Other containers are remuxed
+    to MP4 with a stream copy when the codec allows it. If the video is still too large (or
+    cannot be copied), it is transcoded to H.264 at a resolution and bitrate derived from its
+    duration, retrying at lower bitrates until it fits. Audio is dropped from rewritten files,
+    as the model only looks at the pictures.
+
+    Args:
+        video (str | bytes): Video file path or the video bytes
+        max_bytes (int): Maximum payload size
+
+    Returns:
+        tuple: (video_bytes, format, stats) where format is "mp4" and stats holds action
+        ("none", "remux" or "transcode"), container, original_bytes and sent_bytes
+
+    Raises:
+        ValueError: If the video cannot be brought under max_bytes
+    """
+    with tempfile.TemporaryDirectory(prefix="video-prep-") as tmp:
+        if isinstance(video, str):
+            src = video
+        else:
+            src = os.path.join(tmp, "input")
+            with open(src, "wb") as f:
+                f.write(video)
+        original_bytes = os.path.getsize(src)
+        info = probe_video(src)
+        stats = {"action": "none", "container": info["container"], "original_bytes": original_bytes}
+
+        def finish(path, action):
+            if isinstance(video, bytes) and path == src:
+                data = video
+            else:
+                with open(path, "rb") as f:
+                    data = f.read()
+            stats.update(action=action, sent_bytes=len(data))
+            return data, "mp4", stats
+
+        if _is_mp4(info) and original_bytes <= max_bytes:
+            return finish(src, "none")
+
+        current = src
+        if not _is_mp4(info) and info["codec"] in MP4_COPY_CODECS:
+            remuxed = os.path.join(tmp, "remux.mp4")
+            try:
+                _remux(src, remuxed)
+                current = remuxed
+            except RuntimeError as e:
+                logger.warning("Remux to MP4 failed, transcoding instead: %s", e)
+            if current == remuxed and os.path.getsize(remuxed) <= max_bytes:
+                return finish(remuxed, "remux")
+
+        height, kbps = _transcode_plan(info, max_bytes)
+        out = os.path.join(tmp, "transcode.mp4")
+        for attempt in range(_MAX_TRANSCODE_ATTEMPTS):
+            _transcode(current, out, info, height, kbps)
+            size = os.path.getsize(out)
+            if size <= max_bytes:
+                return finish(out, "transcode")
+            logger.info("Transcode at %dp/%dkbps gave %d bytes, retrying smaller", height, kbps, size)
+            kbps = max(1, int(kbps * max_bytes / size * _SIZE_HEADROOM))
+            height = next(h for h, min_kbps in TRANSCODE_LADDER if kbps >= min_kbps)
+
+        raise ValueError(
+            f"Video could not be reduced below {max_bytes / (1024 * 1024):.0f} MB "
+            f"(last attempt {size / (1024 * 1024):.1f} MB)"
+        )
+
+
+def describe_video_prep(stats):
+    """One-line summary of what preprocessing did to a video, for logs and UI output."""
+    mb = 1024 * 1024
+    if stats["action"] == "none":
+        return f"sent as-is ({stats['sent_bytes'] / mb:.1f} MB)"
+    verb = "remuxed" if stats["action"] == "remux" else "transcoded"
+    return f"{verb} to MP4, {stats['original_bytes'] / mb:.1f} MB -> {stats['sent_bytes'] / mb:.1f} MB"
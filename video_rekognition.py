@@ -3,7 +3,7 @@ import uuid
 import logging
 import os
 
-from aws_clients import rekognition_client, s3_client
+import aws_clients  # clients looked up per call: configure_transport() rebuilds them
 from config import (
     S3_BUCKET_NAME,
     REKOGNITION_VIDEO_MIN_CONFIDENCE,
@@ -29,7 +29,7 @@ def upload_video_to_s3(video_path):
     """Upload a local video file to S3 and return (bucket, key)."""
     ext = os.path.splitext(video_path)[1] or ".mp4"
     key = f"video-moderation/{uuid.uuid4()}{ext}"
-    s3_client.upload_file(video_path, S3_BUCKET_NAME, key)
+    aws_clients.s3_client.upload_file(video_path, S3_BUCKET_NAME, key)
     logger.info(f"Uploaded {video_path} to s3://{S3_BUCKET_NAME}/{key}")
     return S3_BUCKET_NAME, key
 
@@ -38,7 +38,7 @@ def start_video_moderation(bucket, key, min_confidence=None):
     """Start a Rekognition video content moderation job and return the job ID."""
     if min_confidence is None:
         min_confidence = REKOGNITION_VIDEO_MIN_CONFIDENCE
-    response = rekognition_client.start_content_moderation(
+    response = aws_clients.rekognition_client.start_content_moderation(
         Video={"S3Object": {"Bucket": bucket, "Name": key}},
         MinConfidence=min_confidence,
     )
@@ -56,7 +56,7 @@ def poll_video_moderation(job_id, poll_interval=None, timeout=None):
 
     deadline = time.time() + timeout
     while time.time() < deadline:
-        response = rekognition_client.get_content_moderation(
+        response = aws_clients.rekognition_client.get_content_moderation(
             JobId=job_id, SortBy="TIMESTAMP"
         )
         status = response["JobStatus"]
@@ -64,7 +64,7 @@ def poll_video_moderation(job_id, poll_interval=None, timeout=None):
             all_labels = list(response.get("ModerationLabels", []))
             next_token = response.get("NextToken")
             while next_token:
-                page = rekognition_client.get_content_moderation(
+                page = aws_clients.rekognition_client.get_content_moderation(
                     JobId=job_id, SortBy="TIMESTAMP", NextToken=next_token
                 )
                 all_labels.extend(page.get("ModerationLabels", []))